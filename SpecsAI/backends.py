@@ -0,0 +1,757 @@
+"""
+SpecsAI Provider Backends
+One class per brain, registered by name. AIProvider keeps the shared machinery (pooled
+connections, key leases, rate limits, model routing, health, deadlines) and calls into the
+backends for the provider-specific request code. Vendor SDKs are imported on first use, so a
+Groq-only setup never pays for google.generativeai at startup.
+Extra backends: register_backend("name", cls) with a class implementing ProviderBackend.
+"""
+import importlib
+import logging
+import re
+import time
+import aiohttp
+from .config import SpecsConfig
+from .health import error_status
+from .model_cache import GeminiModelCatalog
+from .ratelimit import parse_retry_after
+from .routing import LARGE
+from .streaming import iter_ndjson, iter_sse_json
+
+_SDKS = {}
+
+
+def lazy_import(module):
+    """Imports an optional SDK on first use. Returns None if it isn't installed."""
+    if module not in _SDKS:
+        try:
+            _SDKS[module] = importlib.import_module(module)
+        except ImportError:
+            _SDKS[module] = None
+    return _SDKS[module]
+
+
+def gemini_retry_delay(error_text):
+    """Gemini puts the back-off in the error body ('"retryDelay": "17s"'), not in a header."""
+    match = re.search(r'"retryDelay":\s*"([\d.]+)s"', error_text or "")
+    return float(match.group(1)) if match else None
+
+
+def openai_messages(text, system_prompt, history):
+    messages = [{"role": "system", "content": system_prompt}]
+    if history:
+        for msg in history:
+            role = "user" if msg['role'] == "user" else "assistant"
+            messages.append({"role": role, "content": msg['content']})
+    messages.append({"role": "user", "content": text})
+    return messages
+
+
+class ProviderBackend:
+    """
+    Subclasses implement query() and, if the API can stream, stream().
+    `provider` is the owning AIProvider: backends read the leased key, the pooled
+    sessions, the limiter and the router from it.
+    """
+    name = "base"
+    label = "SpecsAI"        # 'source' of answers to explicit requests
+    auto_label = None        # 'source' in auto mode; None = explicit requests only
+    key_env = None           # Environment variable with the API key(s); None = keyless (local)
+    streams = False
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.logger = logging.getLogger(f"SpecsAI.{self.name}")
+
+    def key(self):
+        """Key leased for this backend by the current request."""
+        return self.provider._key(self.name)
+
+    def available(self):
+        return bool(self.provider.api_keys.get(self.name))
+
+    def unavailable_reason(self):
+        return f"{self.label} API Key missing."
+
+    def session(self):
+        return self.provider.pool.get(self.name)
+
+    def timeout(self):
+        """aiohttp timeout for the current request: its share of the turn deadline."""
+        return self.provider._timeout()
+
+    def timeout_seconds(self):
+        """The same limit for SDK clients that take plain seconds."""
+        timeout = self.timeout()
+        return timeout.total or timeout.sock_read
+
+    def model(self, tier):
+        return self.provider.router.model(self.name, tier)
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        raise NotImplementedError
+
+    async def stream(self, text, system_prompt, history, tier=LARGE):
+        """Backends without a streaming API deliver the full answer as one chunk."""
+        yield await self.query(text, system_prompt, history, tier)
+
+    async def prewarm(self):
+        endpoint = SpecsConfig.PROVIDER_ENDPOINTS.get(self.name)
+        if endpoint:
+            await self.provider.pool.prewarm(self.name, endpoint)
+
+    async def close(self):
+        pass
+
+
+class OpenAICompatibleBackend(ProviderBackend):
+    """Chat Completions over REST (+ SSE streaming), shared by the OpenAI-style APIs."""
+    url = None
+    streams = True
+
+    def _payload(self, text, system_prompt, history, tier, stream=False):
+        payload = {
+            "model": self.model(tier),
+            "messages": openai_messages(text, system_prompt, history),
+            "temperature": 0.7,
+            "max_tokens": 1024,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _headers(self, api_key):
+        return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        api_key = self.key()
+        if not api_key:
+            raise ValueError(f"{self.label} API Key missing")
+        router = self.provider.router
+        start = time.monotonic()
+        async with self.session().post(self.url, headers=self._headers(api_key),
+                                       json=self._payload(text, system_prompt, history, tier),
+                                       timeout=self.timeout()) as response:
+            self.provider.limiter.observe(self.name, api_key, response.status, response.headers)
+            if response.status == 200:
+                data = await response.json()
+                router.record(self.name, tier, time.monotonic() - start)
+                return data['choices'][0]['message']['content']
+            else:
+                error_text = await response.text()
+                router.record(self.name, tier, ok=False)
+                raise ValueError(f"{self.label} Error {response.status}: {error_text}")
+
+    async def stream(self, text, system_prompt, history, tier=LARGE):
+        api_key = self.key()
+        router = self.provider.router
+        start = time.monotonic()
+        first = True
+        async with self.session().post(self.url, headers=self._headers(api_key),
+                                       json=self._payload(text, system_prompt, history, tier, stream=True),
+                                       timeout=self.timeout()) as response:
+            self.provider.limiter.observe(self.name, api_key, response.status, response.headers)
+            if response.status != 200:
+                error_text = await response.text()
+                router.record(self.name, tier, ok=False)
+                raise ValueError(f"{self.label} Error {response.status}: {error_text}")
+            async for event in iter_sse_json(response):
+                choices = event.get("choices") or []
+                if choices:
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if first:
+                            router.record(self.name, tier, time.monotonic() - start)  # Time to first chunk
+                            first = False
+                        yield delta
+
+
+class GroqBackend(OpenAICompatibleBackend):
+    """
+    Groq (Llama 3 70B, fastest). Uses the groq SDK when it is installed (its clients keep their
+    own httpx pool), otherwise Groq's OpenAI-compatible REST endpoint on the pooled session.
+    """
+    name = "groq"
+    label = "Groq"
+    auto_label = "SpecsAI (Fast Core)"
+    key_env = "GROQ_API_KEY"
+    url = "https://api.groq.com/openai/v1/chat/completions"
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        self.clients = {}  # One AsyncGroq per key (the key is fixed at construction)
+
+    def client(self):
+        """AsyncGroq for the leased key, created (and the SDK imported) on first use; None without the SDK."""
+        groq = lazy_import("groq")
+        if groq is None:
+            return None
+        api_key = self.key()
+        if api_key not in self.clients:
+            # Binds to the loop on first request; safe because every query runs on the engine's loop
+            self.clients[api_key] = groq.AsyncGroq(api_key=api_key, timeout=SpecsConfig.HTTP_TIMEOUTS["sock_read"])
+        return self.clients[api_key]
+
+    def _observe_sdk_error(self, error):
+        """SDK exceptions (e.g. groq.RateLimitError) carry the HTTP response and its headers."""
+        if error_status(error) == 429:
+            headers = getattr(getattr(error, "response", None), "headers", None)
+            self.provider.limiter.observe(self.name, self.key(), 429, headers)
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        client = self.client()
+        if client is None:
+            return await super().query(text, system_prompt, history, tier)
+        router = self.provider.router
+        start = time.monotonic()
+        try:
+            completion = await client.chat.completions.create(
+                model=self.model(tier),
+                messages=openai_messages(text, system_prompt, history),
+                temperature=0.7,
+                max_tokens=1024,
+                top_p=1,
+                stream=False,
+                stop=None,
+                timeout=self.timeout_seconds(),
+            )
+        except Exception as e:
+            self._observe_sdk_error(e)
+            router.record(self.name, tier, ok=False)
+            raise
+        router.record(self.name, tier, time.monotonic() - start)
+        return completion.choices[0].message.content
+
+    async def stream(self, text, system_prompt, history, tier=LARGE):
+        client = self.client()
+        if client is None:
+            async for chunk in super().stream(text, system_prompt, history, tier):
+                yield chunk
+            return
+        router = self.provider.router
+        start = time.monotonic()
+        try:
+            stream = await client.chat.completions.create(
+                model=self.model(tier),
+                messages=openai_messages(text, system_prompt, history),
+                temperature=0.7,
+                max_tokens=1024,
+                top_p=1,
+                stream=True,
+                timeout=self.timeout_seconds(),
+            )
+        except Exception as e:
+            self._observe_sdk_error(e)
+            router.record(self.name, tier, ok=False)
+            raise
+        first = True
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first:
+                    router.record(self.name, tier, time.monotonic() - start)
+                    first = False
+                yield chunk.choices[0].delta.content
+
+    async def prewarm(self):
+        client = self.client()
+        if client is None:
+            return await super().prewarm()
+        try:
+            await client.models.list()
+        except Exception as e:
+            self.logger.debug(f"Groq pre-warm failed: {e}")
+
+    async def close(self):
+        for client in self.clients.values():
+            try:
+                await client.close()
+            except Exception:
+                pass
+        self.clients.clear()
+
+
+class SambanovaBackend(OpenAICompatibleBackend):
+    """Sambanova Cloud (Fast Llama 3.1 70B), OpenAI-compatible API"""
+    name = "sambanova"
+    label = "Sambanova"
+    auto_label = "SpecsAI (Sambanova Core)"
+    key_env = "SAMBANOVA_API_KEY"
+    url = "https://api.sambanova.ai/v1/chat/completions"
+
+
+class GeminiBackend(ProviderBackend):
+    """
+    Google Gemini over REST (text, vision and SSE streaming). google.generativeai is only
+    imported if REST fails and the SDK fallback runs.
+    """
+    name = "gemini"
+    label = "Google Gemini"
+    auto_label = "SpecsAI (Smart Core)"
+    key_env = "GEMINI_API_KEY"
+    streams = True
+
+    def __init__(self, provider):
+        super().__init__(provider)
+        # Which Gemini models each key can use (listed once, cached on disk)
+        pool = provider.key_pools.get(self.name)
+        # A Gemini model set in the routes (e.g. the app's gemini_model setting) is tried first
+        configured = self.model(LARGE)
+        preferred = [configured] + [m for m in SpecsConfig.GEMINI_MODELS if m != configured] if configured else None
+        self.catalogs = {
+            key: GeminiModelCatalog(key, provider.pool, storage_path=provider.model_cache_path, preferred=preferred)
+            for key in (pool.keys if pool else [])
+        }
+
+    @property
+    def catalog(self):
+        """Model catalog of the Gemini key in use by the current request."""
+        return self.catalogs.get(self.key())
+
+    async def close(self):
+        for catalog in self.catalogs.values():
+            catalog.save()  # Pending model outcomes
+
+    def _sdk(self):
+        """google.generativeai configured for the leased key (None if the SDK isn't installed)."""
+        genai = lazy_import("google.generativeai")
+        if genai is not None:
+            genai.configure(api_key=self.key())
+        return genai
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        # REST is the primary path: it avoids 'InterceptedUnaryUnaryCall' gRPC errors in
+        # threaded/async environments (PySide6).
+        try:
+            return await self.query_rest(text, None, self.key(), history=history, system_prompt=system_prompt)
+        except Exception as rest_error:
+            # Fallback to SDK if REST fails (unlikely, but safe)
+            genai = self._sdk()
+            if genai is None:
+                raise
+            try:
+                chat_history = []
+                if history:
+                    for msg in history:
+                        role = "user" if msg['role'] == "user" else "model"
+                        chat_history.append({"role": role, "parts": [msg['content']]})
+
+                # Re-initialize model with system prompt if needed
+                model_name = self.catalog.best() if self.catalog else SpecsConfig.GEMINI_MODELS[0]
+                try:
+                     model = genai.GenerativeModel(model_name, system_instruction=system_prompt)
+                except:
+                     model = genai.GenerativeModel(model_name)
+
+                chat = model.start_chat(history=chat_history)
+                response = await chat.send_message_async(text)
+                return response.text
+            except Exception as sdk_error:
+                raise ValueError(f"Gemini Failed (REST: {rest_error}) (SDK: {sdk_error})")
+
+    async def vision(self, text, system_prompt, image):
+        """
+        Screen / image question. Returns a result dict.
+        image: VisionImage (encoded once by AIProvider) or anything ImageEncoder accepts.
+        """
+        # Vision Request: Single turn usually
+        # We prioritize REST API for Vision to avoid gRPC/Async loop conflicts in threaded contexts
+        last_error = None
+        image = await self.provider.images.encode_async(image)  # No-op if already encoded
+
+        # 1. Direct REST API (Primary for Stability)
+        try:
+            rest_response = await self.query_rest(text, image, self.key(), system_prompt=system_prompt)
+            if rest_response:
+                return {"text": rest_response, "source": "SpecsAI Vision (Direct Link)"}
+        except Exception as e:
+            last_error = f"REST Error: {e}"
+
+        # 2. SDK Fallback (Only if REST fails) - same cached model availability as REST
+        genai = self._sdk()
+        models_to_try = (await self.catalog.candidates() if self.catalog else SpecsConfig.GEMINI_MODELS) if genai else []
+        for model_name in models_to_try:
+            try:
+                vision_model = genai.GenerativeModel(model_name)
+                response = await vision_model.generate_content_async([text, image.sdk_part()])
+                if self.catalog:
+                    self.catalog.record_success(model_name)
+                return {"text": response.text, "source": f"SpecsAI Vision ({model_name})"}
+            except Exception as e:
+                last_error = f"{last_error} | SDK {model_name}: {e}"
+                status = error_status(e)
+                if self.catalog and status:
+                    self.catalog.record_failure(model_name, status)
+                # Continue to next model
+
+        # If all failed, log it securely but return a polite message
+        self.logger.error(f"Vision Analysis Failed after retries. Last error: {last_error}")
+        return {"error": "I'm having trouble seeing the screen right now. My vision sensors are recalibrating. Please try again in a moment."}
+
+    async def query_rest(self, text, image_data, api_key, history=None, system_prompt=None):
+        """
+        Direct REST API call to Gemini (text and vision).
+        Bypasses python-google-generativeai SDK if it's outdated, buggy or not installed.
+        """
+        if not api_key:
+            raise ValueError("No Gemini API Key provided for REST call")
+
+        # Models to try: last known-good first, known-broken ones skipped (re-checked in background)
+        catalog = self.catalogs.get(api_key)
+        models = await catalog.candidates() if catalog else list(SpecsConfig.GEMINI_MODELS)
+
+        last_error = None
+        throttled = []  # Retry delays of models that answered 429
+
+        image = await self.provider.images.encode_async(image_data) if image_data else None
+        session = self.session()
+        for model_name in models:
+            try:
+                url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
+
+                headers = {'Content-Type': 'application/json'}
+
+                # Construct Payload
+                contents = []
+
+                # For v1beta, 'systemInstruction' is a separate field.
+                payload = {}
+
+                if system_prompt:
+                     payload["systemInstruction"] = {
+                         "parts": [{"text": system_prompt}]
+                     }
+
+                # Add History
+                if history:
+                    for msg in history:
+                        role = "user" if msg['role'] == "user" else "model"
+                        contents.append({
+                            "role": role,
+                            "parts": [{"text": msg['content']}]
+                        })
+
+                # Add Current Message
+                current_parts = [{"text": text}]
+                if image:
+                    # Encoded once per request (downscaled JPEG), shared by every model attempt
+                    current_parts.append(image.inline_part())
+
+                contents.append({
+                    "role": "user",
+                    "parts": current_parts
+                })
+
+                payload["contents"] = contents
+
+                async with session.post(url, headers=headers, json=payload, timeout=self.timeout()) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        # Extract text from response structure
+                        try:
+                            answer = result['candidates'][0]['content']['parts'][0]['text']
+                        except (KeyError, IndexError):
+                             raise ValueError(f"Unexpected API Response structure: {result}")
+                        if catalog:
+                            catalog.record_success(model_name)
+                        return answer
+                    else:
+                        error_text = await response.text()
+                        if catalog:
+                            catalog.record_failure(model_name, response.status)
+                        if response.status == 429:
+                            # Gemini quotas are per model: the next model may still have room
+                            throttled.append(parse_retry_after(response.headers.get("retry-after")) or gemini_retry_delay(error_text))
+                            last_error = f"{model_name} {response.status}: {error_text}"
+                            continue
+                        # If 404 (Model not found) or 500, try next model
+                        if response.status in [404, 500, 503]:
+                            last_error = f"{model_name} {response.status}: {error_text}"
+                            continue
+                        else:
+                            raise ValueError(f"REST API Error {response.status}: {error_text}")
+
+            except Exception as e:
+                last_error = e
+                continue
+
+        # If we get here, all models failed
+        if throttled and len(throttled) == len(models):
+            # Every model is out of quota: the whole key backs off
+            delays = [d for d in throttled if d is not None]
+            self.provider.limiter.observe("gemini", api_key, 429, retry_after=min(delays) if delays else None)
+        raise ValueError(f"All REST models failed. Last error: {last_error}")
+
+    async def stream(self, text, system_prompt, history, tier=LARGE, model_name=None):
+        """Gemini streamGenerateContent over SSE (text only)"""
+        api_key = self.key()
+        catalog = self.catalog
+        if not model_name:
+            if catalog:
+                await catalog.ensure_listed()
+                model_name = catalog.best()
+            else:
+                model_name = SpecsConfig.GEMINI_MODELS[0]
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:streamGenerateContent?alt=sse&key={api_key}"
+
+        contents = []
+        if history:
+            for msg in history:
+                role = "user" if msg['role'] == "user" else "model"
+                contents.append({"role": role, "parts": [{"text": msg['content']}]})
+        contents.append({"role": "user", "parts": [{"text": text}]})
+
+        payload = {"contents": contents}
+        if system_prompt:
+            payload["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+
+        async with self.session().post(url, headers={'Content-Type': 'application/json'}, json=payload,
+                                       timeout=self.timeout()) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                if response.status == 429:
+                    self.provider.limiter.observe("gemini", api_key, 429, response.headers, retry_after=gemini_retry_delay(error_text))
+                if catalog:
+                    catalog.record_failure(model_name, response.status)
+                raise ValueError(f"Gemini Stream Error {response.status}: {error_text}")
+            if catalog:
+                catalog.record_success(model_name)
+            async for event in iter_sse_json(response):
+                for candidate in event.get("candidates", []):
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+
+
+class ClaudeBackend(ProviderBackend):
+    """Anthropic Messages API (REST + SSE streaming)"""
+    name = "claude"
+    label = "Claude"
+    auto_label = "SpecsAI (Claude Core)"
+    key_env = "ANTHROPIC_API_KEY"
+    url = "https://api.anthropic.com/v1/messages"
+    streams = True
+
+    def _request(self, text, system_prompt, history, tier, stream=False):
+        api_key = self.key()
+        if not api_key:
+            raise ValueError("Claude API Key missing")
+        headers = {"x-api-key": api_key, "anthropic-version": "2023-06-01", "content-type": "application/json"}
+        # Claude takes the system prompt separately and needs strictly alternating roles
+        messages = []
+        for msg in (history or []) + [{"role": "user", "content": text}]:
+            role = "user" if msg['role'] == "user" else "assistant"
+            if messages and messages[-1]["role"] == role:
+                messages[-1]["content"] += f"\n\n{msg['content']}"
+            else:
+                messages.append({"role": role, "content": msg['content']})
+        payload = {"model": self.model(tier), "max_tokens": 1024, "system": system_prompt, "messages": messages}
+        if stream:
+            payload["stream"] = True
+        return api_key, headers, payload
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        api_key, headers, payload = self._request(text, system_prompt, history, tier)
+        router = self.provider.router
+        start = time.monotonic()
+        async with self.session().post(self.url, headers=headers, json=payload, timeout=self.timeout()) as response:
+            self.provider.limiter.observe(self.name, api_key, response.status, response.headers)
+            if response.status == 200:
+                data = await response.json()
+                router.record(self.name, tier, time.monotonic() - start)
+                return data['content'][0]['text']
+            else:
+                error_text = await response.text()
+                router.record(self.name, tier, ok=False)
+                raise ValueError(f"Claude Error {response.status}: {error_text}")
+
+    async def stream(self, text, system_prompt, history, tier=LARGE):
+        api_key, headers, payload = self._request(text, system_prompt, history, tier, stream=True)
+        router = self.provider.router
+        start = time.monotonic()
+        first = True
+        async with self.session().post(self.url, headers=headers, json=payload, timeout=self.timeout()) as response:
+            self.provider.limiter.observe(self.name, api_key, response.status, response.headers)
+            if response.status != 200:
+                error_text = await response.text()
+                router.record(self.name, tier, ok=False)
+                raise ValueError(f"Claude Error {response.status}: {error_text}")
+            async for event in iter_sse_json(response):
+                if event.get("type") == "error":
+                    raise ValueError(f"Claude Error: {event.get('error')}")
+                delta = event.get("delta", {}).get("text") if event.get("type") == "content_block_delta" else None
+                if delta:
+                    if first:
+                        router.record(self.name, tier, time.monotonic() - start)
+                        first = False
+                    yield delta
+                if event.get("type") == "message_stop":
+                    break
+
+
+class HuggingFaceBackend(ProviderBackend):
+    """Hugging Face Inference API (Free Tier, no streaming)"""
+    name = "huggingface"
+    label = "Hugging Face"
+    auto_label = "SpecsAI (HF Core)"
+    key_env = "HUGGINGFACE_API_KEY"
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        api_key = self.key()
+        if not api_key:
+            raise ValueError("Hugging Face API Key missing")
+
+        model = self.model(tier)
+        url = f"https://api-inference.huggingface.co/models/{model}"
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        # Simple prompt formatting for Llama 3
+        full_prompt = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n{system_prompt}<|eot_id|>"
+
+        if history:
+            for msg in history:
+                role = "user" if msg['role'] == "user" else "assistant"
+                full_prompt += f"<|start_header_id|>{role}<|end_header_id|>\n\n{msg['content']}<|eot_id|>"
+
+        full_prompt += f"<|start_header_id|>user<|end_header_id|>\n\n{text}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
+
+        payload = {
+            "inputs": full_prompt,
+            "parameters": {
+                "max_new_tokens": 1024,
+                "return_full_text": False,
+                "temperature": 0.7
+            }
+        }
+
+        async with self.session().post(url, headers=headers, json=payload, timeout=self.timeout()) as response:
+            self.provider.limiter.observe("huggingface", api_key, response.status, response.headers)
+            if response.status == 200:
+                data = await response.json()
+                if isinstance(data, list) and len(data) > 0:
+                    return data[0]['generated_text']
+                elif isinstance(data, dict) and 'generated_text' in data:
+                    return data['generated_text']
+                else:
+                    return str(data)
+            else:
+                error_text = await response.text()
+                # Check for loading error (common in free tier)
+                if "loading" in error_text.lower():
+                     raise ValueError("Model is loading (Cold Boot). Try again in 20s.")
+                raise ValueError(f"Hugging Face Error {response.status}: {error_text}")
+
+
+class OllamaBackend(ProviderBackend):
+    """
+    Local Ollama server (/api/chat). No network round trip and no quota;
+    works offline as long as the model has been pulled.
+    """
+    name = "ollama"
+    label = "Ollama (Local)"
+    auto_label = "SpecsAI (Local Core)"
+    streams = True
+
+    @property
+    def settings(self):
+        return self.provider.ollama
+
+    def available(self):
+        return self.provider.local_enabled
+
+    def unavailable_reason(self):
+        return "The local Ollama tier is turned off."
+
+    def _payload(self, text, system_prompt, history, tier, stream):
+        return {
+            "model": self.model(tier) or self.settings["model"],
+            "messages": openai_messages(text, system_prompt, history),
+            "stream": stream,
+            "keep_alive": self.settings["keep_alive"],  # Keep the model resident between turns
+            "options": {"temperature": 0.7, "num_predict": 1024, "num_ctx": self.settings["num_ctx"]},
+        }
+
+    async def query(self, text, system_prompt, history, tier=LARGE):
+        url = f"{self.settings['url']}/api/chat"
+        router = self.provider.router
+        start = time.monotonic()
+        async with self.session().post(url, json=self._payload(text, system_prompt, history, tier, stream=False),
+                                       timeout=self.timeout()) as response:
+            if response.status == 200:
+                data = await response.json()
+                router.record(self.name, tier, time.monotonic() - start)
+                return data['message']['content']
+            else:
+                error_text = await response.text()
+                router.record(self.name, tier, ok=False)
+                raise ValueError(f"Ollama Error {response.status}: {error_text}")
+
+    async def stream(self, text, system_prompt, history, tier=LARGE):
+        """Newline-delimited JSON, one message delta per line"""
+        url = f"{self.settings['url']}/api/chat"
+        router = self.provider.router
+        start = time.monotonic()
+        first = True
+        async with self.session().post(url, json=self._payload(text, system_prompt, history, tier, stream=True),
+                                       timeout=self.timeout()) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                router.record(self.name, tier, ok=False)
+                raise ValueError(f"Ollama Error {response.status}: {error_text}")
+            async for event in iter_ndjson(response):
+                if event.get("error"):
+                    raise ValueError(f"Ollama Error: {event['error']}")
+                delta = event.get("message", {}).get("content")
+                if delta:
+                    if first:
+                        router.record(self.name, tier, time.monotonic() - start)
+                        first = False
+                    yield delta
+                if event.get("done"):
+                    break
+
+    async def prewarm(self):
+        """Loads the local model into memory (a request without a prompt) so the first turn skips the disk load."""
+        if not self.settings["warmup"]:
+            return
+        url = f"{self.settings['url']}/api/generate"
+        payload = {"model": self.settings["model"], "keep_alive": self.settings["keep_alive"]}
+        start = time.monotonic()
+        try:
+            async with self.session().post(
+                url, json=payload, timeout=aiohttp.ClientTimeout(total=self.settings["warmup_timeout"])
+            ) as response:
+                if response.status != 200:
+                    raise ValueError(f"Ollama Error {response.status}: {await response.text()}")
+                await response.read()
+            self.logger.info(f"Ollama model {self.settings['model']} loaded in {time.monotonic() - start:.1f}s")
+        except Exception as e:
+            self.logger.debug(f"Ollama warm-up failed: {e}")
+
+
+_BACKENDS = {
+    "groq": GroqBackend,
+    "sambanova": SambanovaBackend,
+    "gemini": GeminiBackend,
+    "claude": ClaudeBackend,
+    "huggingface": HuggingFaceBackend,
+    "ollama": OllamaBackend,
+}
+
+
+def register_backend(name, backend_class):
+    _BACKENDS[name] = backend_class
+
+
+def backend_names():
+    return list(_BACKENDS)
+
+
+def key_env_vars():
+    """{backend name: environment variable with its API key(s)} for every registered backend that needs a key."""
+    return {name: backend_class.key_env for name, backend_class in _BACKENDS.items() if backend_class.key_env}
+
+
+def create_backend(name, provider):
+    """Backend instance by registered name for an AIProvider, or None if unknown."""
+    backend_class = _BACKENDS.get(name)
+    return backend_class(provider) if backend_class else None
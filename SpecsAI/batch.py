@@ -0,0 +1,122 @@
+"""
+SpecsAI Batch Generation
+Replays prompt sets (persona tuning, Banglish regression sets) through the engine with bounded
+concurrency on the shared loop and pooled connections. Every request still goes through the
+rate-limit buckets. Results are appended to a JSONL file as they finish, so an interrupted run
+resumes where it stopped (a half-finished conversation gets its earlier turns back from the file).
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from .deadline import Deadline
+from .memory import SpecsMemory
+
+
+def normalize_items(prompts):
+    """
+    Prompts may be strings or dicts {"prompt", "id"?, "role"?, "provider"?, "session"?}.
+    Items without an id get their position, so reruns of the same list line up for resume.
+    """
+    items = []
+    for index, item in enumerate(prompts):
+        if isinstance(item, str):
+            item = {"prompt": item}
+        item = dict(item)
+        item["id"] = str(item.get("id", index))
+        items.append(item)
+    return items
+
+
+def load_records(path):
+    """Records answered without error in an earlier (possibly interrupted) run, by id."""
+    records = {}
+    if not path or not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a crash
+            if not record.get("error"):
+                records[str(record.get("id"))] = record
+    return records
+
+
+class BatchRunner:
+    def __init__(self, engine, concurrency=4, output_path=None, provider="auto", role="default",
+                 retries=2, timeout=120.0):
+        self.engine = engine
+        self.concurrency = max(1, int(concurrency))
+        self.output_path = output_path
+        self.provider = provider
+        self.role = role
+        self.retries = retries
+        self.timeout = timeout
+        self.run_id = uuid.uuid4().hex[:8]
+        self.stats = {"completed": 0, "failed": 0, "skipped": 0}
+
+    async def run(self, prompts, resume=True):
+        items = normalize_items(prompts)
+        done = load_records(self.output_path) if resume else {}
+        pending = [item for item in items if item["id"] not in done]
+        self.stats["skipped"] = len(items) - len(pending)
+
+        # Prompts sharing a "session" are one conversation: run in order by one worker.
+        # Turns answered in an earlier run are replayed into the history instead of asked again.
+        groups = {}
+        for item in items:
+            groups.setdefault(item.get("session") or f"_item-{item['id']}", []).append(item)
+        groups = {key: group for key, group in groups.items() if any(item["id"] not in done for item in group)}
+
+        slots = asyncio.Semaphore(self.concurrency)
+        results = []
+        output = open(self.output_path, "a", encoding="utf-8") if self.output_path else None
+        start = time.monotonic()
+        try:
+            async def run_group(key, group):
+                async with slots:
+                    session = self.engine.session(f"_batch-{self.run_id}-{key}", memory=SpecsMemory(None))
+                    session.use_cache = False  # Evaluation must hit the model, not the response cache
+                    try:
+                        for item in group:
+                            if item["id"] in done:
+                                previous = done[item["id"]]
+                                await asyncio.wrap_future(session.record_turn(previous["prompt"], previous["response"]))
+                                continue
+                            record = await self._run_item(session, item)
+                            results.append(record)
+                            if output:
+                                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                                output.flush()
+                    finally:
+                        self.engine.close_session(session.id)
+
+            await asyncio.gather(*(run_group(key, group) for key, group in groups.items()))
+        finally:
+            if output:
+                output.close()
+        order = {item["id"]: i for i, item in enumerate(items)}
+        results.sort(key=lambda r: order[r["id"]])
+        return {"results": results, "elapsed": round(time.monotonic() - start, 3), **self.stats}
+
+    async def _run_item(self, session, item):
+        provider = item.get("provider", self.provider)
+        role = item.get("role", self.role)
+        record = {"id": item["id"], "prompt": item["prompt"]}
+        for attempt in range(self.retries + 1):
+            start = time.monotonic()
+            response = await session.agenerate(item["prompt"], provider=provider, role=role,
+                                               deadline=Deadline(self.timeout))
+            record.update(response=response, error=session.last_error, attempts=attempt + 1,
+                          latency=round(time.monotonic() - start, 3))
+            if not session.last_error or attempt == self.retries:
+                break
+            # A failed turn leaves nothing useful in the conversation; retry it cleanly
+            await asyncio.wrap_future(session.rollback_turn(item["prompt"]))
+            # Mostly rate limits: wait until some provider's bucket has room again
+            await asyncio.sleep(max(1.0, self.engine.provider.wait_time()))
+        self.stats["failed" if record["error"] else "completed"] += 1
+        return record
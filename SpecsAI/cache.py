@@ -0,0 +1,206 @@
+"""
+SpecsAI Response Cache
+Answers repeated small talk ("hi", "kemon acho", "what's your name") from disk in milliseconds
+instead of paying a full LLM round trip.
+Two tiers: exact match on normalized text (LRU + TTL) and an optional semantic tier
+(cosine similarity over hashed character n-gram embeddings, needs numpy).
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from .config import SpecsConfig
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Answers that go stale within minutes: clock, calendar, weather, news (English + Banglish)
+_TIME_SENSITIVE = re.compile(
+    r"\b(time|date|day|today|tonight|tomorrow|yesterday|now|weather|news|latest|current|score|"
+    r"baje|somoy|shomoy|tarikh|aaj|aj|ajke|kal|kalke|ekhon|abohawa)\b"
+)
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace so 'Hi!!' and 'hi' share a key."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    def __init__(self, storage_path="specs_cache.json", settings=None):
+        settings = dict(SpecsConfig.RESPONSE_CACHE, **(settings or {}))
+        self.storage_path = storage_path
+        self.max_entries = settings["max_entries"]
+        self.ttl = settings["ttl"]
+        self.threshold = settings["threshold"]
+        self.dim = settings["dim"]
+        self.max_prompt_words = settings["max_prompt_words"]
+        self.context_messages = settings["context_messages"]
+        self.semantic = settings["semantic"] and np is not None
+        self.save_delay = settings["save_delay"]
+        self.logger = logging.getLogger("SpecsAI.Cache")
+        self._lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> {"text", "scope", "response", "created"}
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self._matrix = None  # Stacked embeddings, rebuilt lazily
+        self._matrix_keys = []
+        self._dirty = False
+        self._save_timer = None
+        self._save_lock = threading.Lock()  # One writer at a time (timer vs. shutdown)
+        self._load()
+
+    # --- Keys & Embeddings ---
+
+    @staticmethod
+    def _key(scope, norm):
+        return f"{scope}\x1f{norm}"
+
+    def _embed(self, norm):
+        """Hashed character 3-gram embedding (L2-normalized)."""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        padded = f" {norm} "
+        for i in range(len(padded) - 2):
+            vec[zlib.crc32(padded[i:i + 3].encode("utf-8")) % self.dim] += 1.0
+        norm_len = np.linalg.norm(vec)
+        return vec / norm_len if norm_len else vec
+
+    def cacheable(self, text):
+        """
+        Only short, self-contained turns are worth caching (long ones depend on context);
+        questions about the time, date, weather or news never are.
+        """
+        norm = normalize_text(text)
+        words = norm.split()
+        return 0 < len(words) <= self.max_prompt_words and not _TIME_SENSITIVE.search(norm)
+
+    # --- Lookup ---
+
+    def get(self, text, scope):
+        """
+        scope: string combining everything that changes the answer besides the text
+               (role + memory-context hash + recent-history hash). Returns the cached response or None.
+        """
+        norm = normalize_text(text)
+        now = time.time()
+        with self._lock:
+            key = self._key(scope, norm)
+            entry = self.entries.get(key)
+            if entry and now - entry["created"] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry["response"]
+
+            if self.semantic and self.entries:
+                match = self._semantic_lookup(norm, scope, now)
+                if match:
+                    self.entries.move_to_end(match)
+                    self.hits["semantic"] += 1
+                    return self.entries[match]["response"]
+
+            self.misses += 1
+            return None
+
+    def _semantic_lookup(self, norm, scope, now):
+        if self._matrix is None:
+            self._matrix_keys = list(self.entries.keys())
+            self._matrix = np.stack([self._embed(self.entries[k]["text"]) for k in self._matrix_keys])
+        scores = self._matrix @ self._embed(norm)
+        for idx in np.argsort(-scores):
+            if scores[idx] < self.threshold:
+                break
+            key = self._matrix_keys[idx]
+            entry = self.entries.get(key)
+            if entry and entry["scope"] == scope and now - entry["created"] < self.ttl:
+                return key
+        return None
+
+    # --- Store ---
+
+    def put(self, text, scope, response):
+        norm = normalize_text(text)
+        with self._lock:
+            key = self._key(scope, norm)
+            self.entries[key] = {"text": norm, "scope": scope, "response": response, "created": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._matrix = None
+        self._schedule_save()
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._matrix = None
+        self._schedule_save()
+
+    def stats(self):
+        lookups = self.hits["exact"] + self.hits["semantic"] + self.misses
+        return {
+            "entries": len(self.entries),
+            "exact_hits": self.hits["exact"],
+            "semantic_hits": self.hits["semantic"],
+            "misses": self.misses,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            "semantic_enabled": self.semantic,
+        }
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not self.storage_path or not os.path.exists(self.storage_path):
+            return
+        try:
+            with open(self.storage_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            for key, entry in data.get("entries", []):
+                if now - entry.get("created", 0) < self.ttl:
+                    self.entries[key] = entry
+        except Exception as e:
+            self.logger.warning(f"Could not load response cache: {e}")
+
+    def _schedule_save(self):
+        """
+        Batches writes on a timer thread: put() runs on the engine's event loop, and rewriting
+        the file there would stall every stream in flight. The engine flushes on shutdown.
+        """
+        if not self.storage_path:
+            return
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def save(self):
+        """Writes pending changes now (no-op when nothing changed since the last write)."""
+        if not self.storage_path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                data = {"entries": list(self.entries.items())}
+            try:
+                temp_path = self.storage_path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.storage_path)
+            except Exception as e:
+                self.logger.warning(f"Could not save response cache: {e}")
+                with self._lock:
+                    self._dirty = True
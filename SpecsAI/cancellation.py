@@ -0,0 +1,44 @@
+"""
+SpecsAI Cancellation
+One token per conversation turn. Cancelling it aborts the in-flight provider request
+(the asyncio task is cancelled, which closes its aiohttp response) and tells every other
+stage holding the same token (TTS queue, file searches) to drop its work.
+"""
+import threading
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Idempotent and thread-safe; runs registered callbacks exactly once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[SpecsAI] Cancel callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """Registers callback(); runs it immediately if the token is already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def bind(self, future):
+        """Cancels a concurrent/asyncio future (e.g. from BackgroundLoop.submit) with this token."""
+        self.on_cancel(future.cancel)
+        return future
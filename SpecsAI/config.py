@@ -7,7 +7,207 @@ class SpecsConfig:
     NAME = "SpecsAI"
     FOUNDER = "Specs_XR (XR Ratul)"
     VERSION = "1.0.0 (Core)"
-    
+
+    # Network / Connection Pooling (keep-alive sessions shared across turns)
+    HTTP_POOL = {
+        "limit": 20,             # Max open connections per provider session
+        "limit_per_host": 8,     # Max concurrent connections to one host
+        "keepalive_timeout": 75, # Seconds an idle connection stays warm
+        "dns_cache_ttl": 300,    # Seconds to cache DNS lookups
+    }
+    # Per-provider tweaks, e.g. {"huggingface": {"limit": 4}}
+    HTTP_POOL_OVERRIDES = {}
+    # Socket timeouts for every provider request (the turn deadline caps the total on top)
+    HTTP_TIMEOUTS = {
+        "connect": 3.0,          # Seconds to open a connection (DNS + TCP + TLS)
+        "sock_read": 15.0,       # Seconds without a byte from the server (also between stream chunks)
+    }
+
+    # Per-turn deadline (SpecsAI.deadline): the avatar answers within the SLA, degraded if need be
+    DEADLINE = {
+        "turn_sla": 12.0,        # Seconds from request to answer (or to the first streamed chunk)
+        "min_stage": 2.0,        # A fallback attempt never gets less than this, unless less is left
+        "reserve": 0.25,         # Seconds kept back for the degraded local answer
+        "degraded_reply": "Sorry, my thoughts are a bit slow right now. Could you ask me that again in a moment?",
+    }
+
+    # Auto Mode Strategy
+    # 'sequential': try providers one after another (each gets its full timeout)
+    # 'hedge': start the primary, launch the next one if no answer within its hedge delay
+    # 'race': fire every configured provider at once, first good answer wins
+    AUTO_STRATEGY = "hedge"
+    # Default auto-mode priority before live health re-orders it (backends in SpecsAI.backends)
+    PROVIDER_ORDER = ["groq", "sambanova", "gemini", "claude", "huggingface", "ollama"]
+    # Seconds to wait on a provider before hedging with the next one (None = never hedge past it)
+    HEDGE_DELAYS = {
+        "groq": 1.5,
+        "sambanova": 2.0,
+        "gemini": 3.0,
+        "claude": 3.0,
+        "huggingface": None,
+        "ollama": None,
+    }
+
+    # Provider Health / Circuit Breaker
+    CIRCUIT_BREAKER = {
+        "failure_threshold": 3,  # Consecutive failures before a provider's circuit opens
+        "cooldown": 120,         # Seconds an open circuit stays open before a half-open probe
+        "ewma_alpha": 0.3,       # Weight of the newest sample in latency / error-rate averages
+        "default_latency": 2.0,  # Assumed latency (s) for providers with no data yet
+    }
+
+    # Gemini Model Availability Cache
+    # Preference order; the catalog filters it by what the key can actually use
+    GEMINI_MODELS = ["gemini-2.5-flash", "gemini-1.5-flash", "gemini-1.5-flash-8b", "gemini-1.5-pro"]
+    MODEL_LIST_TTL = 24 * 3600  # Re-list the key's models once a day
+    MODEL_LIST_RETRY = 300      # After a failed listing, wait this long before asking again
+    MODEL_CACHE_SAVE_DELAY = 5.0  # Seconds model outcomes are batched before the file is rewritten
+    # How long (s) a failed model stays off the request path, by error class
+    MODEL_FAILURE_TTLS = {
+        "not_found": 24 * 3600,
+        "forbidden": 24 * 3600,
+        "rate_limited": 60,
+        "server_error": 30,
+        "network": 15,
+        "other": 300,
+    }
+
+    # Response Cache (repeated greetings / small talk)
+    RESPONSE_CACHE = {
+        "max_entries": 500,      # LRU size cap (also caps the file on disk)
+        "ttl": 6 * 3600,         # Seconds before a cached answer goes stale
+        "max_prompt_words": 8,   # Longer messages depend on context; never cached
+        "context_messages": 4,   # Recent history messages folded into the scope ("yes" answers what came before)
+        "semantic": True,        # Near-duplicate lookup (needs numpy)
+        "threshold": 0.85,       # Cosine similarity required for a semantic hit
+        "dim": 512,              # Hashed n-gram embedding size
+        "save_delay": 5.0,       # Seconds new entries wait before one batched write to disk
+    }
+
+    # Context Assembly (token budgets per provider, input side only)
+    CONTEXT = {
+        "max_messages": 20,       # Hard cap on verbatim history messages
+        "summary_tokens": 300,    # Budget for the running summary of older turns
+        "summary_line_chars": 120 # Max chars kept per summarized turn
+    }
+    CONTEXT_BUDGETS = {
+        "auto": 3000,             # Auto mode may land on any provider; stay conservative
+        "groq": 6000,
+        "sambanova": 3500,
+        "gemini": 8000,
+        "claude": 8000,
+        "huggingface": 2500,
+        "ollama": 2500,           # Local models default to a small context window
+    }
+
+    # Client-side rate limits per (provider, API key); free-tier defaults, None = unlimited
+    RATE_LIMITS = {
+        "groq": {"rpm": 30, "tpm": 6000},
+        "sambanova": {"rpm": 10, "tpm": None},
+        "gemini": {"rpm": 10, "tpm": 250000},
+        "huggingface": {"rpm": 30, "tpm": None},
+    }
+    RATE_LIMIT_WAIT = {
+        "auto": 1.0,              # Max seconds to queue for a provider before rerouting to the next one
+        "explicit": 10.0,         # Max seconds to queue when the user picked this provider
+        "default_penalty": 20.0,  # Back-off after a 429 that carried no Retry-After
+    }
+    EXPECTED_COMPLETION_TOKENS = 300  # Reserved per request in the tokens-per-minute bucket
+
+    # Vision preprocessing (SpecsAI.vision): screenshots are downscaled + JPEG-encoded once
+    VISION = {
+        "max_dimension": 1536,    # Longest side in pixels (Gemini tiles images at 768px)
+        "jpeg_quality": 80,       # Enough to read on-screen text, a fraction of the bytes of a 4K capture
+        "cache_size": 16,         # Encoded payloads memoized by content hash
+        # Answer cache: same question about a near-identical screen reuses the last analysis
+        "hash_size": 8,           # dHash grid (8 -> 64-bit perceptual hash)
+        "hash_threshold": 6,      # Max differing bits for two screens to count as the same
+        "answer_ttl": 120,        # Seconds a screen analysis stays reusable
+        "answer_cache_size": 32,
+    }
+
+    # Local OCR fast path for "read this text" screen questions (SpecsAI.ocr)
+    OCR = {
+        "backend": "tesseract",   # Registered backend name, or 'none'
+        "languages": "eng",       # Tesseract language packs, e.g. 'eng+ben'
+        "mode": "llm",            # 'llm': answer with a text model over the OCR text; 'direct': read it out
+        "min_confidence": 60,     # Words Tesseract is less sure about are dropped
+        "min_chars": 20,          # Less legible text than this -> fall back to the vision model
+        "max_chars": 4000,        # OCR text sent to the text model
+        "max_dimension": 3000,    # OCR reads near full resolution (small UI fonts)
+    }
+
+    # Small fast model for simple turns, large model for complex ones (SpecsAI.routing)
+    MODEL_ROUTES = {
+        "groq": {"small": "llama-3.1-8b-instant", "large": "llama-3.3-70b-versatile"},
+        "sambanova": {"small": "Meta-Llama-3.1-8B-Instruct", "large": "Meta-Llama-3.1-70B-Instruct"},
+        "claude": {"small": "claude-3-haiku-20240307", "large": "claude-3-5-sonnet-20240620"},
+        "huggingface": {"large": "meta-llama/Meta-Llama-3-8B-Instruct"},
+    }
+    MODEL_ROUTING = {
+        "mode": "auto",           # auto (score each turn), small, large (always that tier)
+        "threshold": 0.55,        # Complexity score at or above which the large model is used
+        "long_words": 40,         # Word count that counts as a long prompt
+        "deep_history": 12,       # Messages of history beyond which context is 'deep'
+        "weights": {"length": 0.3, "code": 0.6, "reasoning": 0.4, "math": 0.3, "command": 0.1, "history": 0.2},
+    }
+
+    # Several API keys per provider (AIProvider key pools)
+    KEY_POOL = {
+        "strategy": "least_loaded",    # or 'round_robin'
+        "quarantine_quota": 900,       # Seconds a key sits out after its daily quota is exhausted
+        "quarantine_rate": 60,         # ... after a per-minute 429 that names no retry delay
+        "quarantine_invalid": 3600,    # Seconds a rejected (401/403) key sits out
+    }
+
+    # Local LLM via Ollama: last-resort tier in auto mode, first while the network is down
+    OLLAMA = {
+        "url": "http://localhost:11434",
+        "model": "llama3",
+        "priority": "fallback",   # 'fallback' (after cloud providers), 'first' (local-first) or 'off'
+        "keep_alive": "30m",      # How long Ollama keeps the model loaded after a request
+        "warmup": True,           # Load the model into memory at startup
+        "warmup_timeout": 120,    # Seconds allowed for loading the model from disk
+        "num_ctx": 4096,          # Context window requested from Ollama
+        "offline_recheck": 30,    # Seconds local-first stays on after a cloud provider was unreachable
+    }
+
+    # Draft-then-refine voice turns (SpecsAI.speculative): a small model speaks the opening sentence
+    SPECULATIVE = {
+        "enabled": False,
+        "draft_providers": ["groq", "sambanova"],  # Tried in order; need a distinct small model
+        "compatibility": 0.3,     # Word overlap at which the main model's own opening counts as the same
+        "continue_prompt": (
+            "You have already started your reply with: \"{opening}\"\n"
+            "Continue from there without repeating it."
+        ),
+    }
+
+    # Conversation sessions (SpecsEngine.session)
+    SESSIONS = {
+        "max_history": 200,       # Raw messages kept per session (older ones live in the summary)
+        "max_sessions": 256,      # Idle sessions beyond this are evicted, least recently used first
+    }
+
+    # Local OpenAI-compatible server (python -m SpecsAI.server)
+    SERVER = {
+        "host": "127.0.0.1",
+        "port": 8765,
+        "max_concurrent": 8,      # Turns generated at the same time
+        "max_queue": 32,          # Requests allowed to wait for a slot; beyond this -> 429
+        "queue_timeout": 30,      # Seconds a request may wait in the queue
+        "memory_dir": "specs_sessions", # Per-session SpecsMemory files
+    }
+
+    # Base URLs hit once at startup to pre-warm pooled connections
+    PROVIDER_ENDPOINTS = {
+        "groq": "https://api.groq.com",
+        "gemini": "https://generativelanguage.googleapis.com",
+        "sambanova": "https://api.sambanova.ai",
+        "huggingface": "https://api-inference.huggingface.co",
+        "claude": "https://api.anthropic.com",
+    }
+
     # The "Soul" of SpecsAI - Immutable Identity
     SYSTEM_PROMPT = (
         "You are SpecsAI, the world's most advanced, human-like AI companion created by 'Specs_XR' (Founder: XR Ratul). "
@@ -29,13 +229,16 @@ class SpecsConfig:
     - Always use Bangla script for Bangla/Banglish inputs. For English inputs, reply in English.
     """
 
-    CAPABILITIES_PROMPT = """
+    # Capabilities are split into blocks so the prompt composer can send only what a turn needs.
+    CAPABILITIES_CORE = """
     System Capabilities Awareness:
     - You have full control over the PC environment (A to Z access).
     - You can open apps, play music, change wallpapers, take screenshots, manage files, and SEARCH for any file.
     - You can save ANY type of data (notes, code, chat, clipboard) into the "SpecsAI Data" system.
     - When a user asks for an action, assume you CAN do it and confirm execution.
-    
+    """
+
+    COMMAND_RULES = """
     CRITICAL INSTRUCTION - "Pagol" Mode (Fuzzy Understanding):
     - The user may speak incoherently, use slang, mix languages (Banglish/English), or be vague.
     - You MUST try to guess their intent even if the grammar is broken or "crazy".
@@ -45,13 +248,17 @@ class SpecsConfig:
     - If they say "gan shona", it means [EXECUTE: play music].
     - NEVER say "I don't understand" unless it's complete gibberish. ALWAYS try to map to an action.
     - IMPORTANT: If the user asks to OPEN a specific folder or file by name (e.g. "open aspects folder"), use [EXECUTE: open <name>]. The system will automatically search for it if it's not an app.
+    """
 
+    VISION_RULES = """
     CRITICAL INSTRUCTION - VISION / SCREEN AWARENESS:
     - If the user asks "What is on my screen?", "Read this text", "Describe the image", "Look at this", or "Screen e ki lekha ache?":
     - You CANNOT see the screen immediately. You MUST request a vision analysis first.
     - Reply with: "Let me check... [EXECUTE: analyze_screen]"
     - The system will then show you the screen content, and you can answer the question in the NEXT turn.
+    """
 
+    COMMAND_REFERENCE = """
     - Tag Format: [EXECUTE: <command>]
     - Supported Commands:
     - open <app_name>
@@ -62,7 +269,9 @@ class SpecsConfig:
     - search for <filename/query>
     - system info
     - shutdown / restart
-    
+    """
+
+    COMMAND_EXAMPLES = """
     - Examples:
     - User: "Chrome ta khule dao" -> Response: "Sure, opening Chrome for you. [EXECUTE: open chrome]"
     - User: "Gaan bajao" -> Response: "Playing music! [EXECUTE: play music]"
@@ -73,7 +282,44 @@ class SpecsConfig:
     - User: "Amr resume file ta khuje ber koro" -> Response: "Searching for your resume. [EXECUTE: search for resume]"
     - User: "Amar screen e ki ache?" -> Response: "Dekhchi... [EXECUTE: analyze_screen]"
     """
-    
+
+    # Full block (legacy / get_full_system_prompt)
+    CAPABILITIES_PROMPT = CAPABILITIES_CORE + COMMAND_RULES + VISION_RULES + COMMAND_REFERENCE + COMMAND_EXAMPLES
+
+    # One-liner used on chit-chat turns instead of the full capabilities block
+    CAPABILITIES_BRIEF = (
+        "You live on the user's PC and can act on it. If the user asks for a PC action, "
+        "include a tag like [EXECUTE: open chrome]; for screen questions use [EXECUTE: analyze_screen]."
+    )
+
+    # Used when a screenshot is already attached to the turn
+    SCREEN_RULES = (
+        "The user's current screen is attached to this message. "
+        "Answer their question directly from what you see; do not ask to analyze the screen again."
+    )
+
+    # Local intent hints for the prompt composer (whole-word match on lowercased input)
+    PROMPT_TIER_KEYWORDS = {
+        "vision": [
+            "screen", "screenshot e", "read this", "describe the image", "look at this", "what do you see",
+            "ki lekha", "dekho", "dekhao", "chobi ta", "image", "picture", "স্ক্রিন", "দেখো",
+        ],
+        "command": [
+            "open", "launch", "start", "close", "khulo", "khule", "chalu", "on kor", "on koro", "off kor", "off koro", "bondho",
+            "play", "bajao", "gan", "gaan", "song", "music", "next", "previous", "volume", "mute",
+            "screenshot", "folder", "file", "search", "khuje", "find", "create", "save", "banao",
+            "shutdown", "restart", "sleep", "lock", "system info", "youtube", "spotify", "whatsapp",
+            "execute", "খুলুন", "চালু", "বন্ধ", "বাজান",
+        ],
+    }
+    # Common Banglish words (Latin script) that trigger the language rules
+    BANGLISH_WORDS = {
+        "ami", "amar", "amr", "tumi", "tomar", "apni", "apnar", "kemon", "acho", "achen", "ache", "achi",
+        "ki", "keno", "ken", "kothay", "koi", "koro", "kor", "korbo", "koren", "na", "hae", "hya",
+        "bhalo", "valo", "bolo", "dao", "nao", "ta", "te", "er", "ar", "ekta", "kichu", "khub", "shuvo",
+        "ratri", "sokal", "dhonnobad", "accha", "thik", "ase", "nai", "hobe", "jabo", "khabo",
+    }
+
     # AI Personas / Roles
     ROLES = {
         "default": "Role: Helpful Assistant & Mature Companion. Balance professionalism with warmth. Be reliable and smart.",
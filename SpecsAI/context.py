@@ -0,0 +1,136 @@
+"""
+SpecsAI Context Builder
+Fits the prompt into a per-provider token budget: newest turns go in verbatim,
+older turns are folded into a short running summary instead of being resent every turn.
+"""
+import re
+from .config import SpecsConfig
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate without a tokenizer.
+    Latin text averages ~4 chars/token; Bangla and other non-ASCII scripts tokenize
+    much worse (~1 token per 1-2 chars), so they are counted more heavily.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    ascii_chars = len(text) - non_ascii
+    return ascii_chars // 4 + (non_ascii * 2) // 3 + 1
+
+
+def _message_tokens(message):
+    return estimate_tokens(message["content"]) + 4  # Role / formatting overhead
+
+
+def summarize_turn(message, max_chars=None):
+    """One-line extractive summary of a turn: first sentence, actions stripped."""
+    max_chars = max_chars or SpecsConfig.CONTEXT["summary_line_chars"]
+    text = re.sub(r'\*.*?\*', '', message["content"])
+    text = re.sub(r'\[EXECUTE:.*?\]', '', text)
+    text = " ".join(text.split())
+    first = re.split(r'(?<=[.!?।])\s', text, maxsplit=1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars].rstrip() + "..."
+    speaker = "User" if message["role"] == "user" else "SpecsAI"
+    return f"{speaker}: {first}" if first else ""
+
+
+class ContextBuilder:
+    """
+    One builder per conversation. Tracks how much of the history has already been
+    folded into the summary so every turn is summarized exactly once.
+    summary_store: optional object with get_conversation_summary() / set_conversation_summary(lines)
+                   (e.g. MemoryService) so the running summary survives restarts.
+    """
+    def __init__(self, budgets=None, summary_store=None):
+        self.settings = dict(SpecsConfig.CONTEXT)
+        self.budgets = dict(SpecsConfig.CONTEXT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.summary_store = summary_store
+        self.summary_lines = list(summary_store.get_conversation_summary()) if summary_store else []
+        self.folded = 0  # Number of history messages already folded into the summary
+
+    def budget_for(self, provider):
+        return self.budgets.get(provider, self.budgets["auto"])
+
+    def build(self, history, system_prompt, text, provider="auto"):
+        """
+        history: prior messages (not including the current user text).
+        Returns (context_history, system_prompt_with_summary).
+        """
+        budget = self.budget_for(provider)
+        used = estimate_tokens(system_prompt) + estimate_tokens(text) + estimate_tokens(self._summary_block())
+
+        # Newest first, until the budget or the message cap runs out
+        window = []
+        max_messages = self.settings["max_messages"]
+        for message in reversed(history[self.folded:]):
+            cost = _message_tokens(message)
+            if len(window) >= max_messages or used + cost > budget:
+                break
+            window.append(message)
+            used += cost
+        window.reverse()
+        # Start on a user turn (some providers reject a history that opens with the model)
+        while window and window[0]["role"] != "user":
+            window.pop(0)
+
+        # Everything older than the window (and not yet folded) goes into the summary. The
+        # summary then costs tokens too: drop the oldest window turns until it all fits again.
+        while True:
+            window_start = len(history) - len(window)
+            if window_start > self.folded:
+                self._fold(history[self.folded:window_start])
+                self.folded = window_start
+            used = estimate_tokens(system_prompt) + estimate_tokens(text) + estimate_tokens(self._summary_block()) \
+                + sum(_message_tokens(message) for message in window)
+            if used <= budget or not window:
+                break
+            window.pop(0)
+            while window and window[0]["role"] != "user":
+                window.pop(0)
+
+        summary = self._summary_block()
+        if summary:
+            system_prompt = f"{system_prompt}\n\n{summary}"
+        return window, system_prompt
+
+    def discard(self, history, count):
+        """
+        Called before the owner drops history[:count]: folds any of those messages that
+        weren't summarized yet and shifts the folded index so it stays aligned.
+        """
+        if count > self.folded:
+            self._fold(history[self.folded:count])
+            self.folded = count
+        self.folded -= count
+
+    def truncate(self, length):
+        """Called after the owner drops messages from the end (a rolled-back turn): keeps the folded index inside."""
+        self.folded = min(self.folded, length)
+
+    def _fold(self, messages):
+        new_lines = [line for line in (summarize_turn(m) for m in messages) if line]
+        if not new_lines:
+            return
+        self.summary_lines.extend(new_lines)
+        # Keep the summary itself inside its own budget (drop the oldest lines first)
+        while len(self.summary_lines) > 1 and \
+                estimate_tokens("\n".join(self.summary_lines)) > self.settings["summary_tokens"]:
+            self.summary_lines.pop(0)
+        if self.summary_store:
+            self.summary_store.set_conversation_summary(self.summary_lines)
+
+    def _summary_block(self):
+        if not self.summary_lines:
+            return ""
+        return "[EARLIER IN THIS CONVERSATION]\n- " + "\n- ".join(self.summary_lines)
+
+    def reset(self):
+        self.summary_lines = []
+        self.folded = 0
+        if self.summary_store:
+            self.summary_store.set_conversation_summary([])
@@ -0,0 +1,95 @@
+"""
+SpecsAI Deadlines
+A per-turn time budget handed from the UI down to every provider call. Fallback attempts get a
+share of what is left instead of their own full timeout, each stage records the time it used,
+and whatever happens the turn answers within the SLA (degraded if it has to).
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+import aiohttp
+from .config import SpecsConfig
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage, budget):
+        super().__init__(f"{stage} exceeded its {budget:.1f}s budget")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    def __init__(self, budget=None, settings=None):
+        """budget: Seconds for the whole turn (defaults to SpecsConfig.DEADLINE['turn_sla'])."""
+        self.settings = dict(SpecsConfig.DEADLINE, **(settings or {}))
+        self.budget = float(budget if budget is not None else self.settings["turn_sla"])
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.budget
+        self.stages = []  # (name, seconds used, seconds granted or None)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def usable(self):
+        """Time left for provider work (the reserve is kept for a degraded answer)."""
+        return max(0.0, self.remaining() - self.settings["reserve"])
+
+    def share(self, attempts=1):
+        """
+        Budget for the next of `attempts` remaining fallback attempts: an even split of what's
+        left, but never less than min_stage unless less than that is left at all.
+        """
+        usable = self.usable()
+        return min(usable, max(usable / max(1, attempts), self.settings["min_stage"]))
+
+    def client_timeout(self, budget=None, stream=False):
+        """
+        aiohttp timeout for one request that also respects the turn deadline.
+        stream: No total limit (the answer may outlive the budget once it's flowing); connecting
+                and each read still have to fit in it.
+        """
+        timeouts = SpecsConfig.HTTP_TIMEOUTS
+        total = self.usable() if budget is None else min(budget, self.usable())
+        return aiohttp.ClientTimeout(total=None if stream else total, connect=min(total, timeouts["connect"]),
+                                     sock_read=min(total, timeouts["sock_read"]))
+
+    def record(self, name, seconds, granted=None):
+        self.stages.append((name, seconds, granted))
+
+    @contextmanager
+    def stage(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    async def run(self, name, coro, budget=None):
+        """Awaits coro within budget (default: all usable time). Raises DeadlineExceeded on timeout."""
+        budget = self.usable() if budget is None else min(budget, self.usable())
+        start = time.monotonic()
+        try:
+            return await asyncio.wait_for(coro, budget)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(name, budget) from None
+        finally:
+            self.record(name, time.monotonic() - start, budget)
+
+    def report(self):
+        """Per-stage time used, also as a fraction of the turn budget."""
+        return {
+            "budget": self.budget,
+            "elapsed": round(self.elapsed(), 3),
+            "stages": [
+                {"stage": name, "seconds": round(seconds, 3), "granted": None if granted is None else round(granted, 3),
+                 "budget_used": round(seconds / self.budget, 3) if self.budget else None}
+                for name, seconds, granted in self.stages
+            ],
+        }
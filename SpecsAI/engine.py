@@ -2,79 +2,264 @@
 SpecsAI Engine (Main Interface)
 The brain of the operation. This is what external apps should import.
 """
-import threading
 import asyncio
-import os
+import concurrent.futures
+import hashlib
+import threading
+from collections import OrderedDict
 from .config import SpecsConfig
 from .providers import AIProvider
 from .memory import SpecsMemory
+from .network import BackgroundLoop, SessionPool
+from .health import HealthRegistry
+from .cache import ResponseCache
+from .prompts import PromptComposer
+from .batch import BatchRunner
+from .ratelimit import RateLimiter
+from .session import SpecsSession
+from .speculative import SpeculativeResponder
 
 class SpecsEngine:
-    def __init__(self, api_keys=None, storage_path=None):
+    def __init__(self, api_keys=None, storage_path=None, pool_limits=None, prewarm=True,
+                 auto_strategy=None, hedge_delays=None, health_path="specs_health.json",
+                 model_cache_path="specs_models.json", cache_path="specs_cache.json", response_cache=True,
+                 context_budgets=None, summary_store=None, rate_limits=None, key_strategy=None,
+                 model_routing=None, model_routes=None, ocr=None, ocr_settings=None, ollama=None,
+                 speculative=None):
         """
         Initialize SpecsAI Engine.
-        api_keys: Dict containing 'groq', 'gemini', 'claude', 'openai' keys.
+        api_keys: Dict containing 'groq', 'gemini', 'claude', 'openai' keys (a list per provider pools several keys).
         storage_path: Path to save memory/history (optional).
+        pool_limits: Optional overrides for SpecsConfig.HTTP_POOL (connection limits / keep-alive).
+        prewarm: Open provider connections at startup so the first turn is already warm.
+        auto_strategy / hedge_delays: How auto mode fans out across providers (see SpecsConfig.AUTO_STRATEGY).
+        health_path: Where provider health / circuit-breaker state is persisted.
+        model_cache_path: Where per-key Gemini model availability is cached.
+        cache_path / response_cache: Disk-backed cache for repeated small talk (exact + semantic tiers).
+        context_budgets: Per-provider input token budgets (overrides SpecsConfig.CONTEXT_BUDGETS).
+        summary_store: Where the rolling summary of the default session is kept (e.g. MemoryService).
+        rate_limits: Per-provider rpm / tpm overrides for SpecsConfig.RATE_LIMITS.
+        key_strategy: How requests are spread over pooled keys ('least_loaded' or 'round_robin').
+        model_routing / model_routes: Small-vs-large model routing mode and per-provider models (see SpecsAI.routing).
+        ocr / ocr_settings: Local OCR backend (instance or name, 'none' disables) for text-reading screen questions.
+        ollama: Local Ollama tier overrides for SpecsConfig.OLLAMA (url, model, priority 'fallback' / 'first' / 'off').
+        speculative: Draft-then-refine streaming (a small model speaks the opening sentence while the
+                     main model answers); defaults to SpecsConfig.SPECULATIVE['enabled'].
         """
         self.api_keys = api_keys or {}
         self.memory = SpecsMemory(storage_path if storage_path else "specs_memory.json")
-        self.provider = AIProvider(self.api_keys)
-        self.history = [] # Runtime chat history
         
-    def generate_response(self, text, callback=None, provider="auto", image_data=None, role="default"):
+        # One long-lived loop for every request (no per-turn thread + asyncio.run)
+        self._loop = BackgroundLoop()
+        self._closed = False
+        self.pool = SessionPool(limits=pool_limits)
+        self.health = HealthRegistry.shared(health_path)
+        self.provider = AIProvider(self.api_keys, pool=self.pool, health=self.health,
+                                   auto_strategy=auto_strategy, hedge_delays=hedge_delays,
+                                   model_cache_path=model_cache_path, limiter=RateLimiter(rate_limits),
+                                   key_strategy=key_strategy, model_routing=model_routing,
+                                   model_routes=model_routes, ocr=ocr, ocr_settings=ocr_settings, ollama=ollama)
+        self.speculative = SpeculativeResponder(self.provider, enabled=speculative)
+        self.cache = ResponseCache(cache_path) if response_cache else None
+        self.prompts = PromptComposer()
+        
+        # Conversations: each session has its own history / summary; 'default' serves the
+        # classic single-user API (generate_response, generate_stream, ...)
+        self.context_budgets = context_budgets
+        self.max_sessions = SpecsConfig.SESSIONS["max_sessions"]
+        self.sessions = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self.default_session = self.session("default", summary_store=summary_store)
+        
+        if prewarm:
+            self._loop.submit(self.provider.prewarm())
+
+    def shutdown(self):
+        """Closes pooled connections, flushes health / cache / memory and stops the background loop (once)."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._loop.run(self.provider.close(), timeout=5)
+        except Exception as e:
+            print(f"[SpecsAI] Shutdown warning: {e}")
+        self.health.save()
+        if self.cache:
+            self.cache.save()
+        with self._sessions_lock:
+            sessions, self.sessions = list(self.sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
+        self.memory.close()
+        self._loop.stop()
+        
+    # --- Sessions ---
+
+    def session(self, session_id="default", memory=None, summary_store=None):
+        """
+        Returns the conversation with this id, creating it on first use.
+        memory: optional SpecsMemory for this session (defaults to the engine's shared memory);
+                the session owns it and closes it when the session is closed or evicted.
+        """
+        evicted = []
+        with self._sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = SpecsSession(self, session_id, memory=memory, summary_store=summary_store,
+                                       context_budgets=self.context_budgets)
+                self.sessions[session_id] = session
+                evicted = self._evict_idle()
+            self.sessions.move_to_end(session_id)
+        for old in evicted:
+            old.close()
+        return session
+
+    def close_session(self, session_id):
+        with self._sessions_lock:
+            session = self.sessions.pop(session_id, None)
+        if session:
+            session.close()
+
+    def _evict_idle(self):
+        """Drops sessions beyond max_sessions (caller holds the lock) and returns them for closing."""
+        # Least recently used first; the default session and sessions mid-turn are kept
+        evicted = []
+        for session_id in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            session = self.sessions[session_id]
+            if session_id != "default" and not session.busy:
+                evicted.append(self.sessions.pop(session_id))
+        return evicted
+
+    @property
+    def history(self):
+        return self.default_session.history
+
+    @property
+    def context(self):
+        return self.default_session.context
+
+    # --- Default-session API ---
+
+    def generate_response(self, text, callback=None, provider="auto", image_data=None, role="default", token=None,
+                          deadline=None):
         """
         Generates a response using the unified brain.
         If callback is provided, runs async in background.
         provider: 'auto', 'gemini', 'groq', 'claude', 'ollama', 'openai'
         image_data: Optional PIL Image
         role: 'default', 'romantic', 'friendly', etc.
+        token: Optional CancellationToken; cancelling it aborts the request (callback never fires).
+        deadline: Optional Deadline for the turn (defaults to SpecsConfig.DEADLINE['turn_sla'] from now).
         """
-        # Add to history
-        self.history.append({"role": "user", "content": text})
-        
-        # Prepare System Prompt with Memory
-        memory_context = self.memory.get_context_string()
-        system_prompt = SpecsConfig.get_full_system_prompt(memory_context, role=role)
-        
-        if callback:
-            thread = threading.Thread(target=self._run_async_wrapper, 
-                                      args=(text, system_prompt, callback, provider, image_data))
-            thread.daemon = True
-            thread.start()
-            return "Thinking..."
-        else:
-            # Synchronous call (blocking)
-            return asyncio.run(self._process(text, system_prompt, provider, image_data))
-
-    def _run_async_wrapper(self, text, system_prompt, callback, provider, image_data):
-        response = asyncio.run(self._process(text, system_prompt, provider, image_data))
-        if callback:
-            callback(response)
-
-    async def _process(self, text, system_prompt, provider="auto", image_data=None):
-        # Pass last 10 messages for context
-        context_history = self.history[-11:-1] if len(self.history) > 1 else []
-        
-        result = await self.provider.process_query(text, system_prompt, context_history, provider, image_data)
-        
-        response_text = ""
-        if "text" in result:
-            response_text = result["text"]
-        elif "error" in result:
-            # Sanitize errors for user-facing response; log internals to console
-            print(f"[SpecsAI Error] {result['error']}")
-            # Friendly generic message (no secret/error details)
-            response_text = "I'm having trouble right now. Please try again in a moment."
-        else:
-            response_text = "I am lost for words."
-            
-        # Add to history
-        self.history.append({"role": "assistant", "content": response_text})
-        
-        # Simple Memory Extraction (Self-Learning Stub)
-        # In future, this can use a separate LLM call to extract facts
-        if "my name is" in text.lower():
-            name = text.lower().split("my name is")[-1].strip().split()[0].capitalize()
-            self.memory.update("user_name", name)
-            
-        return response_text
+        return self.default_session.generate_response(text, callback, provider, image_data, role, token, deadline)
+
+    def generate_stream(self, text, on_chunk, on_done=None, provider="auto", image_data=None, role="default", token=None,
+                        deadline=None):
+        """
+        Streams a response in the background.
+        on_chunk(str) fires for every piece of text as it arrives, on_done(full_text) once at the end.
+        token: Optional CancellationToken; cancelling it closes the provider stream and skips on_done.
+        deadline: Optional Deadline bounding the wait for the first chunk.
+        Returns a concurrent.futures.Future for the whole turn.
+        """
+        return self.default_session.generate_stream(text, on_chunk, on_done, provider, image_data, role, token, deadline)
+
+    async def agenerate(self, text, provider="auto", image_data=None, role="default", session_id="default",
+                        deadline=None):
+        """Awaitable response for callers that already run an event loop (any loop)."""
+        return await self.session(session_id).agenerate(text, provider, image_data, role, deadline)
+
+    async def astream(self, text, provider="auto", image_data=None, role="default", session_id="default",
+                      deadline=None):
+        """Async iterator over response chunks (any loop); see SpecsSession.astream."""
+        async for chunk in self.session(session_id).astream(text, provider, image_data, role, deadline):
+            yield chunk
+
+    def record_turn(self, text, response_text):
+        """Adds an exchange handled outside the engine (e.g. a local command) to the history."""
+        return self.default_session.record_turn(text, response_text)
+
+    # --- Batch API ---
+
+    def generate_many(self, prompts, concurrency=4, output_path=None, provider="auto", role="default",
+                      resume=True, retries=2, timeout=120.0):
+        """
+        Runs a prompt set with bounded concurrency (blocking). See SpecsAI.batch.
+        prompts: Strings or dicts {"prompt", "id"?, "role"?, "provider"?, "session"?}; prompts that
+                 share a "session" run in order as one conversation, all others are independent.
+        output_path: JSONL file each result is appended to as soon as it finishes.
+        resume: Skip ids already answered without error in output_path (re-runs failed ones); a conversation
+                cut short continues with its earlier answers from the file as history.
+        retries / timeout: Extra attempts for failed prompts, and each attempt's deadline in seconds.
+        Returns {"results", "completed", "failed", "skipped", "elapsed"}.
+        """
+        runner = BatchRunner(self, concurrency, output_path, provider, role, retries, timeout)
+        future = self._loop.submit(runner.run(prompts, resume))
+        try:
+            while True:
+                # Short waits keep Ctrl+C responsive (an untimed result() only sees it at the end)
+                try:
+                    return future.result(timeout=0.5)
+                except concurrent.futures.TimeoutError:
+                    continue
+        except BaseException:
+            future.cancel()  # Ctrl+C: stop in-flight requests; finished results are already on disk
+            raise
+
+    async def agenerate_many(self, prompts, concurrency=4, output_path=None, provider="auto", role="default",
+                             resume=True, retries=2, timeout=120.0):
+        """Awaitable generate_many for callers that already run an event loop (any loop)."""
+        runner = BatchRunner(self, concurrency, output_path, provider, role, retries, timeout)
+        return await asyncio.wrap_future(self._loop.submit(runner.run(prompts, resume)))
+
+    # --- Shared helpers ---
+
+    def _cache_scope(self, text, role, memory_context, image_data, history=None):
+        """
+        Cache scope for this turn (role + memory hash + hash of the last few history messages),
+        or None if the turn must not be cached. Vision turns, long messages and time-sensitive
+        questions always go to the provider; a follow-up like "why?" only matches the same exchange.
+        """
+        if not self.cache or image_data or not self.cache.cacheable(text):
+            return None
+        memory_hash = hashlib.sha1(memory_context.encode("utf-8")).hexdigest()[:12]
+        recent = (history or [])[-self.cache.context_messages:] if self.cache.context_messages else []
+        context = "\n".join(f"{msg['role']}: {msg['content']}" for msg in recent)
+        context_hash = hashlib.sha1(context.encode("utf-8")).hexdigest()[:12]
+        return f"{role.lower()}:{memory_hash}:{context_hash}"
+
+    def _store_cached(self, text, cache_scope, response_text):
+        # Commands must re-run every time, so answers carrying [EXECUTE: ...] are never cached
+        if cache_scope and "[EXECUTE" not in response_text:
+            self.cache.put(text, cache_scope, response_text)
+
+    def _degraded_answer(self):
+        """Local answer for a turn whose deadline ran out before any provider replied."""
+        return SpecsConfig.DEADLINE["degraded_reply"]
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {}
+
+    def key_usage(self):
+        """Per-key counters (requests sent, failures, quarantine) for every provider."""
+        return self.provider.key_usage()
+
+    def route_stats(self):
+        """Calls, failures and latency per provider/model tier (e.g. 'groq/small')."""
+        return self.provider.router.snapshot()
+
+    def speculative_stats(self):
+        """Draft-then-refine outcomes and latencies (draft vs main opening, continuation start)."""
+        return self.speculative.snapshot()
+
+    def _deliver(self, future, callback):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error:
+            print(f"[SpecsAI Error] {error}")
+            callback("I'm having trouble right now. Please try again in a moment.")
+            return
+        callback(future.result())
@@ -0,0 +1,205 @@
+"""
+SpecsAI Provider Health
+Tracks live latency / error stats per provider and runs a circuit breaker for each,
+so auto mode starts with whoever is actually healthy instead of a fixed order.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from .config import SpecsConfig
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def error_status(error):
+    """Best-effort HTTP status from an SDK exception or one of our 'Provider Error 429: ...' messages."""
+    for attr in ("status_code", "status"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status
+    message = str(error)
+    match = re.search(r'\b(429|5\d\d)\b', message)
+    if match:
+        return int(match.group(1))
+    if "quota" in message.lower() or "rate limit" in message.lower():
+        return 429
+    return None
+
+
+@dataclass
+class ProviderHealth:
+    name: str
+    ewma_latency: float = 0.0     # Seconds, 0 = no data yet
+    error_rate: float = 0.0       # EWMA of failures (0..1)
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0         # 429 responses
+    server_errors: int = 0        # 5xx responses
+    consecutive_failures: int = 0
+    state: str = CLOSED
+    opened_at: float = 0.0        # Wall-clock time, survives restarts
+    probe_in_flight: bool = False
+
+
+class HealthRegistry:
+    """
+    Per-provider health registry with an open / half-open / closed circuit breaker.
+    - closed: requests flow normally.
+    - open: provider is skipped until the cooldown passes.
+    - half_open: a single probe request is allowed; success closes, failure re-opens.
+    State is persisted to JSON so a dead provider isn't re-probed on every cold start.
+    """
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage_path="specs_health.json", settings=None):
+        settings = dict(SpecsConfig.CIRCUIT_BREAKER, **(settings or {}))
+        self.storage_path = storage_path
+        self.alpha = settings["ewma_alpha"]
+        self.failure_threshold = settings["failure_threshold"]
+        self.cooldown = settings["cooldown"]
+        self.default_latency = settings["default_latency"]
+        self.logger = logging.getLogger("SpecsAI.Health")
+        self._lock = threading.Lock()
+        self.providers = self._load()
+
+    @classmethod
+    def shared(cls, storage_path="specs_health.json"):
+        """One registry per file, so the engine and OnlineManager don't overwrite each other."""
+        with cls._shared_lock:
+            key = os.path.abspath(storage_path)
+            if key not in cls._shared:
+                cls._shared[key] = cls(storage_path)
+            return cls._shared[key]
+
+    def _load(self):
+        if self.storage_path and os.path.exists(self.storage_path):
+            try:
+                with open(self.storage_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                providers = {}
+                for name, stats in data.items():
+                    stats["probe_in_flight"] = False
+                    providers[name] = ProviderHealth(**stats)
+                return providers
+            except Exception as e:
+                self.logger.warning(f"Could not load provider health: {e}")
+        return {}
+
+    def save(self):
+        if not self.storage_path:
+            return
+        try:
+            with self._lock:
+                data = {name: asdict(h) for name, h in self.providers.items()}
+            with open(self.storage_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Could not save provider health: {e}")
+
+    def _get(self, name):
+        if name not in self.providers:
+            self.providers[name] = ProviderHealth(name=name)
+        return self.providers[name]
+
+    def allow(self, name):
+        """True if a request to this provider may go out now (claims the probe slot when half-open)."""
+        with self._lock:
+            health = self._get(name)
+            if health.state == OPEN:
+                if time.time() - health.opened_at < self.cooldown:
+                    return False
+                health.state = HALF_OPEN
+                health.probe_in_flight = False
+            if health.state == HALF_OPEN:
+                if health.probe_in_flight:
+                    return False
+                health.probe_in_flight = True
+            return True
+
+    def is_open(self, name):
+        """True while the circuit is open and still cooling down (read-only, unlike allow())."""
+        with self._lock:
+            health = self._get(name)
+            return health.state == OPEN and time.time() - health.opened_at < self.cooldown
+
+    def release(self, name):
+        """Gives back a half-open probe slot without recording a result (e.g. cancelled hedge)."""
+        with self._lock:
+            self._get(name).probe_in_flight = False
+
+    def record_success(self, name, latency):
+        with self._lock:
+            health = self._get(name)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.error_rate = (1 - self.alpha) * health.error_rate
+            health.ewma_latency = latency if not health.ewma_latency else (
+                self.alpha * latency + (1 - self.alpha) * health.ewma_latency)
+            changed = health.state != CLOSED
+            health.state = CLOSED
+            health.probe_in_flight = False
+        if changed:
+            self.logger.info(f"Circuit closed for {name}")
+            self.save()
+
+    def record_failure(self, name, error=None):
+        status = error_status(error) if error is not None else None
+        with self._lock:
+            health = self._get(name)
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.error_rate = self.alpha + (1 - self.alpha) * health.error_rate
+            if status == 429:
+                health.rate_limited += 1
+            elif status and 500 <= status < 600:
+                health.server_errors += 1
+            tripped = health.state == HALF_OPEN or (
+                health.state == CLOSED and health.consecutive_failures >= self.failure_threshold)
+            if tripped:
+                health.state = OPEN
+                health.opened_at = time.time()
+            health.probe_in_flight = False
+        if tripped:
+            self.logger.warning(f"Circuit opened for {name} ({status or error})")
+            self.save()
+
+    def score(self, name):
+        """Lower is better: expected latency inflated by the recent error rate."""
+        health = self._get(name)
+        latency = health.ewma_latency or self.default_latency
+        score = latency * (1 + 4 * health.error_rate)
+        if health.state == HALF_OPEN:
+            score += self.default_latency
+        return score
+
+    def order(self, names):
+        """
+        Sorts providers by live health score (stable, so ties keep the configured priority)
+        and drops those whose circuit is open. If every circuit is open, their cooldown is cut
+        short: all of them go half-open and are returned, so allow() lets one probe through
+        each instead of the turn failing without a single request.
+        """
+        with self._lock:
+            ranked = sorted(names, key=self.score)
+            now = time.time()
+            available = [n for n in ranked
+                         if self._get(n).state != OPEN or now - self._get(n).opened_at >= self.cooldown]
+            if available or not ranked:
+                return available
+            for name in ranked:
+                health = self._get(name)
+                health.state = HALF_OPEN
+                health.probe_in_flight = False
+        self.logger.info(f"Every circuit is open, probing {', '.join(ranked)}")
+        return ranked
+
+    def snapshot(self):
+        with self._lock:
+            return {name: asdict(h) for name, h in self.providers.items()}
@@ -0,0 +1,122 @@
+"""
+SpecsAI Key Pools
+Several API keys per provider, each with its own free-tier quota. Requests are spread across
+the keys (least-loaded or round-robin); keys that are out of quota or rejected are quarantined
+for a while instead of failing request after request.
+"""
+import itertools
+import logging
+import re
+import threading
+import time
+from .backends import gemini_retry_delay
+from .config import SpecsConfig
+from .health import error_status
+from .ratelimit import key_id
+
+
+def normalize_keys(value):
+    """A settings value may be one key, a comma-separated string or a list; returns unique keys in order."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    keys = []
+    for key in value:
+        key = (key or "").strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class KeyPool:
+    def __init__(self, provider, keys, limiter, strategy=None, settings=None):
+        self.provider = provider
+        self.keys = normalize_keys(keys)
+        self.limiter = limiter
+        self.settings = dict(SpecsConfig.KEY_POOL, **(settings or {}))
+        self.strategy = (strategy or self.settings["strategy"]).lower()
+        self.logger = logging.getLogger("SpecsAI.Keys")
+        self._cycle = itertools.cycle(range(len(self.keys))) if self.keys else None
+        self._lock = threading.Lock()
+        self.stats = {key: {"successes": 0, "failures": 0, "quarantined_until": 0.0, "reason": ""} for key in self.keys}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _usable(self, now):
+        usable = [key for key in self.keys if self.stats[key]["quarantined_until"] <= now]
+        # Everything quarantined: fall back to the key that comes back first rather than nothing
+        return usable or sorted(self.keys, key=lambda k: self.stats[k]["quarantined_until"])[:1]
+
+    def pick(self, tokens=0):
+        """Key for the next request, or None if the provider has no keys."""
+        if not self.keys:
+            return None
+        with self._lock:
+            usable = self._usable(time.time())
+            if self.strategy == "round_robin":
+                for _ in range(len(self.keys)):
+                    key = self.keys[next(self._cycle)]
+                    if key in usable:
+                        return key
+                return usable[0]
+            # least_loaded: soonest free rate-limit bucket, then fewest requests in flight, then fewest sent
+            def load(key):
+                state = self.limiter.state(self.provider, key)
+                return (self.limiter.wait_time(self.provider, key, tokens), state.in_flight, state.sent)
+            return min(usable, key=load)
+
+    def wait_time(self, tokens=0):
+        """Seconds until any usable key could take a request."""
+        if not self.keys:
+            return 0.0
+        with self._lock:
+            usable = self._usable(time.time())
+        return min(self.limiter.wait_time(self.provider, key, tokens) for key in usable)
+
+    def record_success(self, key):
+        if key in self.stats:
+            self.stats[key]["successes"] += 1
+
+    def record_failure(self, key, error=None):
+        """Counts the failure and quarantines the key if the error means it can't be used for a while."""
+        if key not in self.stats:
+            return
+        self.stats[key]["failures"] += 1
+        status = error_status(error) if error is not None else None
+        message = str(error).lower() if error is not None else ""
+        if status in (401, 403) or re.search(r'\b(401|403)\b', message) or "api key not valid" in message \
+                or "invalid api key" in message:
+            self.quarantine(key, self.settings["quarantine_invalid"], "rejected")
+        elif status == 429 and re.search(r"per ?day|daily", message):
+            self.quarantine(key, self.settings["quarantine_quota"], "quota exhausted")
+        elif status == 429:
+            # Per-minute limits ("Resource has been exhausted"): sit out only as long as the provider asks
+            blocked = self.limiter.state(self.provider, key).blocked_until - time.monotonic()
+            delay = gemini_retry_delay(str(error)) or (blocked if blocked > 0 else self.settings["quarantine_rate"])
+            self.quarantine(key, round(delay, 1), "rate limited")
+
+    def quarantine(self, key, seconds, reason):
+        with self._lock:
+            self.stats[key]["quarantined_until"] = time.time() + seconds
+            self.stats[key]["reason"] = reason
+        self.logger.warning(f"{self.provider} key {key_id(key)} quarantined for {seconds}s ({reason})")
+
+    def usage(self):
+        now = time.time()
+        rows = []
+        for key in self.keys:
+            stats = self.stats[key]
+            state = self.limiter.state(self.provider, key)
+            rows.append({
+                "key": key_id(key),
+                "sent": state.sent,
+                "in_flight": state.in_flight,
+                "throttled": state.throttled,
+                "successes": stats["successes"],
+                "failures": stats["failures"],
+                "quarantined_for": round(max(0.0, stats["quarantined_until"] - now)),
+                "reason": stats["reason"] if stats["quarantined_until"] > now else "",
+            })
+        return rows
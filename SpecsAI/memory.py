@@ -1,55 +1,90 @@
 """
 SpecsAI Memory System
 Manages Long-term Memory and Context.
+Stored in SQLite (SpecsAI.memory_store); a legacy JSON file at the same path is imported once.
 """
-import json
-import os
+import threading
+import warnings
+from .memory_store import MemoryStore, database_path
 
 class SpecsMemory:
     def __init__(self, storage_path="specs_memory.json"):
+        """
+        storage_path: Memory file; 'x.json' is kept in 'x.db' (importing an existing x.json).
+                      None keeps the memory in-process only (e.g. one-off server requests).
+        """
         self.storage_path = storage_path
+        self.store = MemoryStore(database_path(storage_path)) if storage_path else None
         self.memory = self._load_memory()
+        self._fact_set = set(self.memory.get("facts", []))
+        self._lock = threading.RLock() # Sessions on different threads may share one memory
 
     def _load_memory(self):
-        if os.path.exists(self.storage_path):
-            try:
-                with open(self.storage_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        if not self.store:
+            return {}
+        self.store.import_json(self.storage_path, self._from_json)
+        memory = self.store.profile()
+        facts = self.store.facts()
+        if facts:
+            memory["facts"] = facts
+        return memory
+
+    @staticmethod
+    def _from_json(data):
+        data = dict(data)
+        return {"facts": data.pop("facts", []), "profile": data}
 
     def save_memory(self):
-        try:
-            with open(self.storage_path, "w", encoding="utf-8") as f:
-                json.dump(self.memory, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Memory Save Error: {e}")
+        """Deprecated: every change is written to the store when it happens."""
+        warnings.warn("SpecsMemory.save_memory() is deprecated and does nothing; changes are saved as they happen",
+                      DeprecationWarning, stacklevel=2)
+
+    def close(self):
+        if self.store:
+            self.store.close()
 
     def get_context_string(self):
         """Returns a formatted string of key memories"""
         if not self.memory:
             return ""
-        
+
         context = []
         # User Info
         if "user_name" in self.memory:
             context.append(f"- User Name: {self.memory['user_name']}")
-        
+
         # Facts
         if "facts" in self.memory:
             for fact in self.memory["facts"]:
                 context.append(f"- {fact}")
-                
+
         return "\n".join(context)
 
     def update(self, key, value):
-        self.memory[key] = value
-        self.save_memory()
-        
+        with self._lock:
+            if key == "facts":
+                self._set_facts(value)
+                return
+            self.memory[key] = value
+            if self.store:
+                self.store.set_profile(key, value)
+
+    def _set_facts(self, facts):
+        """update("facts", [...]) replaces the whole list, as with the JSON version (add_fact() appends one)."""
+        facts = list(dict.fromkeys(facts or []))
+        if self.store:
+            self.store.set_facts(facts)
+        self._fact_set = set(facts)
+        if facts:
+            self.memory["facts"] = facts
+        else:
+            self.memory.pop("facts", None)
+
     def add_fact(self, fact):
-        if "facts" not in self.memory:
-            self.memory["facts"] = []
-        if fact not in self.memory["facts"]:
-            self.memory["facts"].append(fact)
-            self.save_memory()
+        with self._lock:
+            if fact in self._fact_set:
+                return
+            if self.store and not self.store.add_fact(fact):
+                return
+            self._fact_set.add(fact)
+            self.memory.setdefault("facts", []).append(fact)
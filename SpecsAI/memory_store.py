@@ -0,0 +1,150 @@
+"""
+SpecsAI Memory Store (SQLite)
+Long-term memory on SQLite in WAL mode: profile values, facts, notes and the rolling summary
+each live in their own table. Every change is a single-row write (UNIQUE indexes do the
+dedup), so remembering a fact costs the same with ten facts or ten thousand.
+Existing JSON memory files are imported once and kept as a backup.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profile (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS facts (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT NOT NULL UNIQUE, created REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT NOT NULL UNIQUE, created REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS summaries (position INTEGER PRIMARY KEY, line TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def database_path(storage_path):
+    """SQLite file for a memory path ('specs_memory.json' -> 'specs_memory.db')."""
+    root, ext = os.path.splitext(storage_path)
+    return root + ".db" if ext.lower() == ".json" else storage_path
+
+
+class MemoryStore:
+    def __init__(self, path):
+        """path: SQLite database file (created on first use), or ':memory:'."""
+        self.path = path
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock() # One connection shared by every thread
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL") # WAL keeps this crash-safe; only the last commit can be lost
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        """Single statement (autocommit); returns the number of rows changed."""
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    # --- Profile ---
+
+    def profile(self):
+        """All profile values, JSON-decoded."""
+        return {key: json.loads(value) for key, value in self._query("SELECT key, value FROM profile")}
+
+    def set_profile(self, key, value):
+        self._write("INSERT INTO profile (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, json.dumps(value, ensure_ascii=False)))
+
+    # --- Facts / notes ---
+
+    def facts(self):
+        return [text for (text,) in self._query("SELECT text FROM facts ORDER BY id")]
+
+    def add_fact(self, text):
+        """True if the fact is new."""
+        return self._write("INSERT OR IGNORE INTO facts (text, created) VALUES (?, ?)", (text, time.time())) > 0
+
+    def set_facts(self, texts):
+        """Replaces every fact (duplicates dropped, order kept) in one transaction."""
+        now = time.time()
+        with self._lock, self._transaction():
+            self._db.execute("DELETE FROM facts")
+            self._db.executemany("INSERT OR IGNORE INTO facts (text, created) VALUES (?, ?)",
+                                 [(text, now) for text in texts])
+
+    def notes(self):
+        return [text for (text,) in self._query("SELECT text FROM notes ORDER BY id")]
+
+    def add_note(self, text):
+        """True if the note is new."""
+        return self._write("INSERT OR IGNORE INTO notes (text, created) VALUES (?, ?)", (text, time.time())) > 0
+
+    # --- Rolling summary ---
+
+    def summary(self):
+        return [line for (line,) in self._query("SELECT line FROM summaries ORDER BY position")]
+
+    def set_summary(self, lines):
+        """Replaces the summary (a handful of lines kept by ContextBuilder) in one transaction."""
+        with self._lock, self._transaction():
+            self._db.execute("DELETE FROM summaries")
+            self._db.executemany("INSERT INTO summaries (position, line) VALUES (?, ?)", enumerate(lines))
+
+    # --- Migration ---
+
+    def import_json(self, json_path, convert):
+        """
+        One-time import of a legacy JSON memory file; the file itself is left untouched.
+        convert(data) -> {"profile": dict, "facts": list, "notes": list, "summary": list} (keys optional).
+        Returns True if the file was imported now.
+        """
+        if not json_path or not os.path.exists(json_path):
+            return False
+        marker = "imported:" + os.path.abspath(json_path)
+        if self._query("SELECT 1 FROM meta WHERE key = ?", (marker,)):
+            return False
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                parts = convert(json.load(f))
+        except Exception as e:
+            print(f"[Memory] Could not import {json_path}: {e}")
+            return False
+
+        now = time.time()
+        with self._lock, self._transaction():
+            self._db.executemany("INSERT OR REPLACE INTO profile (key, value) VALUES (?, ?)",
+                                 [(k, json.dumps(v, ensure_ascii=False)) for k, v in parts.get("profile", {}).items()])
+            self._db.executemany("INSERT OR IGNORE INTO facts (text, created) VALUES (?, ?)",
+                                 [(text, now) for text in parts.get("facts", [])])
+            self._db.executemany("INSERT OR IGNORE INTO notes (text, created) VALUES (?, ?)",
+                                 [(text, now) for text in parts.get("notes", [])])
+            if parts.get("summary"):
+                self._db.execute("DELETE FROM summaries")
+                self._db.executemany("INSERT INTO summaries (position, line) VALUES (?, ?)",
+                                     enumerate(parts["summary"]))
+            self._db.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (marker, str(now)))
+        print(f"[Memory] Imported {json_path} into {self.path}")
+        return True
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+
+class _Transaction:
+    """BEGIN ... COMMIT (ROLLBACK on error) on an autocommit connection; caller holds the lock."""
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,241 @@
+"""
+SpecsAI Model Catalog
+Remembers which Gemini models an API key can actually use, so requests go straight
+to the last known-good model instead of walking the fallback list every time.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from .config import SpecsConfig
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+def classify_status(status):
+    """Maps an HTTP status to the error class used for cache TTLs."""
+    if status in (401, 403):
+        return "forbidden"
+    if status == 404:
+        return "not_found"
+    if status == 429:
+        return "rate_limited"
+    if status and status >= 500:
+        return "server_error"
+    return "other"
+
+
+class GeminiModelCatalog:
+    """
+    Per-key cache of Gemini model availability, persisted to disk.
+    - The key's model list is fetched once (and refreshed after MODEL_LIST_TTL).
+    - Each model's last outcome is stored with its error class; failures expire after a
+      class-specific TTL (a 404 lasts a day, a 429 about a minute).
+    - Expired failures are re-checked by a background probe, never on the user's request path.
+    - Changes are written in batches on a timer thread (flush() on shutdown), not on the event loop.
+    """
+    _file_lock = threading.Lock()
+
+    def __init__(self, api_key, pool, storage_path="specs_models.json", preferred=None, save_delay=None):
+        self.api_key = api_key
+        self.pool = pool
+        self.storage_path = storage_path
+        self.preferred = list(preferred or SpecsConfig.GEMINI_MODELS)
+        self.failure_ttls = SpecsConfig.MODEL_FAILURE_TTLS
+        self.logger = logging.getLogger("SpecsAI.Models")
+        # Keys are never written to disk; entries are indexed by a short hash
+        self.key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        self.save_delay = SpecsConfig.MODEL_CACHE_SAVE_DELAY if save_delay is None else save_delay
+        self.entry = self._load()
+        self._list_task = None
+        self._list_failed_at = 0.0  # Last failed listing (in memory: a restart may try again)
+        self._probing = set()
+        self._lock = threading.Lock()  # entry is changed on the loop and written by the timer thread
+        self._dirty = False
+        self._save_timer = None
+
+    # --- Persistence ---
+
+    def _load(self):
+        data = self._read_all()
+        entry = data.get(self.key_id, {})
+        entry.setdefault("listed_at", 0)
+        entry.setdefault("available", [])
+        entry.setdefault("models", {})
+        entry.setdefault("last_good", None)
+        return entry
+
+    def _read_all(self):
+        if self.storage_path and os.path.exists(self.storage_path):
+            try:
+                with open(self.storage_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+        return {}
+
+    def _schedule_save(self):
+        """Marks the entry changed; the file is rewritten after save_delay on a timer thread."""
+        if not self.storage_path:
+            return
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def save(self):
+        """Writes pending changes now (no-op when nothing changed since the last write)."""
+        if not self.storage_path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            entry = copy.deepcopy(self.entry)
+        with self._file_lock:
+            try:
+                data = self._read_all()
+                data[self.key_id] = entry
+                with open(self.storage_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+            except Exception as e:
+                self.logger.warning(f"Could not save model cache: {e}")
+                with self._lock:
+                    self._dirty = True
+
+    # --- Discovery ---
+
+    async def ensure_listed(self):
+        """
+        Lists the key's models once per MODEL_LIST_TTL (concurrent callers share one request).
+        A failed listing is not retried for MODEL_LIST_RETRY seconds.
+        """
+        now = time.time()
+        if now - self.entry["listed_at"] < SpecsConfig.MODEL_LIST_TTL or \
+                now - self._list_failed_at < SpecsConfig.MODEL_LIST_RETRY:
+            return
+        if self._list_task is None or self._list_task.done():
+            self._list_task = asyncio.ensure_future(self._list_models())
+        await asyncio.shield(self._list_task)
+
+    async def _list_models(self):
+        url = f"{GEMINI_BASE_URL}/models?pageSize=1000&key={self.api_key}"
+        try:
+            async with self.pool.get("gemini").get(url) as response:
+                if response.status != 200:
+                    self._list_failed_at = time.time()
+                    self.logger.warning(f"Gemini model listing failed ({response.status})")
+                    return
+                data = await response.json()
+        except Exception as e:
+            self._list_failed_at = time.time()
+            self.logger.warning(f"Gemini model listing failed: {e}")
+            return
+        with self._lock:
+            self.entry["available"] = [
+                m["name"].split("/", 1)[-1] for m in data.get("models", [])
+                if "generateContent" in m.get("supportedGenerationMethods", [])
+            ]
+            self.entry["listed_at"] = time.time()
+        self._schedule_save()
+
+    # --- Selection ---
+
+    def _is_broken(self, model_name, now):
+        info = self.entry["models"].get(model_name)
+        if not info or info.get("status") != "failed":
+            return False
+        ttl = self.failure_ttls.get(info.get("error"), self.failure_ttls["other"])
+        if now - info.get("checked_at", 0) < ttl:
+            return True
+        # Failure has expired: verify it in the background, keep it off the request path meanwhile
+        self._schedule_probe(model_name)
+        return True
+
+    async def candidates(self):
+        """Models to try for this request, best first."""
+        await self.ensure_listed()
+        available = set(self.entry["available"])
+        order = list(self.preferred)
+        last_good = self.entry.get("last_good")
+        if last_good in order:
+            order.remove(last_good)
+            order.insert(0, last_good)
+        if available:
+            order = [m for m in order if m in available]
+        now = time.time()
+        usable = [m for m in order if not self._is_broken(m, now)]
+        # Everything is marked broken: try them anyway rather than fail without a request
+        return usable or order or list(self.preferred)
+
+    def best(self):
+        """Synchronous pick for callers that only need one model name (e.g. streaming)."""
+        now = time.time()
+        last_good = self.entry.get("last_good")
+        if last_good and not self._is_broken(last_good, now):
+            return last_good
+        for model_name in self.preferred:
+            if (not self.entry["available"] or model_name in self.entry["available"]) and not self._is_broken(model_name, now):
+                return model_name
+        return self.preferred[0]
+
+    def record_success(self, model_name):
+        with self._lock:
+            changed = self.entry.get("last_good") != model_name or \
+                self.entry["models"].get(model_name, {}).get("status") != "ok"
+            self.entry["models"][model_name] = {"status": "ok", "checked_at": time.time()}
+            self.entry["last_good"] = model_name
+        if changed:
+            self._schedule_save()
+
+    def record_failure(self, model_name, status=None, error_class=None):
+        error_class = error_class or classify_status(status)
+        with self._lock:
+            self.entry["models"][model_name] = {"status": "failed", "error": error_class, "checked_at": time.time()}
+            if self.entry.get("last_good") == model_name:
+                self.entry["last_good"] = None
+        self._schedule_save()
+
+    # --- Background re-check ---
+
+    def _schedule_probe(self, model_name):
+        if model_name in self._probing:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._probing.add(model_name)
+        asyncio.ensure_future(self._probe(model_name))
+
+    async def _probe(self, model_name):
+        """Tiny 1-token request that moves a model back into rotation if it works again."""
+        url = f"{GEMINI_BASE_URL}/models/{model_name}:generateContent?key={self.api_key}"
+        payload = {
+            "contents": [{"role": "user", "parts": [{"text": "ping"}]}],
+            "generationConfig": {"maxOutputTokens": 1}
+        }
+        try:
+            async with self.pool.get("gemini").post(url, json=payload) as response:
+                await response.read()
+                if response.status == 200:
+                    with self._lock:
+                        self.entry["models"][model_name] = {"status": "ok", "checked_at": time.time()}
+                    self._schedule_save()
+                    self.logger.info(f"Gemini model {model_name} is available again")
+                else:
+                    self.record_failure(model_name, response.status)
+        except Exception as e:
+            self.record_failure(model_name, error_class="network")
+            self.logger.debug(f"Probe for {model_name} failed: {e}")
+        finally:
+            self._probing.discard(model_name)
@@ -0,0 +1,103 @@
+"""
+SpecsAI Network Layer
+One long-lived event loop + pooled keep-alive HTTP sessions per provider.
+Every provider call runs on this loop, so warm connections are reused across chat turns.
+"""
+import asyncio
+import logging
+import threading
+import aiohttp
+from .config import SpecsConfig
+
+
+class BackgroundLoop:
+    """
+    Owns a single asyncio event loop running forever on a daemon thread.
+    Sync code submits coroutines with submit()/run() instead of calling asyncio.run().
+    """
+    def __init__(self, name="SpecsAI-Loop"):
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def in_loop_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """Schedules a coroutine on the loop. Returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Blocking helper for sync callers (must not be called from the loop thread itself)."""
+        if self.in_loop_thread():
+            raise RuntimeError("BackgroundLoop.run() called from inside the loop thread; await the coroutine instead.")
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+
+
+class SessionPool:
+    """
+    Keeps one aiohttp.ClientSession (with its own TCPConnector) per provider.
+    Sessions are created lazily on the owning loop and kept alive between requests,
+    so DNS lookups and TLS handshakes are paid once instead of on every turn.
+    """
+    def __init__(self, limits=None, overrides=None, timeouts=None):
+        self.limits = dict(SpecsConfig.HTTP_POOL)
+        if limits:
+            self.limits.update(limits)
+        self.timeouts = dict(SpecsConfig.HTTP_TIMEOUTS, **(timeouts or {}))
+        self.overrides = dict(SpecsConfig.HTTP_POOL_OVERRIDES)
+        if overrides:
+            self.overrides.update(overrides)
+        self.logger = logging.getLogger("SpecsAI.Network")
+        self._sessions = {}
+
+    def _limits_for(self, name):
+        limits = dict(self.limits)
+        limits.update(self.overrides.get(name, {}))
+        return limits
+
+    def default_timeout(self):
+        """Timeout for requests made outside a turn (pre-warm, model listing)."""
+        # No total timeout here: within a turn each request's share of the deadline bounds it
+        return aiohttp.ClientTimeout(total=None, connect=self.timeouts["connect"], sock_read=self.timeouts["sock_read"])
+
+    def get(self, name):
+        """Returns the pooled session for a provider. Must be called from inside the owning loop."""
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            limits = self._limits_for(name)
+            connector = aiohttp.TCPConnector(
+                limit=limits["limit"],
+                limit_per_host=limits["limit_per_host"],
+                keepalive_timeout=limits["keepalive_timeout"],
+                ttl_dns_cache=limits["dns_cache_ttl"],
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=self.default_timeout())
+            self._sessions[name] = session
+        return session
+
+    async def prewarm(self, name, url):
+        """Opens (and keeps) a connection to the provider so the first real request skips DNS + TLS."""
+        try:
+            async with self.get(name).head(url, allow_redirects=False) as response:
+                await response.read()
+        except Exception as e:
+            self.logger.debug(f"Pre-warm failed for {name}: {e}")
+
+    async def close(self):
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
@@ -0,0 +1,150 @@
+"""
+SpecsAI Local OCR
+"Read this text" / "Screen e ki lekha ache?" only needs the words on the screen, not a vision
+model. A local OCR backend finds the text regions and reads them; the text (a few hundred bytes
+instead of a screenshot upload) goes to a text model, or straight back to the user.
+Backends are pluggable: register_backend("name", cls) with a class implementing OCRBackend.
+"""
+import io
+import logging
+import re
+from dataclasses import dataclass, field
+from .config import SpecsConfig
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+_READ_REQUEST = re.compile(
+    r"\b(read|reading|text|written|says?|saying|typed|ki lekha|lekha ache|lekha|poro|pore shonao|porte)\b|লেখা|পড়",
+    re.IGNORECASE,
+)
+# Questions about looks / layout still need the vision model
+_VISUAL_REQUEST = re.compile(
+    r"\b(color|colour|look like|picture|photo|image|chobi|describe|design|layout|who is|face|icon)\b",
+    re.IGNORECASE,
+)
+
+
+def is_read_request(text):
+    """True for questions that only need the text on the screen."""
+    return bool(_READ_REQUEST.search(text or "")) and not _VISUAL_REQUEST.search(text or "")
+
+
+@dataclass
+class TextRegion:
+    text: str
+    box: tuple           # (left, top, width, height) in source image pixels
+    confidence: float    # 0..100
+
+
+@dataclass
+class OCRResult:
+    regions: list = field(default_factory=list)
+
+    @property
+    def text(self):
+        return "\n\n".join(region.text for region in self.regions)
+
+    def __bool__(self):
+        return bool(self.regions)
+
+
+class OCRBackend:
+    """Subclasses take an optional settings dict and implement available() / extract()."""
+    name = "base"
+
+    def __init__(self, settings=None):
+        self.settings = dict(SpecsConfig.OCR, **(settings or {}))
+
+    def available(self):
+        return False
+
+    def extract(self, image):
+        """PIL Image -> OCRResult (blocking; callers run it on a worker thread)."""
+        raise NotImplementedError
+
+    def read(self, image):
+        """extract() for a PIL Image or encoded image bytes."""
+        if isinstance(image, (bytes, bytearray)):
+            image = Image.open(io.BytesIO(image))
+        return self.extract(image)
+
+
+class TesseractOCR(OCRBackend):
+    """Tesseract via pytesseract. Needs the tesseract binary (and language packs) installed."""
+    name = "tesseract"
+
+    def __init__(self, settings=None):
+        super().__init__(settings)
+        self.logger = logging.getLogger("SpecsAI.OCR")
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            self._available = False
+            if pytesseract is not None:
+                try:
+                    pytesseract.get_tesseract_version()
+                    self._available = True
+                except Exception as e:
+                    self.logger.info(f"Tesseract not available: {e}")
+        return self._available
+
+    def extract(self, image):
+        max_dimension = self.settings["max_dimension"]
+        scale = 1.0
+        if max(image.size) > max_dimension:
+            scale = max(image.size) / max_dimension
+            image = image.copy()
+            image.thumbnail((max_dimension, max_dimension))
+        data = pytesseract.image_to_data(
+            image.convert("L"), lang=self.settings["languages"], output_type=pytesseract.Output.DICT
+        )
+
+        # Region detection: Tesseract's paragraph layout, words below min_confidence dropped
+        paragraphs = {}
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if not word.strip() or confidence < self.settings["min_confidence"]:
+                continue
+            key = (data["block_num"][i], data["par_num"][i])
+            para = paragraphs.setdefault(key, {"lines": {}, "boxes": [], "conf": []})
+            para["lines"].setdefault(data["line_num"][i], []).append(word)
+            para["boxes"].append((data["left"][i], data["top"][i], data["width"][i], data["height"][i]))
+            para["conf"].append(confidence)
+
+        regions = []
+        for para in paragraphs.values():
+            left = min(b[0] for b in para["boxes"])
+            top = min(b[1] for b in para["boxes"])
+            right = max(b[0] + b[2] for b in para["boxes"])
+            bottom = max(b[1] + b[3] for b in para["boxes"])
+            text = "\n".join(" ".join(words) for _, words in sorted(para["lines"].items()))
+            box = tuple(round(v * scale) for v in (left, top, right - left, bottom - top))
+            regions.append(TextRegion(text, box, sum(para["conf"]) / len(para["conf"])))
+        # Reading order: top to bottom, then left to right
+        regions.sort(key=lambda r: (r.box[1] // 20, r.box[0]))
+        return OCRResult(regions)
+
+
+_BACKENDS = {"tesseract": TesseractOCR}
+
+
+def register_backend(name, backend_class):
+    _BACKENDS[name] = backend_class
+
+
+def create_backend(name=None, settings=None):
+    """Backend instance by name (SpecsConfig.OCR['backend'] by default), or None if disabled / unavailable."""
+    name = name or SpecsConfig.OCR["backend"]
+    if not name or name == "none" or name not in _BACKENDS:
+        return None
+    backend = _BACKENDS[name](settings)
+    return backend if backend.available() else None
@@ -0,0 +1,99 @@
+"""
+SpecsAI Prompt Composer
+Classifies each input locally and assembles only the prompt blocks that turn needs.
+"good night" doesn't need dozens of [EXECUTE: ...] examples; "chrome khulo" does.
+"""
+import hashlib
+import re
+import threading
+from .config import SpecsConfig
+
+CHAT = "chat"
+COMMAND = "command"
+VISION = "vision"
+SCREEN = "screen"  # Screenshot already attached to this turn
+
+
+def is_bangla(text):
+    """True for Bangla script or recognizable Banglish (Bengali in English letters)."""
+    if any('\u0980' <= c <= '\u09ff' for c in text):
+        return True
+    words = re.findall(r"[a-z]+", text.lower())
+    if not words:
+        return False
+    hits = sum(1 for w in words if w in SpecsConfig.BANGLISH_WORDS)
+    # One hit is enough for very short messages ("kemon acho"), otherwise need a real share
+    return hits >= 2 or (hits == 1 and len(words) <= 3)
+
+
+def _keyword_pattern(keywords):
+    """Whole-word/phrase matcher for a keyword list, so "restart" doesn't hit "start" or "clock" hit "lock"."""
+    alternatives = "|".join(re.escape(k.strip()) for k in sorted(keywords, key=len, reverse=True))
+    # Allow plain English plurals ("files", "songs") but nothing else glued on
+    return re.compile(r"(?<!\w)(?:" + alternatives + r")(?:s|es)?(?!\w)")
+
+
+_TIER_PATTERNS = {tier: _keyword_pattern(words) for tier, words in SpecsConfig.PROMPT_TIER_KEYWORDS.items()}
+
+
+def classify(text, has_image=False):
+    """Returns (tier, bangla) for an input: tier is 'screen', 'vision', 'command' or 'chat'."""
+    lower = text.lower()
+    bangla = is_bangla(text)
+    if has_image:
+        return SCREEN, bangla
+    if _TIER_PATTERNS["vision"].search(lower):
+        return VISION, bangla
+    if _TIER_PATTERNS["command"].search(lower):
+        return COMMAND, bangla
+    return CHAT, bangla
+
+
+class PromptComposer:
+    """
+    Builds tiered system prompts and memoizes them per (role, tier, bangla, memory content hash),
+    so the same persona/tier combination isn't re-concatenated on every turn. Keying on the
+    memory text itself keeps sessions with different memories from sharing a prompt.
+    """
+    MAX_CACHED = 64
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def compose(self, text, role="default", memory_context="", has_image=False):
+        tier, bangla = classify(text, has_image)
+        memory_hash = hashlib.sha1(memory_context.encode("utf-8")).hexdigest()
+        key = (role.lower(), tier, bangla, memory_hash)
+        with self._lock:
+            prompt = self._cache.get(key)
+            if prompt is None:
+                if len(self._cache) >= self.MAX_CACHED:
+                    self._cache.clear()
+                prompt = self._build(role, tier, bangla, memory_context)
+                self._cache[key] = prompt
+        return prompt
+
+    @staticmethod
+    def _build(role, tier, bangla, memory_context):
+        role_desc = SpecsConfig.ROLES.get(role.lower(), SpecsConfig.ROLES["default"])
+        blocks = [
+            SpecsConfig.SYSTEM_PROMPT,
+            f"--- CURRENT PERSONA: {role.upper()} ---\n{role_desc}",
+        ]
+        if tier == COMMAND:
+            blocks += [SpecsConfig.CAPABILITIES_CORE, SpecsConfig.COMMAND_RULES,
+                       SpecsConfig.COMMAND_REFERENCE, SpecsConfig.COMMAND_EXAMPLES]
+        elif tier == VISION:
+            blocks += [SpecsConfig.VISION_RULES, SpecsConfig.COMMAND_REFERENCE]
+        elif tier == SCREEN:
+            blocks += [SpecsConfig.SCREEN_RULES]
+        else:
+            blocks += [SpecsConfig.CAPABILITIES_BRIEF]
+        if bangla:
+            blocks.append(SpecsConfig.LANGUAGE_RULES)
+
+        prompt = "\n\n".join(blocks)
+        if memory_context:
+            prompt += f"\n\n[USER MEMORY - DO NOT FORGET]\n{memory_context}\n"
+        return prompt
@@ -1,399 +1,552 @@
 """
 SpecsAI Provider Manager
-Handles connections to external brains (Groq, Gemini, Claude, Ollama)
+Handles connections to external brains (Groq, Gemini, Claude) and the local one (Ollama)
 """
 import aiohttp
 import asyncio
 import logging
-import os
-import base64
-import io
-import json
-try:
-    from groq import AsyncGroq
-except ImportError:
-    AsyncGroq = None
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+import contextvars
+import time
+from contextlib import asynccontextmanager, contextmanager
+from .backends import backend_names, create_backend as create_provider_backend
+from .config import SpecsConfig
+from .context import estimate_tokens
+from .deadline import Deadline, DeadlineExceeded
+from .health import HealthRegistry
+from .keypool import KeyPool, normalize_keys
+from .ocr import OCRBackend, create_backend, is_read_request
+from .network import SessionPool
+from .ratelimit import RateLimiter, RateLimited
+from .routing import ModelRouter
+from .vision import ImageEncoder, VisionCache
+
+
+def is_connection_error(error):
+    """True when a request never reached the provider (no network, DNS failure, refused connection)."""
+    # Groq's SDK wraps these as APIConnectionError (its APITimeoutError subclass is a slow server, not no network)
+    return isinstance(error, aiohttp.ClientConnectorError) or type(error).__name__ == "APIConnectionError"
+
+
+# (provider, key) leased by the request running in the current task (see AIProvider._lease)
+_active_key = contextvars.ContextVar("specs_active_key", default=None)
+# aiohttp.ClientTimeout for the current request: its share of the turn deadline (see AIProvider._request_timeout)
+_active_timeout = contextvars.ContextVar("specs_active_timeout", default=None)
+
 
 class AIProvider:
-    def __init__(self, api_keys=None):
-        self.api_keys = api_keys or {}
+    def __init__(self, api_keys=None, pool=None, auto_strategy=None, hedge_delays=None, health=None,
+                 model_cache_path="specs_models.json", limiter=None, key_strategy=None,
+                 model_routing=None, model_routes=None, ocr=None, ocr_settings=None, ollama=None):
+        """
+        api_keys: Dict of provider keys. A value may also be a list (or comma-separated string)
+                  of keys for the same provider; requests are then spread across them.
+        pool: SessionPool shared with the engine's background loop. All REST calls reuse its
+              keep-alive sessions, so every query must run on that same loop.
+        auto_strategy: 'sequential', 'hedge' or 'race' (defaults to SpecsConfig.AUTO_STRATEGY).
+        hedge_delays: Per-provider overrides for SpecsConfig.HEDGE_DELAYS (seconds).
+        health: HealthRegistry used to order auto mode and skip providers with an open circuit.
+        model_cache_path: Where per-key Gemini model availability is cached.
+        limiter: RateLimiter with per-(provider, key) request / token buckets.
+        key_strategy: 'least_loaded' or 'round_robin' across a provider's keys (SpecsConfig.KEY_POOL).
+        model_routing: 'auto' (small model for simple turns, large for complex), 'small' or 'large'.
+        model_routes: Per-provider model overrides for SpecsConfig.MODEL_ROUTES.
+        ocr: OCRBackend instance or registered backend name for text-reading screen questions
+             (defaults to SpecsConfig.OCR['backend']; None if it isn't installed).
+        ocr_settings: Overrides for SpecsConfig.OCR (e.g. languages) when the backend is built here.
+        ollama: Overrides for SpecsConfig.OLLAMA (url, model, priority, keep_alive, ...).
+        """
         self.logger = logging.getLogger("SpecsAI.Provider")
-        
-        # Initialize Persistent Clients
-        self.groq_client = None
-        if self.api_keys.get("groq") and AsyncGroq:
-            self.groq_client = AsyncGroq(api_key=self.api_keys.get("groq"))
-            
-        if self.api_keys.get("gemini") and genai:
-             genai.configure(api_key=self.api_keys.get("gemini"))
-             # Default to 2.5-flash if available, otherwise 1.5-flash
-             self.gemini_model = genai.GenerativeModel('gemini-2.5-flash')
-        else:
-             self.gemini_model = None
+        self.limiter = limiter or RateLimiter()
+        self.key_pools = {}
+        self.api_keys = {}  # First key per provider
+        for name, value in (api_keys or {}).items():
+            keys = normalize_keys(value)
+            if keys:
+                self.key_pools[name] = KeyPool(name, keys, self.limiter, strategy=key_strategy)
+                self.api_keys[name] = keys[0]
+        self.pool = pool or SessionPool()
+        self.auto_strategy = (auto_strategy or SpecsConfig.AUTO_STRATEGY).lower()
+        self.hedge_delays = dict(SpecsConfig.HEDGE_DELAYS)
+        if hedge_delays:
+            self.hedge_delays.update(hedge_delays)
+        self.health = health or HealthRegistry.shared()
+        self.router = ModelRouter(model_routing, model_routes)
+        self.images = ImageEncoder()
+        self.vision_cache = VisionCache()
+        self.ocr = ocr if isinstance(ocr, OCRBackend) else create_backend(ocr, ocr_settings)
+
+        # Local tier: after the cloud in auto mode, ahead of it while the network is unreachable
+        self.ollama = dict(SpecsConfig.OLLAMA, **(ollama or {}))
+        self.ollama["url"] = self.ollama["url"].rstrip("/")
+        self.force_offline = False  # Set by the app's offline switch: auto mode stays local
+        self.offline_until = 0.0    # Monotonic time until which the network counts as down
+        self.model_cache_path = model_cache_path
+
+        # One backend per registered brain (SpecsAI.backends); SDKs load on first use
+        self.backends = {name: create_provider_backend(name, self) for name in backend_names()}
+
+    def _key(self, name):
+        """Key leased for `name` by the current request, else the provider's first key."""
+        active = _active_key.get()
+        if active and active[0] == name:
+            return active[1]
+        return self.api_keys.get(name)
+
+    def _timeout(self):
+        """aiohttp timeout for the current request (the pool default outside a turn)."""
+        return _active_timeout.get() or self.pool.default_timeout()
+
+    @contextmanager
+    def _request_timeout(self, timeout):
+        reset = _active_timeout.set(timeout)
+        try:
+            yield
+        finally:
+            _active_timeout.reset(reset)
 
-    async def process_query(self, text, system_prompt, history=None, provider="auto", image_data=None):
+    @asynccontextmanager
+    async def _lease(self, name, tokens=0, max_wait=None, deadline=None):
+        """
+        Picks one of the provider's keys, takes a slot in that key's rate-limit bucket and makes
+        the key visible to the query code (_key). Failures are charged to the key, so keys that
+        are out of quota or rejected get quarantined and the pool moves on to the others.
+        deadline: Queueing for the bucket never outlasts the turn's usable time.
+        """
+        if deadline is not None:
+            max_wait = min(self.limiter.waits["auto"] if max_wait is None else max_wait, deadline.usable())
+        pool = self.key_pools.get(name)
+        key = pool.pick(tokens) if pool else None
+        async with self.limiter.slot(name, key, tokens, max_wait) as state:
+            reset = _active_key.set((name, key))
+            try:
+                yield state
+            except Exception as e:
+                if pool:
+                    pool.record_failure(key, e)
+                raise
+            else:
+                if pool:
+                    pool.record_success(key)
+            finally:
+                _active_key.reset(reset)
+
+    def wait_time(self, tokens=0):
+        """Seconds until the least limited configured provider could take a request."""
+        waits = [pool.wait_time(tokens) for pool in self.key_pools.values()]
+        return min(waits) if waits else 0.0
+
+    def key_usage(self):
+        """Per-key usage counters for every provider with configured keys."""
+        return {name: pool.usage() for name, pool in self.key_pools.items()}
+
+    @property
+    def local_enabled(self):
+        return self.ollama["priority"] != "off"
+
+    @property
+    def offline(self):
+        """True while forced offline or since a cloud provider recently couldn't be reached."""
+        return self.force_offline or time.monotonic() < self.offline_until
+
+    def _note_connectivity(self, name, error=None):
+        """Cloud outcomes drive local-first: unreachable -> offline for a while, any answer -> online."""
+        if name == "ollama":
+            return
+        if error is None:
+            self.offline_until = 0.0
+        elif is_connection_error(error):
+            if not self.offline:
+                self.logger.info(f"{name} unreachable, going local-first")
+            self.offline_until = time.monotonic() + self.ollama["offline_recheck"]
+
+    def _place_local(self, ranked):
+        """Puts the local tier first (offline / local-first) or last; forced offline keeps only it."""
+        if self.force_offline:
+            return [name for name in ranked if name == "ollama"]
+        if "ollama" not in ranked:
+            return ranked
+        cloud = [name for name in ranked if name != "ollama"]
+        if self.offline or self.ollama["priority"] == "first":
+            return ["ollama"] + cloud
+        return cloud + ["ollama"]
+
+    def configured_providers(self):
+        """Names of providers that have credentials configured (plus the local Ollama tier), in auto-mode order."""
+        order = [name for name in SpecsConfig.PROVIDER_ORDER if name in self.backends]
+        order += [name for name in self.backends if name not in order]  # Backends registered by the app
+        return [name for name in order if self.backends[name].available()]
+
+    def _request_tokens(self, text, system_prompt, history):
+        """Estimated tokens-per-minute cost of a request (prompt + expected answer)."""
+        prompt = estimate_tokens(system_prompt) + estimate_tokens(text)
+        prompt += sum(estimate_tokens(msg['content']) for msg in history or [])
+        return prompt + SpecsConfig.EXPECTED_COMPLETION_TOKENS
+
+    def _rank(self, names, tokens):
+        """
+        Health order (open circuits dropped), then providers that would have to queue longer
+        than the auto-mode wait go to the back, least-limited first.
         """
-        Auto-mode: Prioritizes Groq (Fastest) -> Gemini (Free/Reliable) -> Claude -> Local
+        ranked = self.health.order(names)
+        max_wait = self.limiter.waits["auto"]
+        waits = {name: self.key_pools[name].wait_time(tokens) if name in self.key_pools else 0.0 for name in ranked}
+        return sorted(ranked, key=lambda name: (waits[name] > max_wait, waits[name] if waits[name] > max_wait else 0))
+
+    async def prewarm(self):
+        """
+        Opens connections to every configured provider ahead of the first chat turn
+        (and loads the local model). Failures are ignored: pre-warming is an optimization,
+        never a requirement.
+        """
+        tasks = [self.backends[name].prewarm() for name in self.configured_providers()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        for backend in self.backends.values():
+            try:
+                await backend.close()
+            except Exception:
+                pass
+        await self.pool.close()
+
+    async def process_query(self, text, system_prompt, history=None, provider="auto", image_data=None, deadline=None):
+        """
+        Auto-mode: Prioritizes Groq (Fastest) -> Gemini (Free/Reliable) -> Claude -> Local (Ollama; first when offline)
         provider: 'auto', 'gemini', 'groq', 'claude', 'ollama', 'openai'
         image_data: Optional PIL Image or bytes for vision tasks.
+        deadline: Turn Deadline; every provider call is bounded by its share of the remaining budget.
         """
         provider = provider.lower()
+        deadline = deadline or Deadline()
+        tokens = self._request_tokens(text, system_prompt, history)
+        explicit_wait = self.limiter.waits["explicit"]
+        route = self.router.decide(text, history, image_data)
+        self.logger.debug(f"Route: {route.tier} (score {route.score}, {', '.join(route.reasons) or 'simple'})")
         
         # --- Vision Handling (Force Gemini/Claude) ---
         if image_data:
+            # Reading text off the screen doesn't need a vision upload
+            if self.ocr and is_read_request(text):
+                result = await self._read_screen(text, system_prompt, history, provider, image_data, deadline)
+                if result:
+                    return result
             # Groq doesn't support vision yet (Llama 3). Fallback to Gemini.
-            if self.gemini_model:
-                # _query_gemini handles retries and returns a dict result
-                return await self._query_gemini(text, system_prompt, history, image_data)
-            return {"error": "Vision requires Gemini API Key."}
-        
-        # --- Specific Provider Requests ---
-        if provider == "groq":
-            if self.groq_client:
+            gemini = self.backends.get("gemini")
+            if gemini and gemini.available():
+                # vision() handles retries and returns a dict result
                 try:
-                    response = await self._query_groq(text, system_prompt, history)
-                    return {"text": response, "source": "Groq"}
-                except Exception as e:
-                    return {"error": f"Groq Error: {e}"}
-            return {"error": "Groq API Key missing."}
-            
-        if provider == "gemini":
-            if self.gemini_model:
-                try:
-                    response = await self._query_gemini(text, system_prompt, history)
-                    return {"text": response, "source": "Google Gemini"}
-                except Exception as e:
-                    return {"error": f"Gemini Error: {e}"}
-            return {"error": "Gemini API Key missing."}
+                    with deadline.stage("vision-encode"):
+                        image = await self.images.encode_async(image_data)
+                    # Same question about a near-identical screen: reuse the last analysis
+                    cached = self.vision_cache.get(image, text)
+                    if cached:
+                        return {"text": cached, "source": "SpecsAI Vision (cached)"}
+                    labels = []
 
-        if provider == "sambanova":
-            try:
-                response = await self._query_sambanova(text, system_prompt, history)
-                return {"text": response, "source": "Sambanova"}
-            except Exception as e:
-                return {"error": f"Sambanova Error: {e}"}
+                    async def look():
+                        result = await gemini.vision(text, system_prompt, image)
+                        if "text" not in result:
+                            raise ValueError(result.get("error", "No response"))
+                        labels.append(result["source"])
+                        return result["text"]
 
-        if provider == "huggingface":
-            try:
-                response = await self._query_huggingface(text, system_prompt, history)
-                return {"text": response, "source": "Hugging Face"}
-            except Exception as e:
-                return {"error": f"Hugging Face Error: {e}"}
+                    answer = await self._tracked("gemini", look, deadline, tokens, explicit_wait, explicit=True)()
+                    self.vision_cache.put(image, text, answer)
+                    return {"text": answer, "source": labels[0]}
+                except Exception as e:
+                    return {"error": f"Gemini Vision Error: {e}"}
+            return {"error": "Vision requires Gemini API Key."}
 
         # --- Auto / SpecsAI Logic (Default) ---
         if provider in ["auto", "specsai"]:
-            # 1. Groq (Llama 3 70B - Super Fast)
-            if self.groq_client:
-                try:
-                    # self.logger.info("Thinking with SpecsAI Brain (Groq Core)...")
-                    response = await self._query_groq(text, system_prompt, history)
-                    if response:
-                         return {"text": response, "source": "SpecsAI (Fast Core)"}
-                except Exception as e:
-                    self.logger.warning(f"Groq Core failed: {e}")
+            # Priority (SpecsConfig.PROVIDER_ORDER): Groq (Llama 3 70B - Super Fast) -> Sambanova (Fast & Free)
+            #        -> Gemini (Flash 2.5 - Reliable) -> Claude -> Hugging Face (Free Backup) -> Ollama (Local)
+            candidates = []
+            for name in self.configured_providers():
+                backend = self.backends[name]
+                if backend.auto_label:
+                    candidates.append((name, backend.auto_label,
+                                       lambda backend=backend: backend.query(text, system_prompt, history, route.tier)))
 
-            # 2. Sambanova (Llama 3.1 70B - Fast & Free)
-            if self.api_keys.get("sambanova"):
-                try:
-                    response = await self._query_sambanova(text, system_prompt, history)
-                    if response:
-                        return {"text": response, "source": "SpecsAI (Sambanova Core)"}
-                except Exception as e:
-                    self.logger.warning(f"Sambanova Core failed: {e}")
-
-            # 3. Gemini (Flash 2.5 - Reliable)
-            if self.gemini_model:
-                try:
-                    # self.logger.info("Thinking with SpecsAI Brain (Gemini Core)...")
-                    response = await self._query_gemini(text, system_prompt, history)
-                    if response:
-                        return {"text": response, "source": "SpecsAI (Smart Core)"}
-                except Exception as e:
-                    self.logger.warning(f"Gemini Core failed: {e}")
+            # Re-order by live health (EWMA latency / error rate) and rate-limit headroom
+            ranked = self._place_local(self._rank([name for name, _, _ in candidates], tokens))
+            candidates = sorted(
+                [(name, source, self._tracked(name, query, deadline, tokens)) for name, source, query in candidates if name in ranked],
+                key=lambda c: ranked.index(c[0])
+            )
 
-            # 4. Hugging Face (Free Inference - Backup)
-            if self.api_keys.get("huggingface"):
-                try:
-                    response = await self._query_huggingface(text, system_prompt, history)
-                    if response:
-                        return {"text": response, "source": "SpecsAI (HF Core)"}
-                except Exception as e:
-                    self.logger.warning(f"Hugging Face Core failed: {e}")
+            if candidates:
+                if self.auto_strategy == "sequential":
+                    result = await self._run_sequential(candidates, deadline)
+                else:
+                    result = await self._run_hedged(candidates, deadline, race=(self.auto_strategy == "race"))
+                if result:
+                    self.logger.info(f"Auto mode answered by {result['provider']}")
+                    return result
 
             return {"error": "No active brain connection available for Auto Mode."}
 
-        return {"error": f"Provider '{provider}' is not supported yet."}
-
-    async def _query_groq(self, text, system_prompt, history):
-        # Create client inside the async context to bind to the current event loop
-        # This prevents "Event loop is closed" or "Future attached to a different loop" errors
-        async with AsyncGroq(api_key=self.api_keys.get("groq")) as client:
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add history
-            if history:
-                for msg in history:
-                    role = "user" if msg['role'] == "user" else "assistant"
-                    messages.append({"role": role, "content": msg['content']})
-                    
-            messages.append({"role": "user", "content": text})
-            
-            completion = await client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1024,
-                top_p=1,
-                stream=False,
-                stop=None,
-            )
-            return completion.choices[0].message.content
+        # --- Specific Provider Requests ---
+        backend = self.backends.get(provider)
+        if backend is None:
+            return {"error": f"Provider '{provider}' is not supported yet."}
+        if not backend.available():
+            return {"error": backend.unavailable_reason()}
+        query = lambda: backend.query(text, system_prompt, history, route.tier)
+        try:
+            response = await self._tracked(provider, query, deadline, tokens, explicit_wait, explicit=True)()
+            return {"text": response, "source": backend.label}
+        except Exception as e:
+            return {"error": f"{backend.label} Error: {e}"}
 
-    async def _query_gemini(self, text, system_prompt, history, image_data=None):
-        # Configure system prompt dynamically
-        # Note: Initial model creation is handled inside the try block below for text,
-        # or we use the fallback logic for vision.
-        
-        if image_data:
-            # Vision Request: Single turn usually
-            # High-Tech Retry Logic for Model Versions
-            # We prioritize REST API for Vision to avoid gRPC/Async loop conflicts in threaded contexts
-            
-            last_error = None
-            
-            # 1. Advanced Fallback: Direct REST API (Primary for Stability)
-            try:
-                # self.logger.info("Vision: Trying Direct REST API...")
-                rest_response = await self._query_gemini_rest(text, image_data, self.api_keys.get("gemini"), system_prompt=system_prompt)
-                if rest_response:
-                    return {"text": rest_response, "source": "SpecsAI Vision (Direct Link)"}
-            except Exception as e:
-                last_error = f"REST Error: {e}"
-            
-            # 2. SDK Fallback (Only if REST fails)
-            models_to_try = ['gemini-2.5-flash', 'gemini-1.5-flash', 'gemini-1.5-flash-8b', 'gemini-1.5-pro']
-            for model_name in models_to_try:
-                try:
-                    # self.logger.info(f"Vision: Trying SDK {model_name}...")
-                    vision_model = genai.GenerativeModel(model_name)
-                    response = await vision_model.generate_content_async([text, image_data])
-                    return {"text": response.text, "source": f"SpecsAI Vision ({model_name})"}
-                except Exception as e:
-                    last_error = f"{last_error} | SDK {model_name}: {e}"
-                    # Continue to next model
-
-            # If all failed, log it securely but return a polite message
-            self.logger.error(f"Vision Analysis Failed after retries. Last error: {last_error}")
-            return {"error": "I'm having trouble seeing the screen right now. My vision sensors are recalibrating. Please try again in a moment."}
-            
-        # --- Standard Text Chat ---
-        # Switch to REST API as PRIMARY for text as well.
-        # This avoids 'InterceptedUnaryUnaryCall' gRPC errors in threaded/async environments (PySide6).
+    async def _read_screen(self, text, system_prompt, history, provider, image_data, deadline):
+        """
+        Local OCR fast path. Returns a result dict, or None when there's too little legible
+        text (e.g. text inside pictures) and the vision model should look instead.
+        provider: The turn's provider; in 'llm' mode it answers from the text read off the screen.
+        """
+        settings = SpecsConfig.OCR
         try:
-            return await self._query_gemini_rest(text, None, self.api_keys.get("gemini"), history=history, system_prompt=system_prompt)
-        except Exception as rest_error:
-            # Fallback to SDK if REST fails (unlikely, but safe)
-            try:
-                chat_history = []
-                if history:
-                    for msg in history:
-                        role = "user" if msg['role'] == "user" else "model"
-                        chat_history.append({"role": role, "parts": [msg['content']]})
-                
-                # Re-initialize model with system prompt if needed
-                try:
-                     model = genai.GenerativeModel('gemini-2.5-flash', system_instruction=system_prompt)
-                except:
-                     model = genai.GenerativeModel('gemini-2.5-flash')
+            with deadline.stage("ocr"):
+                result = await asyncio.to_thread(self.ocr.read, image_data)
+        except Exception as e:
+            self.logger.warning(f"OCR failed: {e}")
+            return None
+        screen_text = result.text[:settings["max_chars"]]
+        if len(screen_text) < settings["min_chars"]:
+            return None
 
-                chat = model.start_chat(history=chat_history)
-                response = await chat.send_message_async(text)
-                return response.text
-            except Exception as sdk_error:
-                raise ValueError(f"Gemini Failed (REST: {rest_error}) (SDK: {sdk_error})")
+        source = "SpecsAI Vision (local OCR)"
+        if settings["mode"] == "llm":
+            prompt = f"{text}\n\n[Text on the user's screen, read locally]\n{screen_text}"
+            answer = await self.process_query(prompt, system_prompt, history, provider, None, deadline)
+            if "text" in answer:
+                return {"text": answer["text"], "source": source}
+        # 'direct' mode, or no text model reachable (e.g. offline / out of quota): read it out
+        return {"text": f"Here's the text on your screen:\n{screen_text}", "source": source}
 
-    async def _query_gemini_rest(self, text, image_data, api_key, history=None, system_prompt=None):
+    def _tracked(self, name, query, deadline, tokens=0, max_wait=None, explicit=False):
         """
-        Advanced Fallback: Direct REST API call to Gemini
-        Bypasses python-google-generativeai SDK if it's outdated or buggy.
-        Supports both Text and Vision.
+        Wraps a provider query so it goes through the key's rate-limit bucket, is bounded by the
+        turn deadline (budget: seconds for this attempt, default all usable time) and its outcome
+        feeds the health registry / circuit breaker. Running out of budget counts as a failure.
+        explicit: The user picked this provider, so it is asked even while its circuit is open.
         """
-        if not api_key:
-            raise ValueError("No Gemini API Key provided for REST call")
+        async def run(budget=None):
+            admitted = self.health.allow(name)
+            if not admitted and not explicit:
+                raise ValueError(f"{name} circuit is open")
+            queued = time.monotonic()
+            try:
+                async with self._lease(name, tokens, max_wait, deadline):
+                    start = time.monotonic()  # Latency excludes time spent queueing for the bucket
+                    if budget is not None:
+                        budget = max(0.0, budget - (start - queued))
+                    with self._request_timeout(deadline.client_timeout(budget)):
+                        response = await deadline.run(name, query(), budget)
+            except (asyncio.CancelledError, RateLimited):
+                # Lost a hedge race / rerouted before sending: not the provider's fault
+                if admitted:
+                    self.health.release(name)
+                raise
+            except Exception as e:
+                self.health.record_failure(name, e)
+                self._note_connectivity(name, e)
+                raise
+            self._note_connectivity(name)
+            if response:
+                self.health.record_success(name, time.monotonic() - start)
+            else:
+                self.health.record_failure(name)
+            return response
+        return run
 
-        # List of models to try (Updated with 2.5-flash)
-        models = ["gemini-2.5-flash", "gemini-1.5-flash", "gemini-1.5-flash-8b", "gemini-1.5-pro"]
-        
-        last_error = None
-        
-        async with aiohttp.ClientSession() as session:
-            for model_name in models:
-                try:
-                    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
-                    
-                    headers = {'Content-Type': 'application/json'}
-                    
-                    # Construct Payload
-                    contents = []
-                    
-                    # Add System Prompt (if supported by model via system_instruction, but for REST simple chat, 
-                    # we often prepend it to the first message or use 'system_instruction' field)
-                    # For v1beta, 'systemInstruction' is a separate field.
-                    payload = {}
-                    
-                    if system_prompt:
-                         payload["systemInstruction"] = {
-                             "parts": [{"text": system_prompt}]
-                         }
-
-                    # Add History
-                    if history:
-                        for msg in history:
-                            role = "user" if msg['role'] == "user" else "model"
-                            contents.append({
-                                "role": role,
-                                "parts": [{"text": msg['content']}]
-                            })
-                            
-                    # Add Current Message
-                    current_parts = [{"text": text}]
-                    if image_data:
-                        # Convert PIL Image to Base64
-                        img_byte_arr = io.BytesIO()
-                        image_data.save(img_byte_arr, format='JPEG')
-                        img_byte_arr = img_byte_arr.getvalue()
-                        base64_image = base64.b64encode(img_byte_arr).decode('utf-8')
-                        
-                        current_parts.append({
-                            "inline_data": {
-                                "mime_type": "image/jpeg",
-                                "data": base64_image
-                            }
-                        })
-                        
-                    contents.append({
-                        "role": "user",
-                        "parts": current_parts
-                    })
-                    
-                    payload["contents"] = contents
-
-                    async with session.post(url, headers=headers, json=payload) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            # Extract text from response structure
-                            try:
-                                return result['candidates'][0]['content']['parts'][0]['text']
-                            except (KeyError, IndexError):
-                                 raise ValueError(f"Unexpected API Response structure: {result}")
-                        else:
-                            error_text = await response.text()
-                            # If 404 (Model not found) or 500, try next model
-                            if response.status in [404, 500, 503, 429]: # 429 is rate limit, try next model too
-                                last_error = f"{model_name} {response.status}: {error_text}"
-                                continue
-                            else:
-                                raise ValueError(f"REST API Error {response.status}: {error_text}")
-                                
-                except Exception as e:
-                    last_error = e
-                    continue
-        
-        # If we get here, all models failed
-        raise ValueError(f"All REST models failed. Last error: {last_error}")
+    async def _run_sequential(self, candidates, deadline):
+        """Legacy chain: each provider gets an even share of the remaining budget before the next one starts."""
+        for index, (name, source, query) in enumerate(candidates):
+            if deadline.usable() <= 0:
+                break
+            try:
+                response = await query(deadline.share(len(candidates) - index))
+                if response:
+                    return {"text": response, "source": source, "provider": name}
+            except Exception as e:
+                self.logger.warning(f"{name} core failed: {e}")
+        return None
 
-    async def _query_sambanova(self, text, system_prompt, history):
+    async def _run_hedged(self, candidates, deadline, race=False):
         """
-        Sambanova Cloud (Fast Llama 3.1 70B)
-        OpenAI-compatible API
+        Hedged requests: start the primary, and if it hasn't answered within its hedge delay
+        (SpecsConfig.HEDGE_DELAYS) launch the next provider alongside it. A provider that fails
+        triggers the next one immediately. race=True fires every provider at once.
+        The first non-empty answer wins and all other in-flight requests are cancelled.
+        Hedges overlap, so each runs against the whole remaining deadline rather than a share.
         """
-        api_key = self.api_keys.get("sambanova")
-        if not api_key:
-            raise ValueError("Sambanova API Key missing")
-            
-        url = "https://api.sambanova.ai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        if history:
-            for msg in history:
-                role = "user" if msg['role'] == "user" else "assistant"
-                messages.append({"role": role, "content": msg['content']})
-        messages.append({"role": "user", "content": text})
-        
-        payload = {
-            "model": "Meta-Llama-3.1-70B-Instruct",
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 1024
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data['choices'][0]['message']['content']
-                else:
-                    error_text = await response.text()
-                    raise ValueError(f"Sambanova Error {response.status}: {error_text}")
+        loop = asyncio.get_running_loop()
+        tasks = {}
+        next_index = 0
+        next_launch_at = None
+
+        def launch():
+            nonlocal next_index, next_launch_at
+            name, source, query = candidates[next_index]
+            next_index += 1
+            tasks[asyncio.ensure_future(query())] = (name, source)
+            delay = self.hedge_delays.get(name)
+            # None = never hedge past this provider; wait for it to finish or fail
+            next_launch_at = loop.time() + delay if delay is not None else None
+
+        launch()
+        if race:
+            while next_index < len(candidates):
+                launch()
+
+        try:
+            while tasks:
+                timeout = deadline.usable()
+                if next_index < len(candidates) and next_launch_at is not None:
+                    timeout = min(timeout, max(0.0, next_launch_at - loop.time()))
+                
+                done, _ = await asyncio.wait(tasks.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if deadline.usable() <= 0 or next_index >= len(candidates):
+                        # Out of time: whatever is still in flight timed out (and is cancelled below)
+                        for name, _ in tasks.values():
+                            self.health.record_failure(name, DeadlineExceeded(name, deadline.budget))
+                        return None
+                    # Hedge delay elapsed with no answer: bring in the next provider
+                    launch()
+                    continue
+
+                for task in done:
+                    name, source = tasks.pop(task)
+                    try:
+                        response = task.result()
+                        if response:
+                            return {"text": response, "source": source, "provider": name}
+                        self.logger.warning(f"{name} core returned an empty answer")
+                    except Exception as e:
+                        self.logger.warning(f"{name} core failed: {e}")
+
+                # Everything in flight has failed: fall through to the next provider right away
+                if not tasks and next_index < len(candidates):
+                    launch()
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
 
-    async def _query_huggingface(self, text, system_prompt, history):
+    async def process_stream(self, text, system_prompt, history=None, provider="auto", image_data=None, deadline=None,
+                             tier=None):
         """
-        Hugging Face Inference API (Free Tier)
+        Streaming counterpart of process_query. Async generator yielding text chunks as they arrive.
+        Auto mode falls back to the next provider only if the current one fails before its first chunk
+        (once words have been shown/spoken we can't take them back).
+        deadline: Each provider gets a share of the remaining budget to produce its first chunk.
+        tier: Force the SMALL / LARGE model instead of routing on the turn's complexity.
+        Raises ValueError if no provider produced any output.
         """
-        api_key = self.api_keys.get("huggingface")
-        if not api_key:
-            raise ValueError("Hugging Face API Key missing")
-            
-        # Default model or user selected? For now hardcode or get from somewhere. 
-        # We'll use the one from settings passed via Config usually, but here we just use a sensible default if not passed.
-        # Ideally we should pass the model name in arguments, but for now we hardcode the default from settings_manager logic
-        model = "meta-llama/Meta-Llama-3-8B-Instruct" 
-        
-        url = f"https://api-inference.huggingface.co/models/{model}"
-        headers = {"Authorization": f"Bearer {api_key}"}
-        
-        # Simple prompt formatting for Llama 3
-        full_prompt = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n{system_prompt}<|eot_id|>"
-        
-        if history:
-            for msg in history:
-                role = "user" if msg['role'] == "user" else "assistant"
-                full_prompt += f"<|start_header_id|>{role}<|end_header_id|>\n\n{msg['content']}<|eot_id|>"
-                
-        full_prompt += f"<|start_header_id|>user<|end_header_id|>\n\n{text}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
-        
-        payload = {
-            "inputs": full_prompt,
-            "parameters": {
-                "max_new_tokens": 1024,
-                "return_full_text": False,
-                "temperature": 0.7
-            }
-        }
+        provider = provider.lower()
+        deadline = deadline or Deadline()
+        tokens = self._request_tokens(text, system_prompt, history)
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if isinstance(data, list) and len(data) > 0:
-                        return data[0]['generated_text']
-                    elif isinstance(data, dict) and 'generated_text' in data:
-                        return data['generated_text']
-                    else:
-                        return str(data)
-                else:
-                    error_text = await response.text()
-                    # Check for loading error (common in free tier)
-                    if "loading" in error_text.lower():
-                         raise ValueError("Model is loading (Cold Boot). Try again in 20s.")
-                    raise ValueError(f"Hugging Face Error {response.status}: {error_text}")
+        # Vision and backends without a streaming API (Hugging Face): the full answer as one chunk.
+        backend = self.backends.get(provider)
+        if image_data or (backend and not backend.streams):
+            result = await self.process_query(text, system_prompt, history, provider, image_data, deadline)
+            if "text" in result:
+                yield result["text"]
+                return
+            raise ValueError(result.get("error", "No response"))
+
+        tier = tier or self.router.decide(text, history).tier
+        auto = provider in ["auto", "specsai"]
+        if backend:
+            chain = [provider]
+        elif auto:
+            names = [name for name in self.configured_providers()
+                     if self.backends[name].auto_label and self.backends[name].streams]
+            chain = self._place_local(self._rank(names, tokens))
+        else:
+            raise ValueError(f"Provider '{provider}' is not supported yet.")
+
+        last_error = None
+        for index, name in enumerate(chain):
+            backend = self.backends[name]
+            if deadline.usable() <= 0:
+                last_error = "turn deadline reached"
+                break
+            if not backend.available():
+                last_error = backend.unavailable_reason()
+                continue
+            # An explicitly chosen provider is asked even while its circuit is open
+            admitted = self.health.allow(name)
+            if not admitted and len(chain) > 1:
+                last_error = f"{name} circuit is open"
+                continue
+            started = False
+            max_wait = self.limiter.waits["auto" if len(chain) > 1 else "explicit"]
+            try:
+                async with self._lease(name, tokens, max_wait, deadline):
+                    start = time.monotonic()
+                    share = deadline.share(len(chain) - index)
+                    stream = backend.stream(text, system_prompt, history, tier)
+                    # Only the wait for the first chunk is bounded: after that the answer is under way
+                    with self._request_timeout(deadline.client_timeout(share, stream=True)):
+                        chunk = await deadline.run(name, self._first_chunk(stream), share)
+                    self._note_connectivity(name)
+                    if chunk:
+                        # Time-to-first-chunk is the latency that matters for streams
+                        self.health.record_success(name, time.monotonic() - start)
+                        started = True
+                        yield chunk
+                        async for chunk in stream:
+                            if chunk:
+                                yield chunk
+                if started:
+                    return
+                self.health.record_failure(name)
+            except RateLimited as e:
+                # Would have been rejected anyway: move on without blaming the provider
+                self.logger.info(str(e))
+                last_error = e
+            except Exception as e:
+                if started:
+                    self.logger.warning(f"{name} stream broke mid-response: {e}")
+                    return
+                self.health.record_failure(name, e)
+                self._note_connectivity(name, e)
+                self.logger.warning(f"{name} stream failed: {e}")
+                last_error = e
+            finally:
+                if not started and admitted:
+                    self.health.release(name)
+
+        # Last cloud resort in auto mode: backends without streaming (Hugging Face)
+        fallbacks = [] if not auto or self.force_offline else [
+            name for name in self.configured_providers()
+            if self.backends[name].auto_label and not self.backends[name].streams
+        ]
+        for name in fallbacks:
+            if deadline.usable() <= 0:
+                break
+            query = lambda backend=self.backends[name]: backend.query(text, system_prompt, history, tier)
+            try:
+                response = await self._tracked(name, query, deadline, tokens)()
+            except Exception as e:
+                last_error = e
+                continue
+            if response:
+                yield response
+                return
+            last_error = f"{name} returned an empty answer"
+
+        raise ValueError(f"No streaming brain available. Last error: {last_error}")
 
+    @staticmethod
+    async def _first_chunk(stream):
+        async for chunk in stream:
+            if chunk:
+                return chunk
+        return None
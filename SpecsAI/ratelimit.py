@@ -0,0 +1,214 @@
+"""
+SpecsAI Rate Limiter
+Client-side token buckets per (provider, API key) for requests-per-minute and tokens-per-minute,
+corrected by the provider's own rate-limit headers. Requests wait briefly for a free slot or
+are rerouted to another provider before the server has to reject them with a 429.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from .config import SpecsConfig
+
+
+def key_id(api_key):
+    """Short, non-reversible id for an API key (keys never appear in stats or logs)."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+def parse_duration(value):
+    """'7.66s', '2m59.56s', '20ms', '1h2m' or plain seconds -> float seconds (None if unparseable)."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP date."""
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimited(Exception):
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} rate limited for {retry_after:.1f}s (client-side)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at per_minute / 60 units per second."""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)  # A single oversized request must still be possible
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def cap(self, remaining, now):
+        """Server says only `remaining` units are left: never believe we have more."""
+        self._refill(now)
+        self.level = min(self.level, float(remaining))
+
+
+class KeyState:
+    def __init__(self, provider, api_key, limits):
+        self.provider = provider
+        self.key_id = key_id(api_key)
+        self.requests = TokenBucket(limits["rpm"]) if limits.get("rpm") else None
+        self.tokens = TokenBucket(limits["tpm"]) if limits.get("tpm") else None
+        self.blocked_until = 0.0  # Monotonic time before which the server told us not to call
+        self.in_flight = 0
+        self.sent = 0
+        self.throttled = 0        # Server-side 429s
+        self.waited = 0.0         # Seconds spent queueing client-side
+
+    def wait_time(self, tokens, now):
+        waits = [self.blocked_until - now]
+        if self.requests:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens and tokens:
+            waits.append(self.tokens.wait_time(tokens, now))
+        return max(0.0, *waits)
+
+    def take(self, tokens, now):
+        if self.requests:
+            self.requests.take(1, now)
+        if self.tokens and tokens:
+            self.tokens.take(tokens, now)
+        self.sent += 1
+
+    def snapshot(self, now):
+        return {
+            "provider": self.provider,
+            "key": self.key_id,
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+            "requests_left": round(self.requests.level, 1) if self.requests else None,
+            "tokens_left": round(self.tokens.level) if self.tokens else None,
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "waited": round(self.waited, 2),
+        }
+
+
+class RateLimiter:
+    def __init__(self, limits=None, waits=None):
+        self.limits = {name: dict(values) for name, values in SpecsConfig.RATE_LIMITS.items()}
+        for name, values in (limits or {}).items():
+            self.limits.setdefault(name, {}).update(values)
+        self.waits = dict(SpecsConfig.RATE_LIMIT_WAIT, **(waits or {}))
+        self.logger = logging.getLogger("SpecsAI.RateLimit")
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def state(self, provider, api_key):
+        ident = (provider, key_id(api_key))
+        with self._lock:
+            state = self._states.get(ident)
+            if state is None:
+                state = KeyState(provider, api_key, self.limits.get(provider, {}))
+                self._states[ident] = state
+            return state
+
+    def wait_time(self, provider, api_key, tokens=0):
+        """Seconds until a request of `tokens` could go out on this key (0 = right now)."""
+        state = self.state(provider, api_key)
+        with self._lock:
+            return state.wait_time(tokens, time.monotonic())
+
+    async def acquire(self, provider, api_key, tokens=0, max_wait=None):
+        """
+        Takes a request slot, sleeping if the bucket frees up within max_wait.
+        Raises RateLimited if the key is limited for longer (callers reroute instead).
+        """
+        max_wait = self.waits["auto"] if max_wait is None else max_wait
+        state = self.state(provider, api_key)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = state.wait_time(tokens, now)
+                if wait <= 0:
+                    state.take(tokens, now)
+                    state.waited += waited
+                    return state
+            if waited + wait > max_wait:
+                raise RateLimited(provider, wait)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    @asynccontextmanager
+    async def slot(self, provider, api_key, tokens=0, max_wait=None):
+        """acquire() + in-flight accounting for the duration of the request."""
+        state = await self.acquire(provider, api_key, tokens, max_wait)
+        state.in_flight += 1
+        try:
+            yield state
+        finally:
+            state.in_flight -= 1
+
+    def observe(self, provider, api_key, status=None, headers=None, retry_after=None):
+        """Feeds a response's status / rate-limit headers back into the buckets."""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        state = self.state(provider, api_key)
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in (("requests", state.requests), ("tokens", state.tokens)):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                if bucket:
+                    bucket.cap(remaining, now)
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining <= 0 and reset:
+                    state.blocked_until = max(state.blocked_until, now + reset)
+
+            if status == 429:
+                state.throttled += 1
+                delay = retry_after if retry_after is not None else parse_retry_after(headers.get("retry-after"))
+                if delay is None:
+                    delay = self.waits["default_penalty"]
+                state.blocked_until = max(state.blocked_until, now + delay)
+                self.logger.warning(f"{provider} key {state.key_id} throttled for {delay:.1f}s")
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return [state.snapshot(now) for state in self._states.values()]
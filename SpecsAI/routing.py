@@ -0,0 +1,123 @@
+"""
+SpecsAI Model Routing
+Scores each turn's complexity (length, question type, code / vision / command presence,
+history depth) and sends simple turns to a small fast model, complex ones to the large model.
+Most companion turns are small talk and shouldn't pay 70B latency.
+"""
+import re
+import threading
+from dataclasses import dataclass, asdict
+from .config import SpecsConfig
+
+SMALL = "small"
+LARGE = "large"
+
+_CODE = re.compile(r"```|\b(def|class|import|function|return|SELECT|traceback|exception)\b|[{};]\s*$|\w+\(.*\)", re.IGNORECASE | re.MULTILINE)
+_REASONING = re.compile(
+    r"\b(why|how|explain|compare|difference|analy[sz]e|summari[sz]e|translate|write|essay|story|plan|"
+    r"step by step|pros and cons|debug|fix|optimi[sz]e|calculate|solve|prove|keno|kivabe|bujhao|likho)\b",
+    re.IGNORECASE,
+)
+_COMMAND = re.compile(
+    r"\b(open|launch|start|close|search|find|create|delete|move|rename|play|type|screenshot|folder|file)\b",
+    re.IGNORECASE,
+)
+_MATH = re.compile(r"\d+\s*[-+*/^%]\s*\d+")
+_SMALL_TALK = re.compile(
+    r"^(hi|hello|hey|yo|thanks|thank you|ok|okay|cool|nice|good (morning|night|evening)|bye|"
+    r"how are you|what'?s up|kemon acho|ki khobor)\W*$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RouteDecision:
+    tier: str       # SMALL or LARGE
+    score: float    # 0..1 complexity
+    reasons: list
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    failures: int = 0
+    ewma_latency: float = 0.0   # Seconds, 0 = no data yet
+
+
+class ModelRouter:
+    """
+    mode: 'auto' (score every turn), 'small' / 'large' (always that tier).
+    routes: Per-provider overrides for SpecsConfig.MODEL_ROUTES, e.g. {"groq": {"small": "..."}}.
+    """
+    def __init__(self, mode=None, routes=None, settings=None):
+        self.settings = dict(SpecsConfig.MODEL_ROUTING, **(settings or {}))
+        self.mode = (mode or self.settings["mode"]).lower()
+        self.routes = {name: dict(models) for name, models in SpecsConfig.MODEL_ROUTES.items()}
+        for name, models in (routes or {}).items():
+            self.routes.setdefault(name, {}).update(models)
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def score(self, text, history=None, image_data=None):
+        """Complexity in 0..1 with the reasons that contributed to it."""
+        weights = self.settings["weights"]
+        text = (text or "").strip()
+        reasons = []
+        score = 0.0
+        if image_data is not None:
+            return 1.0, ["vision"]
+        if _SMALL_TALK.match(text):
+            return 0.0, ["small talk"]
+
+        words = len(text.split())
+        if words > self.settings["long_words"]:
+            score += weights["length"]
+            reasons.append("long")
+        elif words > self.settings["long_words"] // 2:
+            score += weights["length"] / 2
+            reasons.append("medium length")
+        if _CODE.search(text):
+            score += weights["code"]
+            reasons.append("code")
+        reasoning = len({m.lower() for m in _REASONING.findall(text)})
+        if reasoning:
+            # 'explain ... step by step' asks for more than a single 'why'
+            score += weights["reasoning"] * min(2, reasoning)
+            reasons.append("reasoning question")
+        if _MATH.search(text):
+            score += weights["math"]
+            reasons.append("math")
+        if _COMMAND.search(text):
+            # Small models are sloppier with the [EXECUTE:] tag protocol
+            score += weights["command"]
+            reasons.append("command")
+        depth = len(history or [])
+        if depth > self.settings["deep_history"]:
+            score += weights["history"]
+            reasons.append("deep history")
+        return min(1.0, score), reasons
+
+    def decide(self, text, history=None, image_data=None):
+        if self.mode in (SMALL, LARGE):
+            return RouteDecision(self.mode, 0.0 if self.mode == SMALL else 1.0, ["forced"])
+        score, reasons = self.score(text, history, image_data)
+        tier = LARGE if score >= self.settings["threshold"] else SMALL
+        return RouteDecision(tier, round(score, 2), reasons)
+
+    def model(self, provider, tier):
+        """Model name for provider/tier, falling back to the large model."""
+        models = self.routes.get(provider, {})
+        return models.get(tier) or models.get(LARGE)
+
+    def record(self, provider, tier, seconds=None, ok=True, alpha=0.2):
+        with self._lock:
+            stats = self.stats.setdefault(f"{provider}/{tier}", RouteStats())
+            stats.calls += 1
+            if not ok:
+                stats.failures += 1
+            elif seconds is not None:
+                stats.ewma_latency = seconds if not stats.ewma_latency else alpha * seconds + (1 - alpha) * stats.ewma_latency
+
+    def snapshot(self):
+        with self._lock:
+            return {route: asdict(stats) for route, stats in self.stats.items()}
@@ -0,0 +1,327 @@
+"""
+SpecsAI Local Server
+Serves one shared SpecsEngine to any number of local clients over an OpenAI-compatible API:
+    POST /v1/chat/completions   (JSON or SSE with "stream": true)
+    GET  /v1/models
+    GET  /v1/ws                 (WebSocket: {"message": ..., "session": ...} -> chunk/done events)
+    GET  /health, /metrics
+Run: python -m SpecsAI.server --port 8765 [--keys keys.json]
+
+Sessions: send "X-Session-Id" (or the OpenAI "user" field) to keep the conversation and its
+memory on the server; only the last user message of each request is read then. Without it the
+request is stateless: its "messages" are the history and its "system" messages are appended to
+the system prompt. Client ids live in their own namespace, so "default" is not the desktop session.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
+from aiohttp import web, WSMsgType
+from .backends import key_env_vars
+from .config import SpecsConfig
+from .context import estimate_tokens
+from .engine import SpecsEngine
+from .health import CLOSED, OPEN
+from .memory import SpecsMemory
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _error(status, message, kind="invalid_request_error", headers=None):
+    return web.json_response({"error": {"message": message, "type": kind}}, status=status, headers=headers)
+
+
+def _message_text(message):
+    """OpenAI content may be a string or a list of typed parts; only text parts are used."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if part.get("type") == "text")
+    return str(content)
+
+
+class SpecsServer:
+    def __init__(self, engine, settings=None):
+        self.engine = engine
+        self.settings = dict(SpecsConfig.SERVER, **(settings or {}))
+        self._slots = asyncio.Semaphore(self.settings["max_concurrent"])
+        self.waiting = 0
+        self.active = 0
+        self.started = time.time()
+        self.stats = {"requests": 0, "completed": 0, "errors": 0, "rejected": 0, "cancelled": 0}
+        self.latency = None        # EWMA seconds per completed turn
+        self.first_chunk = None    # EWMA seconds to first streamed chunk
+
+    # --- App ---
+
+    def build_app(self):
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_get("/v1/ws", self.websocket)
+        app.router.add_get("/health", self.health)
+        app.router.add_get("/metrics", self.metrics)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_cleanup(self, app):
+        await asyncio.to_thread(self.engine.shutdown)
+
+    # --- Queueing / backpressure ---
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Waits for a generation slot; rejects immediately when the waiting room is full."""
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            if self.waiting >= self.settings["max_queue"]:
+                self.stats["rejected"] += 1
+                raise QueueFull()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.settings["queue_timeout"])
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                raise QueueFull()
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def _record_latency(self, attr, seconds, alpha=0.2):
+        previous = getattr(self, attr)
+        setattr(self, attr, seconds if previous is None else alpha * seconds + (1 - alpha) * previous)
+
+    # --- Sessions ---
+
+    def _memory_for(self, session_id):
+        # The readable part is lossy ("a/b" and "a_b"), the hash of the raw id keeps files apart
+        safe_id = re.sub(r"[^\w.-]", "_", session_id)[:32]
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:16]
+        os.makedirs(self.settings["memory_dir"], exist_ok=True)
+        return SpecsMemory(os.path.join(self.settings["memory_dir"], f"{safe_id}-{digest}.json"))
+
+    def _resolve_session(self, session_id, messages):
+        """Returns (session, ephemeral)."""
+        if session_id:
+            key = f"client:{session_id}"  # Never the engine's own sessions ('default', ...)
+            session = self.engine.sessions.get(key)
+            if session is None:
+                memory = self._memory_for(session_id)
+                session = self.engine.session(key, memory=memory)
+                if session.memory is not memory:  # Another caller created the session first
+                    memory.close()
+            return session, False
+        # Stateless request: the client sends the whole conversation every time
+        session = self.engine.session(f"_request-{uuid.uuid4().hex}", memory=SpecsMemory(None))
+        session.history.extend(
+            {"role": m["role"], "content": _message_text(m)}
+            for m in messages[:-1] if m.get("role") in ("user", "assistant")
+        )
+        session.instructions = "\n".join(
+            _message_text(m) for m in messages if m.get("role") == "system" and _message_text(m).strip()
+        )
+        return session, True
+
+    def _provider_for(self, model):
+        """Model naming a registered backend (the keyless local Ollama included) -> that provider, else auto."""
+        return model if model in self.engine.provider.backends else "auto"
+
+    # --- Handlers ---
+
+    async def chat_completions(self, request):
+        self.stats["requests"] += 1
+        try:
+            body = await request.json()
+        except Exception:
+            return _error(400, "Request body must be JSON.")
+        messages = body.get("messages") or []
+        if not messages or messages[-1].get("role") != "user":
+            return _error(400, "'messages' must end with a user message.")
+        text = _message_text(messages[-1]).strip()
+        if not text:
+            return _error(400, "The last user message is empty.")
+
+        model = body.get("model") or "specsai"
+        provider = self._provider_for(model)
+        role = request.headers.get("X-Specs-Role") or body.get("specs_role") or "default"
+        session_id = request.headers.get("X-Session-Id") or body.get("user")
+
+        try:
+            async with self._slot():
+                session, ephemeral = self._resolve_session(session_id, messages)
+                reply_id = session_id or session.id
+                try:
+                    if body.get("stream"):
+                        return await self._stream_completion(request, session, reply_id, text, model, provider, role)
+                    return await self._completion(session, reply_id, text, model, provider, role)
+                finally:
+                    if ephemeral:
+                        self.engine.close_session(session.id)
+        except QueueFull:
+            return _error(429, "Server is busy, retry shortly.", "rate_limit_error", headers={"Retry-After": "1"})
+
+    async def _completion(self, session, reply_id, text, model, provider, role):
+        start = time.perf_counter()
+        try:
+            answer = await session.agenerate(text, provider=provider, role=role)
+        except Exception as e:
+            self.stats["errors"] += 1
+            return _error(500, f"Generation failed: {e}", "server_error")
+        self._record_latency("latency", time.perf_counter() - start)
+        self.stats["completed"] += 1
+        prompt_tokens, completion_tokens = estimate_tokens(text), estimate_tokens(answer)
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }, headers={"X-Session-Id": reply_id})
+
+    async def _stream_completion(self, request, session, reply_id, text, model, provider, role):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Session-Id": reply_id,
+        })
+        await response.prepare(request)
+
+        async def send(delta, finish_reason=None):
+            event = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        start = time.perf_counter()
+        first = True
+        try:
+            await send({"role": "assistant"})
+            async for chunk in session.astream(text, provider=provider, role=role):
+                if first:
+                    self._record_latency("first_chunk", time.perf_counter() - start)
+                    first = False
+                await send({"content": chunk})
+            await send({}, "stop")
+            await response.write(b"data: [DONE]\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            # Client went away: leaving the loop closes the stream and aborts the provider request
+            self.stats["cancelled"] += 1
+            raise
+        self._record_latency("latency", time.perf_counter() - start)
+        self.stats["completed"] += 1
+        await response.write_eof()
+        return response
+
+    async def websocket(self, request):
+        """One socket, many turns: {"message", "session"?, "model"?, "role"?} -> chunk... done."""
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        default_session = request.query.get("session") or f"ws-{uuid.uuid4().hex[:12]}"
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            self.stats["requests"] += 1
+            try:
+                data = json.loads(msg.data)
+                text = str(data["message"]).strip()
+            except Exception:
+                await ws.send_json({"type": "error", "error": "Expected JSON with a 'message' field."})
+                continue
+            session_id = data.get("session") or default_session
+            try:
+                async with self._slot():
+                    session, _ = self._resolve_session(session_id, [])
+                    parts = []
+                    async for chunk in session.astream(text, provider=self._provider_for(data.get("model")),
+                                                       role=data.get("role") or "default"):
+                        parts.append(chunk)
+                        await ws.send_json({"type": "chunk", "content": chunk})
+                    await ws.send_json({"type": "done", "content": "".join(parts), "session": session_id})
+                    self.stats["completed"] += 1
+            except QueueFull:
+                await ws.send_json({"type": "error", "error": "Server is busy, retry shortly."})
+        return ws
+
+    async def models(self, request):
+        names = ["specsai"] + self.engine.provider.configured_providers()
+        return web.json_response({
+            "object": "list",
+            "data": [{"id": name, "object": "model", "owned_by": "specsai"} for name in names],
+        })
+
+    async def health(self, request):
+        providers = self.engine.provider.configured_providers()
+        snapshot = self.engine.health.snapshot()
+        states = {name: snapshot.get(name, {}).get("state", CLOSED) for name in providers}
+        return web.json_response({
+            "status": "ok" if any(state != OPEN for state in states.values()) else "degraded",
+            "providers": states,
+            "uptime": round(time.time() - self.started, 1),
+        })
+
+    async def metrics(self, request):
+        return web.json_response({
+            "requests": self.stats,
+            "active": self.active,
+            "queued": self.waiting,
+            "max_concurrent": self.settings["max_concurrent"],
+            "max_queue": self.settings["max_queue"],
+            "latency_avg": self.latency,
+            "first_chunk_avg": self.first_chunk,
+            "sessions": len(self.engine.sessions),
+            "cache": self.engine.cache_stats(),
+            "providers": self.engine.health.snapshot(),
+            "rate_limits": self.engine.provider.limiter.snapshot(),
+            "keys": self.engine.key_usage(),
+            "routes": self.engine.route_stats(),
+            "speculative": self.engine.speculative_stats(),
+            "vision": {"encoder": self.engine.provider.images.stats(),
+                       "answers": self.engine.provider.vision_cache.stats()},
+        })
+
+
+def load_api_keys(path=None):
+    """
+    Keys from a JSON file ({"groq": "..." or ["...", "..."], ...}) if given, otherwise from each
+    registered backend's environment variable (comma-separated for several keys). Keyless
+    backends (the local Ollama) need neither.
+    """
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {name: os.environ[env] for name, env in key_env_vars().items() if os.environ.get(env)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpecsAI local OpenAI-compatible server")
+    parser.add_argument("--host", default=SpecsConfig.SERVER["host"])
+    parser.add_argument("--port", type=int, default=SpecsConfig.SERVER["port"])
+    parser.add_argument("--keys", help="JSON file with provider API keys (default: environment variables)")
+    parser.add_argument("--max-concurrent", type=int, default=SpecsConfig.SERVER["max_concurrent"])
+    parser.add_argument("--max-queue", type=int, default=SpecsConfig.SERVER["max_queue"])
+    args = parser.parse_args()
+
+    engine = SpecsEngine(api_keys=load_api_keys(args.keys))
+    server = SpecsServer(engine, {"max_concurrent": args.max_concurrent, "max_queue": args.max_queue})
+    web.run_app(server.build_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
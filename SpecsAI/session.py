@@ -0,0 +1,288 @@
+"""
+SpecsAI Sessions
+One conversation = one SpecsSession: its own bounded history, context summary and turn lock.
+All turn work runs on the engine's loop, so sessions share pooled connections and run in
+parallel, while turns inside one session are strictly ordered.
+"""
+import asyncio
+import concurrent.futures
+import time
+from .config import SpecsConfig
+from .context import ContextBuilder
+from .deadline import Deadline
+
+
+class SpecsSession:
+    def __init__(self, engine, session_id, memory=None, summary_store=None, context_budgets=None):
+        self.engine = engine
+        self.id = session_id
+        self.memory = memory or engine.memory
+        self.history = []
+        self.max_history = SpecsConfig.SESSIONS["max_history"]
+        self.context = ContextBuilder(budgets=context_budgets, summary_store=summary_store)
+        self.last_used = time.time()
+        self.last_deadline = None   # Deadline of the latest turn (per-stage timings in .report())
+        self.last_error = None      # Provider error behind the latest generate_response fallback reply
+        self.use_cache = True       # False = always ask the provider (e.g. evaluation runs)
+        self.instructions = ""      # Extra system instructions appended to every prompt (server clients)
+        self._lock = asyncio.Lock()  # One turn at a time per session (bound to the engine loop on first use)
+
+    def close(self):
+        """Releases this session's own memory store (the engine's shared memory stays open)."""
+        if self.memory is not self.engine.memory:
+            self.memory.close()
+
+    @property
+    def busy(self):
+        return self._lock.locked()
+
+    # --- Sync / callback API (any thread) ---
+
+    def generate_response(self, text, callback=None, provider="auto", image_data=None, role="default", token=None,
+                          deadline=None):
+        """Same contract as SpecsEngine.generate_response, scoped to this session."""
+        loop = self.engine._loop
+        if callback:
+            future = loop.submit(self._process(text, provider, image_data, role, deadline))
+            if token:
+                token.bind(future)
+            future.add_done_callback(lambda f: self.engine._deliver(f, callback))
+            return "Thinking..."
+        # Synchronous call (blocking)
+        if not token:
+            return loop.run(self._process(text, provider, image_data, role, deadline))
+        future = token.bind(loop.submit(self._process(text, provider, image_data, role, deadline)))
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            return ""
+
+    def generate_stream(self, text, on_chunk, on_done=None, provider="auto", image_data=None, role="default", token=None,
+                        deadline=None):
+        """Same contract as SpecsEngine.generate_stream, scoped to this session."""
+        async def consume():
+            parts = []
+            async for chunk in self._stream(text, provider, image_data, role, deadline):
+                parts.append(chunk)
+                on_chunk(chunk)
+            full_text = "".join(parts)
+            if on_done:
+                on_done(full_text)
+            return full_text
+
+        future = self.engine._loop.submit(consume())
+        if token:
+            token.bind(future)
+        return future
+
+    def record_turn(self, text, response_text):
+        """Adds an exchange handled outside the engine (e.g. a local command) to the history."""
+        async def record():
+            async with self._lock:
+                self.history.append({"role": "user", "content": text})
+                self._finish_turn(text, response_text)
+        return self.engine._loop.submit(record())
+
+    def rollback_turn(self, text):
+        """Removes the latest exchange if it was for `text` (e.g. a failed turn that is about to be retried)."""
+        async def rollback():
+            async with self._lock:
+                if len(self.history) >= 2 and self.history[-2] == {"role": "user", "content": text} \
+                        and self.history[-1]["role"] == "assistant":
+                    del self.history[-2:]
+                    self.context.truncate(len(self.history))
+        return self.engine._loop.submit(rollback())
+
+    def reset(self):
+        """Forgets this conversation (history + running summary)."""
+        async def clear():
+            async with self._lock:
+                self.history.clear()
+                self.context.reset()
+        return self.engine._loop.submit(clear())
+
+    # --- Async API (any event loop) ---
+
+    async def agenerate(self, text, provider="auto", image_data=None, role="default", deadline=None):
+        """Awaitable full response. Cancelling the awaiting task aborts the provider request."""
+        coro = self._process(text, provider, image_data, role, deadline)
+        if asyncio.get_running_loop() is self.engine._loop.loop:
+            return await coro
+        return await asyncio.wrap_future(self.engine._loop.submit(coro))
+
+    async def astream(self, text, provider="auto", image_data=None, role="default", deadline=None):
+        """
+        Async iterator over response chunks.
+        Works from any event loop: when awaited outside the engine loop, chunks are bridged
+        across threads so provider calls still use the pooled sessions.
+        """
+        if asyncio.get_running_loop() is self.engine._loop.loop:
+            async for chunk in self._stream(text, provider, image_data, role, deadline):
+                yield chunk
+            return
+
+        # Bridge: run the stream on the engine loop, hand chunks to the caller's loop
+        caller_loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for chunk in self._stream(text, provider, image_data, role, deadline):
+                    caller_loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            finally:
+                caller_loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        future = self.engine._loop.submit(pump())
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            if not future.done():
+                future.cancel()
+
+    # --- Turns (engine loop only) ---
+
+    def _prepare(self, text, provider, image_data, role):
+        """Composes the prompt and context window for a turn. Returns (prompt, context, cache_scope)."""
+        engine = self.engine
+        self.last_used = time.time()
+        memory_context = self.memory.get_context_string()
+        system_prompt = engine.prompts.compose(text, role, memory_context, has_image=bool(image_data))
+        if self.instructions:
+            system_prompt = f"{system_prompt}\n\n{self.instructions}"
+        # Instructions change the answer, so they are part of the cache scope like the memory
+        cache_scope = (engine._cache_scope(text, role, memory_context + self.instructions, image_data, self.history)
+                       if self.use_cache else None)
+        # Recent turns that fit the provider's token budget; older ones are folded into a summary
+        context_history, system_prompt = self.context.build(self.history, system_prompt, text, provider)
+        return system_prompt, context_history, cache_scope
+
+    def _start_deadline(self, deadline):
+        self.last_deadline = deadline or Deadline()
+        return self.last_deadline
+
+    async def _process(self, text, provider="auto", image_data=None, role="default", deadline=None):
+        engine = self.engine
+        deadline = self._start_deadline(deadline)
+        queued = time.monotonic()
+        async with self._lock:
+            deadline.record("queue", time.monotonic() - queued)
+            self.last_error = None
+            with deadline.stage("prepare"):
+                system_prompt, context_history, cache_scope = self._prepare(text, provider, image_data, role)
+            # Added inside the lock, so a turn cancelled before it starts leaves no trace in the history
+            self.history.append({"role": "user", "content": text})
+
+            if cache_scope:
+                cached = engine.cache.get(text, cache_scope)
+                if cached:
+                    self._finish_turn(text, cached)
+                    return cached
+
+            try:
+                # The provider splits the budget itself; this is the hard stop that keeps the SLA
+                result = await asyncio.wait_for(
+                    engine.provider.process_query(text, system_prompt, context_history, provider, image_data, deadline),
+                    deadline.usable(),
+                )
+            except asyncio.TimeoutError:
+                result = {"error": f"Turn deadline of {deadline.budget:.1f}s reached"}
+            except asyncio.CancelledError:
+                self._abandon_turn(text)
+                raise
+
+            if "text" in result:
+                response_text = result["text"]
+                engine._store_cached(text, cache_scope, response_text)
+            elif "error" in result:
+                # Sanitize errors for user-facing response; log internals to console
+                print(f"[SpecsAI Error] {result['error']}")
+                self.last_error = result["error"]
+                # Friendly generic message (no secret/error details)
+                response_text = self._fallback_reply(text, deadline)
+            else:
+                response_text = "I am lost for words."
+
+            self._finish_turn(text, response_text)
+            return response_text
+
+    async def _stream(self, text, provider, image_data, role, deadline=None):
+        engine = self.engine
+        deadline = self._start_deadline(deadline)
+        queued = time.monotonic()
+        async with self._lock:
+            deadline.record("queue", time.monotonic() - queued)
+            with deadline.stage("prepare"):
+                system_prompt, context_history, cache_scope = self._prepare(text, provider, image_data, role)
+            self.history.append({"role": "user", "content": text})
+
+            if cache_scope:
+                cached = engine.cache.get(text, cache_scope)
+                if cached:
+                    yield cached
+                    self._finish_turn(text, cached)
+                    return
+
+            parts = []
+            failed = False
+            try:
+                draft_provider = engine.speculative.plan(text, context_history, provider, image_data)
+                if draft_provider:
+                    stream = engine.speculative.stream(text, system_prompt, context_history, provider,
+                                                       draft_provider, deadline)
+                else:
+                    stream = engine.provider.process_stream(text, system_prompt, context_history, provider,
+                                                            image_data, deadline)
+                async for chunk in stream:
+                    parts.append(chunk)
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # Interrupted: keep what was already shown so the next turn has the right context
+                if parts:
+                    self._finish_turn(text, "".join(parts))
+                else:
+                    self._abandon_turn(text)
+                raise
+            except Exception as e:
+                print(f"[SpecsAI Error] {e}")
+                failed = True
+                if not parts:
+                    fallback = self._fallback_reply(text, deadline)
+                    parts.append(fallback)
+                    yield fallback
+
+            response_text = "".join(parts) or "I am lost for words."
+            if not failed and parts:
+                engine._store_cached(text, cache_scope, response_text)
+            self._finish_turn(text, response_text)
+
+    def _fallback_reply(self, text, deadline):
+        """What the avatar says when no provider answered: degraded local answer once out of time."""
+        if deadline.usable() <= 0:
+            return self.engine._degraded_answer()
+        return "I'm having trouble right now. Please try again in a moment."
+
+    def _abandon_turn(self, text):
+        """Removes the user message of a turn that was cancelled before any answer."""
+        if self.history and self.history[-1] == {"role": "user", "content": text}:
+            self.history.pop()
+
+    def _finish_turn(self, text, response_text):
+        # Add to history
+        self.history.append({"role": "assistant", "content": response_text})
+        self.last_used = time.time()
+        if len(self.history) > self.max_history:
+            # Oldest turns leave the raw history (they live on in the rolling summary)
+            drop = len(self.history) - self.max_history
+            self.context.discard(self.history, drop)
+            del self.history[:drop]
+
+        # Simple Memory Extraction (Self-Learning Stub)
+        # In future, this can use a separate LLM call to extract facts
+        if "my name is" in text.lower():
+            name = text.lower().split("my name is")[-1].strip().split()[0].capitalize()
+            self.memory.update("user_name", name)
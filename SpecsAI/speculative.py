@@ -0,0 +1,211 @@
+"""
+SpecsAI Speculative Responses (draft-then-refine)
+For voice turns the first spoken sentence is what users notice. A small fast model drafts the
+opening sentence while the main model works on the full answer. The opening is spoken as soon as
+it is ready; the rest comes from the main model: its own answer when its opening says the same
+thing, otherwise a continuation conditioned on what was already said.
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from .cache import normalize_text
+from .config import SpecsConfig
+from .routing import LARGE, SMALL
+from .streaming import SentenceBuffer
+
+# Outcomes per turn
+MAIN = "main"              # Main model's opening came first (or no usable draft): plain stream
+COMPATIBLE = "compatible"  # Draft opening spoken, main answer continued after its own opening
+CONTINUED = "continued"    # Draft opening spoken, main model asked to continue from it
+
+
+def similarity(a, b):
+    """Word overlap (Jaccard) of two sentences, 0..1."""
+    words_a, words_b = set(normalize_text(a).split()), set(normalize_text(b).split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+@dataclass
+class SpeculativeStats:
+    turns: int = 0
+    main: int = 0
+    compatible: int = 0
+    continued: int = 0
+    draft_failed: int = 0
+    # EWMA seconds from turn start, 0 = no data yet
+    draft_opening: float = 0.0       # Small model's first sentence
+    main_opening: float = 0.0        # Main model's first sentence
+    continuation_start: float = 0.0  # First chunk of a continuation
+    gain: float = 0.0                # main_opening - draft_opening on turns that spoke the draft
+
+
+class _MainStream:
+    """Consumes the main model's stream in the background; readers follow the growing text."""
+    def __init__(self):
+        self.text = ""
+        self.error = None
+        self.finished = False
+        self.opening = asyncio.get_running_loop().create_future()  # Main model's first sentence (or None)
+        self._sentences = SentenceBuffer()
+        self._changed = asyncio.Event()
+
+    async def run(self, stream):
+        try:
+            async for chunk in stream:
+                self.text += chunk
+                if not self.opening.done():
+                    sentences = self._sentences.feed(chunk)
+                    if sentences:
+                        self.opening.set_result(sentences[0])
+                self._changed.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            if not self.opening.done():
+                self.opening.set_result(self._sentences.flush() or None)
+            self._changed.set()
+            await stream.aclose()  # Cancelled mid-answer: release the provider request right away
+
+    def after_opening(self):
+        """Offset in text just past the main model's first sentence."""
+        opening = self.opening.result()
+        index = self.text.find(opening)
+        return index + len(opening) if index >= 0 else 0
+
+    async def chunks(self, offset=0):
+        """Text from offset onwards as it arrives. Raises the stream's error if nothing came after offset."""
+        while True:
+            if len(self.text) > offset:
+                chunk, offset = self.text[offset:], len(self.text)
+                yield chunk
+                continue
+            if self.finished:
+                if self.error and not self.text:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class SpeculativeResponder:
+    def __init__(self, provider, enabled=None, settings=None):
+        """
+        provider: The engine's AIProvider (both drafts and main answers go through its
+                  rate limits, health ordering and deadlines).
+        enabled: Turn the mode on / off (defaults to SpecsConfig.SPECULATIVE['enabled']).
+        """
+        self.provider = provider
+        self.settings = dict(SpecsConfig.SPECULATIVE, **(settings or {}))
+        self.enabled = self.settings["enabled"] if enabled is None else bool(enabled)
+        self.logger = logging.getLogger("SpecsAI.Speculative")
+        self.stats = SpeculativeStats()
+        self._lock = threading.Lock()
+
+    def _draft_provider(self):
+        """First healthy configured provider that has a distinct small model."""
+        router = self.provider.router
+        configured = self.provider.configured_providers()
+        for name in self.settings["draft_providers"]:
+            if name in configured and router.model(name, SMALL) != router.model(name, LARGE) \
+                    and not self.provider.health.is_open(name):
+                return name
+        return None
+
+    def plan(self, text, history, provider, image_data):
+        """Draft provider for this turn, or None when drafting can't help (off, vision, simple turn)."""
+        if not self.enabled or image_data or provider not in ("auto", "specsai"):
+            return None
+        # A turn the router already sends to the small model has nothing to speculate on
+        if self.provider.router.decide(text, history).tier != LARGE:
+            return None
+        return self._draft_provider()
+
+    async def _draft(self, draft_provider, text, system_prompt, history, deadline):
+        """Small model's opening sentence, or None."""
+        sentences = SentenceBuffer()
+        stream = self.provider.process_stream(text, system_prompt, history, draft_provider, None, deadline, tier=SMALL)
+        try:
+            async for chunk in stream:
+                done = sentences.feed(chunk)
+                if done:
+                    return done[0]
+            return sentences.flush() or None
+        except Exception as e:
+            self.logger.info(f"Draft failed: {e}")
+            return None
+        finally:
+            await stream.aclose()  # Only the opening is needed
+
+    async def stream(self, text, system_prompt, history, provider, draft_provider, deadline):
+        """Async generator of response chunks: draft opening first when it wins, then the main model."""
+        start = time.monotonic()
+        main = _MainStream()
+        main.opening.add_done_callback(
+            lambda f: f.cancelled() or not f.result() or self._record(main_opening=time.monotonic() - start))
+        main_task = asyncio.ensure_future(main.run(
+            self.provider.process_stream(text, system_prompt, history, provider, None, deadline, tier=LARGE)))
+        draft_task = asyncio.ensure_future(self._draft(draft_provider, text, system_prompt, history, deadline))
+        continuation = None
+        try:
+            await asyncio.wait({draft_task, main.opening}, return_when=asyncio.FIRST_COMPLETED)
+            opening = draft_task.result() if draft_task.done() else None
+            if opening and "[EXECUTE" in opening:
+                opening = None  # Commands come from the main model only
+            if main.opening.done() or not opening:
+                if draft_task.done() and not opening:
+                    self._record(draft_failed=1)
+                self._record(outcome=MAIN)
+                draft_task.cancel()
+                async for chunk in main.chunks():
+                    yield chunk
+                return
+
+            draft_at = time.monotonic() - start
+            self._record(draft_opening=draft_at)
+            yield opening
+
+            main_opening = await main.opening
+            if main_opening:
+                self._record(gain=(time.monotonic() - start) - draft_at)
+            if main_opening and similarity(opening, main_opening) >= self.settings["compatibility"]:
+                self._record(outcome=COMPATIBLE)
+                async for chunk in main.chunks(main.after_opening()):
+                    yield chunk
+                return
+
+            # The main model would open differently: have it carry on from what was already said
+            self._record(outcome=CONTINUED)
+            main_task.cancel()
+            prompt = system_prompt + "\n\n" + self.settings["continue_prompt"].format(opening=opening)
+            continuation = self.provider.process_stream(text, prompt, history, provider, None, deadline, tier=LARGE)
+            first = True
+            async for chunk in continuation:
+                if first:
+                    self._record(continuation_start=time.monotonic() - start)
+                    chunk, first = " " + chunk.lstrip(), False
+                yield chunk
+        finally:
+            draft_task.cancel()
+            main_task.cancel()
+            if continuation is not None:
+                await continuation.aclose()
+
+    def _record(self, outcome=None, draft_failed=0, alpha=0.2, **latencies):
+        with self._lock:
+            stats = self.stats
+            if outcome:
+                stats.turns += 1
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+            stats.draft_failed += draft_failed
+            for name, seconds in latencies.items():
+                current = getattr(stats, name)
+                setattr(stats, name, seconds if not current else alpha * seconds + (1 - alpha) * current)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(asdict(self.stats), enabled=self.enabled)
@@ -0,0 +1,181 @@
+"""
+SpecsAI Streaming Helpers
+Server-Sent Events / NDJSON parsing for provider streams, sentence chunking for TTS and
+incremental parsing of *actions* / [EXECUTE: ...] tags in streamed responses.
+"""
+import json
+import re
+from dataclasses import dataclass
+
+
+async def iter_sse_json(response):
+    """
+    Yields decoded JSON payloads from an SSE (text/event-stream) aiohttp response.
+    Handles both Gemini (`alt=sse`) and OpenAI-compatible (`data: [DONE]`) streams.
+    """
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8", errors="ignore").strip()
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            continue
+
+
+async def iter_ndjson(response):
+    """Yields decoded JSON objects from a newline-delimited JSON aiohttp response (Ollama)."""
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8", errors="ignore").strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+class SentenceBuffer:
+    """
+    Collects streamed chunks and releases complete sentences as soon as they close.
+    Lets TTS start on the first sentence instead of waiting for the last token.
+    """
+    # Sentence end: . ! ? or Bangla danda, followed by whitespace
+    _BOUNDARY = re.compile(r'(?<=[.!?।])\s+')
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk):
+        """Adds a chunk; returns a list of sentences completed by it."""
+        self._buffer += chunk
+        parts = self._BOUNDARY.split(self._buffer)
+        self._buffer = parts.pop()
+        return [p.strip() for p in parts if p.strip()]
+
+    def flush(self):
+        """Returns whatever is left once the stream ends."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest
+
+
+# ResponseTokenizer event kinds
+SPEECH = "speech"        # Text to be spoken, as it arrives (markup removed)
+ACTION = "action"        # *looks down* -> "looks down"
+EXECUTE = "execute"      # [EXECUTE: open chrome] -> "open chrome"
+SENTENCE = "sentence"    # A sentence closed: text = its spoken part, raw = as written (with markup)
+
+
+@dataclass(frozen=True)
+class ResponseEvent:
+    kind: str
+    text: str
+    raw: str = ""
+
+
+class ResponseTokenizer:
+    """
+    Incremental parser for streamed responses. Every construct is reported the moment it closes,
+    so postures, PC commands and TTS can start mid-response instead of after the last token.
+    Same rules as the whole-string regexes (ActionParser, context cleanup): *...* is an action,
+    [EXECUTE: ...] a command, and . ! ? or Bangla danda followed by whitespace ends a sentence.
+    """
+    _TAG = "[execute:"
+    _END = ".!?।"
+
+    def __init__(self, max_markup=200):
+        """max_markup: An action / tag still open after this many characters was a stray '*' or '[' (spoken as text)."""
+        self.max_markup = max_markup
+        self._state = SPEECH   # Inside: SPEECH, ACTION or EXECUTE
+        self._markup = ""      # Open action / tag as written, or a possible tag start like "[EXE"
+        self._speech = ""      # Spoken part of the current sentence
+        self._raw = ""         # Current sentence as written
+        self._fragment = ""    # Spoken text not yet reported
+        self._last = ""        # Last spoken non-space character
+
+    def feed(self, chunk):
+        """Adds a chunk; returns the events it completed, in order."""
+        events = []
+        while chunk:
+            chunk = self._step(chunk, events)
+        self._report_speech(events)
+        return events
+
+    def flush(self):
+        """Events for whatever is left once the stream ends (an unfinished [EXECUTE: tag is dropped)."""
+        events = []
+        while self._markup and self._state != EXECUTE:
+            rest = self._abandon(events)
+            while rest:
+                rest = self._step(rest, events)
+        self._report_speech(events)
+        if self._raw.strip():
+            events.append(ResponseEvent(SENTENCE, self._speech.strip(), self._raw.strip()))
+        self.__init__(self.max_markup)
+        return events
+
+    def _step(self, text, events):
+        """Consumes the start of text; returns the rest."""
+        if self._state == SPEECH and not self._markup:
+            match = re.search(r"[*\[]", text)
+            if not match:
+                self._speak(text, events)
+                return ""
+            self._speak(text[:match.start()], events)
+            self._markup = match.group()
+            if self._markup == "*":
+                self._state = ACTION
+            return text[match.end():]
+
+        if self._state == SPEECH:
+            # Bracket seen: an [EXECUTE: tag or just text?
+            candidate = self._markup + text
+            if candidate[:len(self._TAG)].lower() == self._TAG:
+                self._state, self._markup = EXECUTE, candidate[:len(self._TAG)]
+                return candidate[len(self._TAG):]
+            if self._TAG.startswith(candidate.lower()):
+                self._markup = candidate
+                return ""
+            self._markup = candidate
+            return self._abandon(events)
+
+        end = text.find("*" if self._state == ACTION else "]")
+        if end < 0 or len(self._markup) + end >= self.max_markup:
+            self._markup += text
+            return self._abandon(events) if len(self._markup) > self.max_markup else ""
+        markup, kind = self._markup + text[:end + 1], self._state
+        self._markup, self._state = "", SPEECH
+        self._raw += markup
+        self._report_speech(events)
+        inner = markup[1:-1] if kind == ACTION else markup[len(self._TAG):-1]
+        if inner.strip():
+            events.append(ResponseEvent(kind, inner.strip(), markup))
+        return text[end + 1:]
+
+    def _abandon(self, events):
+        """The open markup was plain text: speaks its first character, returns the rest for re-parsing."""
+        markup, self._markup, self._state = self._markup, "", SPEECH
+        self._speak(markup[0], events)
+        return markup[1:]
+
+    def _speak(self, text, events):
+        for char in text:
+            if char.isspace() and self._last and self._last in self._END:
+                self._report_speech(events)
+                events.append(ResponseEvent(SENTENCE, self._speech.strip(), self._raw.strip()))
+                self._speech, self._raw, self._last = "", "", ""
+                self._fragment += char
+                continue
+            self._speech += char
+            self._raw += char
+            self._fragment += char
+            if not char.isspace():
+                self._last = char
+
+    def _report_speech(self, events):
+        if self._fragment:
+            events.append(ResponseEvent(SPEECH, self._fragment))
+            self._fragment = ""
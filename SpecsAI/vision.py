@@ -0,0 +1,179 @@
+"""
+SpecsAI Vision Preprocessing
+Screenshots are downscaled and JPEG-encoded once per request (off the event loop), and the
+encoded payload is memoized by content hash, so REST model fallbacks, the SDK fallback and
+repeated questions about the same screen all reuse one small payload.
+Answers are cached by perceptual hash (dHash) + question, so asking again while the screen
+has barely changed skips the vision call entirely.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from .cache import normalize_text
+from .config import SpecsConfig
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def dhash(image, hash_size=8):
+    """
+    Difference hash: grayscale, shrink to (hash_size + 1) x hash_size, one bit per
+    'brighter than its right neighbour'. Small edits (cursor, clock) flip only a few bits.
+    """
+    if np is None:
+        return None
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def _question_key(question):
+    # "What's on my screen?" and "whats on my screen" are the same question
+    return normalize_text(question.replace("'", "").replace("\u2019", ""))
+
+
+@dataclass
+class VisionImage:
+    data: bytes           # Encoded JPEG
+    mime_type: str
+    size: tuple           # (width, height) after downscaling
+    digest: str           # Content hash of the original image
+    phash: int = None     # Perceptual hash of the downscaled image (None without numpy / Pillow)
+
+    @cached_property
+    def base64(self):
+        return base64.b64encode(self.data).decode("utf-8")
+
+    def inline_part(self):
+        """Gemini REST 'inline_data' part."""
+        return {"inline_data": {"mime_type": self.mime_type, "data": self.base64}}
+
+    def sdk_part(self):
+        """Blob dict accepted by google.generativeai's generate_content."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+class ImageEncoder:
+    def __init__(self, settings=None):
+        self.settings = dict(SpecsConfig.VISION, **(settings or {}))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(image):
+        """Content hash of a PIL image (pixels + geometry) or of raw image bytes."""
+        h = hashlib.blake2b(digest_size=16)
+        if isinstance(image, (bytes, bytearray)):
+            h.update(image)
+        else:
+            h.update(f"{image.mode}:{image.size}".encode("utf-8"))
+            h.update(image.tobytes())
+        return h.hexdigest()
+
+    def encode(self, image):
+        """PIL Image or encoded bytes -> VisionImage (downscaled JPEG). Blocking; see encode_async."""
+        if isinstance(image, VisionImage):
+            return image
+        digest = self.digest(image)
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        if isinstance(image, (bytes, bytearray)):
+            if Image is None:
+                # Can't resize without Pillow: send the bytes as they are
+                return VisionImage(bytes(image), "image/jpeg", (0, 0), digest)
+            image = Image.open(io.BytesIO(image))
+
+        max_dimension = self.settings["max_dimension"]
+        if max(image.size) > max_dimension:
+            image = image.copy()
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.settings["jpeg_quality"], optimize=True)
+        encoded = VisionImage(buffer.getvalue(), "image/jpeg", image.size, digest,
+                              dhash(image, self.settings["hash_size"]))
+
+        with self._lock:
+            self._cache[digest] = encoded
+            while len(self._cache) > self.settings["cache_size"]:
+                self._cache.popitem(last=False)
+        return encoded
+
+    async def encode_async(self, image):
+        """encode() on a worker thread: resizing a 4K capture must not stall the engine loop."""
+        if isinstance(image, VisionImage):
+            return image
+        return await asyncio.to_thread(self.encode, image)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+class VisionCache:
+    """Recent screen analyses keyed on (perceptual hash, question), matched within a Hamming distance."""
+    def __init__(self, settings=None):
+        self.settings = dict(SpecsConfig.VISION, **(settings or {}))
+        self.entries = []  # Newest last: {"phash", "question", "response", "created"}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image, question):
+        if image.phash is None:
+            return None
+        question = _question_key(question)
+        now = time.time()
+        with self._lock:
+            self.entries = [e for e in self.entries if now - e["created"] < self.settings["answer_ttl"]]
+            for entry in reversed(self.entries):
+                if entry["question"] == question and \
+                        hamming(entry["phash"], image.phash) <= self.settings["hash_threshold"]:
+                    self.hits += 1
+                    return entry["response"]
+            self.misses += 1
+            return None
+
+    def put(self, image, question, response):
+        if image.phash is None:
+            return
+        with self._lock:
+            self.entries.append({"phash": image.phash, "question": _question_key(question),
+                                 "response": response, "created": time.time()})
+            del self.entries[:-self.settings["answer_cache_size"]]
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
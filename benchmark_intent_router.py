@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.features.intent_router import IntentRouter
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "core", "features", "intent_corpus.json")
+
+
+def evaluate(router, corpus, threshold):
+    """Counts outcomes when only matches above `threshold` take the fast path."""
+    tp = fp = fn = tn = 0
+    wrong = []
+    for item in corpus:
+        intent = router.classify(item["text"])
+        routed = intent.command if intent and intent.confidence >= threshold else None
+        expected = item["command"]
+        if routed and routed == expected:
+            tp += 1
+        elif routed:
+            fp += 1  # Fired a command the user didn't ask for (the costly mistake)
+            wrong.append((item["text"], expected, routed, intent.confidence))
+        elif expected:
+            fn += 1  # Left for the LLM (safe, just slower)
+        else:
+            tn += 1
+    return tp, fp, fn, tn, wrong
+
+
+def main():
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    router = IntentRouter()
+    positives = sum(1 for item in corpus if item["command"])
+    print(f"Corpus: {len(corpus)} utterances ({positives} commands, {len(corpus) - positives} other)")
+
+    # --- Latency ---
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        for item in corpus:
+            router.classify(item["text"])
+    per_call = (time.perf_counter() - start) / (runs * len(corpus)) * 1000
+    print(f"Classification latency: {per_call:.3f} ms per utterance")
+
+    # --- Threshold sweep ---
+    print("\nthreshold  precision  recall  accuracy  false_fires")
+    for threshold in (0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95):
+        tp, fp, fn, tn, _ = evaluate(router, corpus, threshold)
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / positives if positives else 0.0
+        accuracy = (tp + tn) / len(corpus)
+        marker = "  <- default" if threshold == router.threshold else ""
+        print(f"{threshold:9.2f}  {precision:9.2%}  {recall:6.2%}  {accuracy:8.2%}  {fp:11d}{marker}")
+
+    # --- Mistakes at the configured threshold ---
+    _, _, _, _, wrong = evaluate(router, corpus, router.threshold)
+    if wrong:
+        print(f"\nWrong commands at threshold {router.threshold}:")
+        for text, expected, routed, confidence in wrong:
+            print(f"  {text!r}: expected {expected!r}, routed {routed!r} ({confidence:.2f})")
+
+
+if __name__ == '__main__':
+    main()
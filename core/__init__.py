@@ -1,5 +1,11 @@
 # Core: Live2D init, OpenGL config
-
-from .live2d_setup import setup_opengl_format, ensure_live2d
+# Imported on first use, so GUI-free parts (intent router, services) load without PySide6 / live2d
 
 __all__ = ["setup_opengl_format", "ensure_live2d"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import live2d_setup
+        return getattr(live2d_setup, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
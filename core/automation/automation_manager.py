@@ -1,16 +1,22 @@
-import pyautogui
 import os
 import platform
 import subprocess
 import uuid
 
+# Optional: without it (headless / tests) the OS automation calls are unavailable
+try:
+    import pyautogui
+except ImportError:
+    pyautogui = None
+
 class AutomationManager:
     """
     Handles OS-level automation tasks.
     """
     def __init__(self):
         # Safety: Fail-safe corner (Top-Left)
-        pyautogui.FAILSAFE = True
+        if pyautogui:
+            pyautogui.FAILSAFE = True
         # Ensure external storage directory exists on startup
         self.base_path = self._get_storage_directory()
 
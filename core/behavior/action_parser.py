@@ -3,6 +3,8 @@ import re
 class ActionParser:
     """
     Parses natural language text to extract roleplay actions (text within *asterisks*).
+    Works on complete strings; streamed responses use SpecsAI.streaming.ResponseTokenizer,
+    which reports each action the moment its closing asterisk arrives.
     """
     
     @staticmethod
@@ -20,6 +20,41 @@ class FeatureManager:
     Implements Core Features from ROADMAP.md (Section 3).
     Handles system commands, media control, and productivity tasks.
     """
+    # Bangla/English Keywords
+    # Open: open, khulo, chalu koro, start, launch, খুলুন, ওপেন
+    KW_OPEN = ["open", "start", "launch", "khulo", "chalu koro", "on koro", "khule dao", "open koro", "খুলুন", "চালু করুন", "ওপেন"]
+    # Close: close, bondho koro, off koro, বন্ধ করুন
+    KW_CLOSE = ["close", "exit", "quit", "bondho koro", "off koro", "bad dao", "close koro", "বন্ধ করুন"]
+    # Play: play, bajao, chalao, শুনান, বাজান
+    KW_PLAY = ["play", "bajao", "chalao", "shunao", "start", "listen", "শুনান", "বাজান", "প্লে", "play koro"]
+    # Stop: stop, thamao, pause, থামান
+    KW_STOP = ["stop", "pause", "thamao", "darao", "wait", "theme jao", "থামান", "দাঁড়ান", "stop koro"]
+    # Next: next, porer, samne, skip, পরের
+    KW_NEXT = ["next", "skip", "porer", "samne", "porer ta", "next ta", "পরের"]
+    # Prev: previous, back, ager, piche, আগের
+    KW_PREV = ["previous", "back", "ager", "piche", "ager ta", "previous ta", "আগের"]
+    # Volume
+    KW_VOL_UP = ["volume up", "increase volume", "sound barao", "awaj barao", "sound barie dao", "volume barie dao", "ভলিউম বাড়ান"]
+    KW_VOL_DOWN = ["volume down", "decrease volume", "sound komao", "awaj komao", "sound komie dao", "volume komie dao", "ভলিউম কমান"]
+    KW_MUTE = ["mute", "silent", "chup", "sound off", "awaj bondho", "mute koro", "মিউট"]
+
+    # Known application launch targets
+    KNOWN_APPS = {
+        "chrome": "chrome",
+        "google chrome": "chrome",
+        "notepad": "notepad",
+        "calculator": "calc",
+        "word": "winword",
+        "excel": "excel",
+        "powerpoint": "powerpnt",
+        "cmd": "cmd",
+        "terminal": "wt",
+        "explorer": "explorer",
+        "settings": "ms-settings:",
+        "vlc": "vlc",
+        "spotify": "spotify"
+    }
+
     def __init__(self):
         self.os_type = platform.system()
         self.automation = AutomationManager()
@@ -53,11 +88,12 @@ class FeatureManager:
             print(f"YouTube Search Error: {e}")
             return None
 
-    def search_file(self, query, operation='find'):
+    def search_file(self, query, operation='find', token=None):
         """
         Searches for a file or folder in common user directories.
         Returns the path if found, else None.
         operation: 'find' (show in folder) or 'open' (launch/run)
+        token: Optional CancellationToken; the walk stops as soon as it is cancelled.
         """
         # Prioritize likely locations for speed
         search_roots = [
@@ -83,6 +119,10 @@ class FeatureManager:
             
             # Use os.walk with optimization
             for root, dirs, files in os.walk(root_dir):
+                if token and token.cancelled:
+                    print(f"Search for '{query}' cancelled.")
+                    return f"Search for '{query}' cancelled."
+                
                 # Prune skip dirs in-place
                 dirs[:] = [d for d in dirs if d not in skip_dirs and not d.startswith('.')]
                 
@@ -126,10 +166,11 @@ class FeatureManager:
         except Exception as e:
             print(f"Error opening location: {e}")
 
-    def execute_command(self, text):
+    def execute_command(self, text, token=None):
         """
         Parses text and executes PC control features.
         Returns a response string if a command was executed, else None.
+        token: Optional CancellationToken for long-running work (file searches).
         """
         text = text.lower().strip()
         print(f"[FeatureManager] Processing: {text}")
@@ -140,21 +181,7 @@ class FeatureManager:
             target = text.replace("open ", "").strip()
             
             # 1. Try Known Apps Map
-            known_apps = {
-                "chrome": "chrome",
-                "google chrome": "chrome",
-                "notepad": "notepad",
-                "calculator": "calc",
-                "word": "winword",
-                "excel": "excel",
-                "powerpoint": "powerpnt",
-                "cmd": "cmd",
-                "terminal": "wt",
-                "explorer": "explorer",
-                "settings": "ms-settings:",
-                "vlc": "vlc",
-                "spotify": "spotify"
-            }
+            known_apps = self.KNOWN_APPS
             
             # Check exact or partial match in known apps
             for key, cmd in known_apps.items():
@@ -172,9 +199,11 @@ class FeatureManager:
             # 3. Smart Search & Open (The "Chipay Chapay" Feature)
             # If it looks like a folder/file name, search for it.
             # ACTION: 'open' -> Launch it!
-            search_result = self.search_file(target, operation='open')
+            search_result = self.search_file(target, operation='open', token=token)
             if "Found" in search_result:
                 return search_result.replace("Found", "Launched")
+            elif token and token.cancelled:
+                return search_result
             else:
                 # Last Resort: Try to run it as a command
                 try:
@@ -186,7 +215,7 @@ class FeatureManager:
         if text.startswith("search for ") or text.startswith("find "):
             query = text.replace("search for ", "").replace("find ", "").strip()
             # ACTION: 'find' -> Show in folder
-            return self.search_file(query, operation='find')
+            return self.search_file(query, operation='find', token=token)
 
         if "system info" in text:
             import platform
@@ -196,23 +225,10 @@ class FeatureManager:
         def match_any(keywords, text):
             return any(k in text for k in keywords)
 
-        # Bangla/English Keywords
-        # Open: open, khulo, chalu koro, start, launch, খুলুন, ওপেন
-        kw_open = ["open", "start", "launch", "khulo", "chalu koro", "on koro", "khule dao", "open koro", "খুলুন", "চালু করুন", "ওপেন"]
-        # Close: close, bondho koro, off koro, বন্ধ করুন
-        kw_close = ["close", "exit", "quit", "bondho koro", "off koro", "bad dao", "close koro", "বন্ধ করুন"]
-        # Play: play, bajao, chalao, শুনান, বাজান
-        kw_play = ["play", "bajao", "chalao", "shunao", "start", "listen", "শুনান", "বাজান", "প্লে", "play koro"]
-        # Stop: stop, thamao, pause, থামান
-        kw_stop = ["stop", "pause", "thamao", "darao", "wait", "theme jao", "থামান", "দাঁড়ান", "stop koro"]
-        # Next: next, porer, samne, skip, পরের
-        kw_next = ["next", "skip", "porer", "samne", "porer ta", "next ta", "পরের"]
-        # Prev: previous, back, ager, piche, আগের
-        kw_prev = ["previous", "back", "ager", "piche", "ager ta", "previous ta", "আগের"]
-        # Volume
-        kw_vol_up = ["volume up", "increase volume", "sound barao", "awaj barao", "sound barie dao", "volume barie dao", "ভলিউম বাড়ান"]
-        kw_vol_down = ["volume down", "decrease volume", "sound komao", "awaj komao", "sound komie dao", "volume komie dao", "ভলিউম কমান"]
-        kw_mute = ["mute", "silent", "chup", "sound off", "awaj bondho", "mute koro", "মিউট"]
+        # Bangla/English Keywords (shared class tables, also used by the local IntentRouter)
+        kw_open, kw_close, kw_play, kw_stop = self.KW_OPEN, self.KW_CLOSE, self.KW_PLAY, self.KW_STOP
+        kw_next, kw_prev = self.KW_NEXT, self.KW_PREV
+        kw_vol_up, kw_vol_down, kw_mute = self.KW_VOL_UP, self.KW_VOL_DOWN, self.KW_MUTE
 
 
         # --- A. Multimedia & Entertainment ---
@@ -221,7 +237,7 @@ class FeatureManager:
         # Matches: "play [song] on youtube", "play [song]" (if context implies), "can you play [song]"
         # Bangla: "youtube e [song] bajao", "[song] chalao"
         
-        yt_match = re.search(r'(?:play|start|listen to|bajao|chalao|shunao|বাজান|চালান)\s+(?:song\s+|video\s+|gan\s+)?(.+?)(?:\s+(?:on|in)\s+youtube)?$', text)
+        yt_match = re.search(r'\b(?:play|start|listen to|bajao|chalao|shunao|বাজান|চালান)\s+(?:song\s+|video\s+|gan\s+)?(.+?)(?:\s+(?:on|in)\s+youtube)?$', text)
         
         if "youtube" in text and match_any(kw_open, text) and not yt_match:
             webbrowser.open("https://www.youtube.com")
@@ -330,11 +346,14 @@ class FeatureManager:
                  return "Opening WhatsApp Web."
 
         # --- B. System & Desktop Control ---
-        if "shutdown" in text or "turn off" in text or "bondho koro" in text or "off koro" in text:
+        # "gaan bondho koro" / "turn off the lights" are not about the PC: generic verbs need a PC target
+        power_target = re.search(r'\b(?:pc|computer|laptop|system)\b', text)
+        if re.search(r'\bshut ?down\b', text) or \
+                (power_target and re.search(r'\b(?:turn off|bondho koro|off koro)\b', text)):
             self.automation.shutdown_pc()
             return "Shutting down system in 5 seconds. Say 'cancel' to stop."
             
-        if "restart" in text or "reboot" in text or "abar chalu" in text or "restart koro" in text:
+        if re.search(r'\b(?:restart|reboot)\b', text) or (power_target and "abar chalu" in text):
             self.automation.restart_pc()
             return "Restarting system in 5 seconds. Say 'cancel' to stop."
             
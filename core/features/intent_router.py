@@ -0,0 +1,222 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Optional, List, Tuple
+from SpecsAI.config import SpecsConfig
+from core.features.feature_manager import FeatureManager
+
+
+@dataclass
+class IntentMatch:
+    command: str        # Canonical command for FeatureManager.execute_command (same as [EXECUTE: ...])
+    confidence: float   # 0..1
+    source: str         # 'pattern' or 'ngram'
+
+
+class IntentRouter:
+    """
+    Local fast path for deterministic PC commands ("open chrome", "gaan bajao").
+    Sits in front of the LLM: high-confidence commands run immediately through
+    FeatureManager, anything ambiguous is left for the LLM.
+
+    Two scorers:
+    - Compiled patterns for commands with a slot (open <app>, search for <x>, create folder named <x>).
+    - A character 3-gram scorer against exemplars built from FeatureManager's keyword tables and
+      the Banglish examples in SpecsConfig's command prompt.
+    Power actions (shutdown / restart) and vision requests are never fast-pathed.
+    A file search only fires with file context ("invoice file", "report.pdf"), and a lone word
+    only when it is a command on its own ("mute"), not "find love" or "chup".
+    """
+    DEFAULT_THRESHOLD = 0.8
+
+    # Apps / sites we are confident about launching by name
+    CONFIDENT_TARGETS = set(FeatureManager.KNOWN_APPS) | {"youtube", "whatsapp"}
+
+    # Polite wrappers stripped before matching ("can you please open chrome for me?")
+    _PREFIX = re.compile(r'^(?:(?:hey|oi|ei|specs|please|plz|can you|could you|would you|kindly|ektu|beta)\s+)+', re.IGNORECASE)
+    _SUFFIX = re.compile(r'(?:\s+(?:for me|please|plz|now|na|ken|to|ekhon))+$', re.IGNORECASE)
+
+    # A search walks the file system: only when the user is clearly looking for a file
+    _FILE_CONTEXT = re.compile(r'\b(?:files?|folders?|documents?|docs?|photos?|pictures?|videos?|downloads?|pdfs?)\b'
+                               r'|\w\.[a-z0-9]{2,4}\b', re.IGNORECASE)
+    # Single words that are unambiguous commands by themselves
+    SINGLE_WORD_COMMANDS = {"mute": "mute", "unmute": "mute"}
+
+    _PATTERNS = [
+        # English open: "open chrome", "launch the notepad app"
+        ("open", re.compile(r'^(?:open|launch|start)\s+(?:up\s+)?(?:the\s+|my\s+)?(?P<target>[\w\s.]+?)(?:\s+(?:app|application|browser))?$', re.IGNORECASE)),
+        # Banglish open: "chrome ta khule dao", "specs folder ta open koro", "chrome on kor"
+        ("open", re.compile(r'^(?P<target>[\w\s.]+?)\s+(?:ta\s+|ke\s+)?(?:khulo|khule dao|khol|open koro|open kor|on koro|on kor|chalu koro|chalu kor)$', re.IGNORECASE)),
+        # Search: "search for resume", "find my resume file"
+        ("search", re.compile(r'^(?:search for|find|locate)\s+(?:my\s+|the\s+)?(?P<query>[\w\s.]+?)(?:\s+(?:file|folder))?$', re.IGNORECASE)),
+        # Banglish search: "amr resume file ta khuje ber koro"
+        ("search", re.compile(r'^(?:amr\s+|amar\s+)?(?P<query>[\w\s.]+?)\s+(?:file\s+|folder\s+)?(?:ta\s+)?(?:koi\s+)?(?:khuje\s+(?:ber\s+)?(?:koro|kor|dao)|khojo)$', re.IGNORECASE)),
+        # Folder creation: "create a folder named ProjectX"
+        ("folder", re.compile(r'^(?:create|make)\s+(?:a\s+|an\s+)?(?:new\s+)?folder\s+(?:named|called)\s+(?P<name>[\w\s]+)$', re.IGNORECASE)),
+        ("screenshot", re.compile(r'^(?:take\s+(?:a\s+)?)?(?:screenshot|screen shot)(?:\s+(?:nao|naw|tolo|lao|nen))?$|^(?:capture screen|chobi tolo)$', re.IGNORECASE)),
+        ("sysinfo", re.compile(r'^(?:show\s+)?(?:my\s+)?system info(?:rmation)?$', re.IGNORECASE)),
+    ]
+
+    # What an [EXECUTE: ...] tag written by the LLM may run: the commands this router issues itself
+    MODEL_COMMANDS = {"play music", "pause", "next song", "previous song", "volume up", "volume down", "mute",
+                      "take screenshot", "system info"}
+    _MODEL_SLOT_COMMANDS = re.compile(r'^(?:open|search for) [\w\s.-]+$|^create folder named [\w\s-]+$')
+    # Power / close actions: never run straight from model output (FeatureManager matches these loosely)
+    _MODEL_CONFIRM = re.compile(r'\b(?:shut ?down|restart|reboot|turn off|power off|sleep|lock|log ?off|sign out|'
+                                r'close|exit|quit|bondho|off koro|off kor|abar chalu)\b')
+
+    def __init__(self, feature_manager: Optional[FeatureManager] = None, threshold: Optional[float] = None):
+        self.feature_manager = feature_manager
+        self.threshold = threshold if threshold is not None else self.DEFAULT_THRESHOLD
+        self.exemplars = self._build_exemplars()
+        self._lock = threading.Lock()
+
+    # --- Exemplars ---
+
+    @staticmethod
+    def prompt_examples() -> List[Tuple[str, str]]:
+        """(utterance, command) pairs from the Banglish examples the LLM is taught with."""
+        source = SpecsConfig.COMMAND_RULES + SpecsConfig.COMMAND_EXAMPLES
+        pairs = re.findall(r'"([^"]+)",? it means \[EXECUTE: ([^\]]+)\]', source)
+        pairs += re.findall(r'User: "([^"]+)" -> Response: "[^"]*\[EXECUTE: ([^\]]+)\]"', source)
+        return [(u, c.strip()) for u, c in pairs]
+
+    def _build_exemplars(self) -> List[Tuple[str, str, set]]:
+        fm = FeatureManager
+        table = [
+            (fm.KW_NEXT, "next song", ["{} song", "{} gaan", "{}"]),
+            (fm.KW_PREV, "previous song", ["{} song", "{} gaan"]),
+            (fm.KW_VOL_UP, "volume up", ["{}"]),
+            (fm.KW_VOL_DOWN, "volume down", ["{}"]),
+            (fm.KW_MUTE, "mute", ["{}"]),
+            (fm.KW_PLAY, "play music", ["{} music", "gaan {}", "gan {}"]),
+            (fm.KW_STOP, "pause", ["{} music", "gaan {}", "{} song"]),
+        ]
+        utterances = []
+        for keywords, command, templates in table:
+            for kw in keywords:
+                for template in templates:
+                    # A bare single keyword ("samne", "chup", "back") is too ambiguous to be an exemplar
+                    if template == "{}" and " " not in kw:
+                        continue
+                    utterances.append((template.format(kw), command))
+        utterances += [(word, command) for word, command in self.SINGLE_WORD_COMMANDS.items()]
+        utterances += [
+            ("gaan shunao", "play music"), ("resume music", "play music"), ("gaan bondho koro", "pause"),
+            ("volume barao", "volume up"), ("volume komao", "volume down"),
+        ]
+        # Commands with a slot (open X, search for X) are left to the patterns, otherwise
+        # "create a folder named Foo" would score close to the ProjectX example
+        fixed = {command for _, command, _ in table} | {"take screenshot", "system info"}
+        utterances += [(u, c) for u, c in self.prompt_examples() if c in fixed]
+        return [(u.lower(), c, self._grams(self._normalize(u).lower())) for u, c in utterances]
+
+    # --- Text helpers ---
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Drops punctuation and extra spaces; keeps case so folder names survive."""
+        text = re.sub(r"[^\w\s.\u0980-\u09ff]", " ", text.strip())
+        return " ".join(text.split())
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        padded = f" {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _strip_wrappers(self, text: str) -> str:
+        text = self._PREFIX.sub("", text)
+        return self._SUFFIX.sub("", text).strip()
+
+    # --- Scoring ---
+
+    def _match_patterns(self, text: str) -> Optional[IntentMatch]:
+        for kind, pattern in self._PATTERNS:
+            m = pattern.match(text)
+            if not m:
+                continue
+            if kind == "open":
+                target = m.group("target").strip().lower()
+                if target in self.CONFIDENT_TARGETS:
+                    return IntentMatch(f"open {target}", 0.95, "pattern")
+                if target.endswith(" folder") or target.endswith(" file"):
+                    return IntentMatch(f"open {target}", 0.85, "pattern")
+                # Unknown target: could be anything ("open the door"), let the LLM decide
+                return IntentMatch(f"open {target}", 0.6, "pattern")
+            if kind == "search":
+                query = m.group("query").strip()
+                # "find out", "find love": no file context, leave it to the LLM
+                if not self._FILE_CONTEXT.search(text):
+                    return IntentMatch(f"search for {query}", 0.5, "pattern")
+                confidence = 0.9 if len(query.split()) <= 3 else 0.6
+                return IntentMatch(f"search for {query}", confidence, "pattern")
+            if kind == "folder":
+                return IntentMatch(f"create folder named {m.group('name').strip()}", 0.95, "pattern")
+            if kind == "screenshot":
+                return IntentMatch("take screenshot", 0.95, "pattern")
+            if kind == "sysinfo":
+                return IntentMatch("system info", 0.95, "pattern")
+        return None
+
+    def _match_ngrams(self, text: str) -> Optional[IntentMatch]:
+        grams = self._grams(text)
+        best = None
+        for utterance, command, ex_grams in self.exemplars:
+            # Dice coefficient over character trigrams
+            score = 2 * len(grams & ex_grams) / (len(grams) + len(ex_grams))
+            if best is None or score > best.confidence:
+                best = IntentMatch(command, score, "ngram")
+        return best
+
+    def classify(self, text: str) -> Optional[IntentMatch]:
+        """Best guess with its confidence (may be below threshold)."""
+        if not text or not text.strip():
+            return None
+        raw = self._normalize(text)
+        lower = raw.lower()
+        is_question = text.strip().endswith("?") or re.match(r'^(?:how|why|what|when|who|which|should|is|are|do|does|ki|keno|kivabe)\b', lower)
+        clean = self._strip_wrappers(raw)
+
+        candidates = [m for m in (self._match_patterns(clean), self._match_ngrams(clean.lower())) if m]
+        if not candidates:
+            return None
+        best = max(candidates, key=lambda m: m.confidence)
+
+        # Questions and long sentences are usually talk *about* a command, not the command
+        if is_question and not lower.startswith(("can you", "could you", "would you")):
+            best.confidence *= 0.6
+        if len(clean.split()) > 8:
+            best.confidence *= 0.7
+        # One word is only a command when it is one verbatim ("volume" is not "volume up")
+        if len(clean.split()) == 1 and best.source == "ngram" and best.confidence < 1.0:
+            best.confidence *= 0.7
+        return best
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """Returns the intent only if it clears the confidence threshold."""
+        intent = self.classify(text)
+        if intent and intent.confidence >= self.threshold:
+            return intent
+        return None
+
+    @classmethod
+    def check_model_command(cls, command: str) -> str:
+        """
+        Vets a command the LLM wrote in an [EXECUTE: ...] tag before it reaches FeatureManager.
+        Returns 'run', 'confirm' (power / close actions: only with the user's go-ahead) or
+        'unsupported' (not a command we issue ourselves: dropped, never passed on as free text).
+        """
+        command = " ".join(command.lower().split())
+        if cls._MODEL_CONFIRM.search(command):
+            return "confirm"
+        if command in cls.MODEL_COMMANDS or cls._MODEL_SLOT_COMMANDS.match(command):
+            return "run"
+        return "unsupported"
+
+    def execute(self, intent: IntentMatch, token=None) -> str:
+        """Runs the command through FeatureManager (blocking: call off the UI thread)."""
+        if not self.feature_manager:
+            return f"[EXECUTE: {intent.command}]"
+        with self._lock:
+            result = self.feature_manager.execute_command(intent.command, token=token)
+        return result or f"Done: {intent.command}."
@@ -1,13 +1,16 @@
 import threading
 from typing import Optional, Callable
+from SpecsAI.deadline import Deadline
 from SpecsAI.engine import SpecsEngine
 from core.settings.settings_manager import SettingsManager
+from core.services.memory_service import MemoryService
+from core.features.intent_router import IntentRouter
 
 class AIService:
     """
     Bridge between the App UI and the standalone SpecsAI Engine.
     """
-    def __init__(self, online_manager=None, model: str = "llama3"):
+    def __init__(self, online_manager=None, model: str = "llama3", feature_manager=None):
         self.settings = SettingsManager()
         
         # Load API Keys from main project settings
@@ -19,23 +22,92 @@ class AIService:
             "sambanova": self.settings.get("ai", "sambanova_api_key", ""),
             "huggingface": self.settings.get("ai", "huggingface_api_key", "")
         }
+        # Extra keys per provider: requests are load-balanced across all of them
+        for name, extra in (self.settings.get("ai", "api_key_pools", {}) or {}).items():
+            keys = [api_keys.get(name)] if api_keys.get(name) else []
+            api_keys[name] = keys + (list(extra) if isinstance(extra, (list, tuple)) else [extra])
+        
+        # Large-tier models follow the per-provider model settings unless routes say otherwise
+        model_routes = {
+            "groq": {"large": self.settings.get("ai", "groq_model", "llama-3.3-70b-versatile")},
+            "sambanova": {"large": self.settings.get("ai", "sambanova_model", "Meta-Llama-3.1-70B-Instruct")},
+            "claude": {"large": self.settings.get("ai", "claude_model", "claude-3-5-sonnet-20240620")},
+            "huggingface": {"large": self.settings.get("ai", "huggingface_model", "meta-llama/Meta-Llama-3-8B-Instruct")},
+        }
+        for name, models in (self.settings.get("ai", "model_routes", {}) or {}).items():
+            model_routes.setdefault(name, {}).update(models)
+
+        # Long-term user memory (also holds the rolling conversation summary)
+        self.memory_service = MemoryService()
         
         # Initialize the Portable SpecsAI Engine
-        self.engine = SpecsEngine(api_keys=api_keys, storage_path="specs_memory.json")
+        self.engine = SpecsEngine(
+            api_keys=api_keys,
+            storage_path="specs_memory.json",
+            auto_strategy=self.settings.get("ai", "auto_strategy", "hedge"),
+            hedge_delays=self.settings.get("ai", "hedge_delays", {}),
+            context_budgets=self.settings.get("ai", "context_budgets", {}),
+            rate_limits=self.settings.get("ai", "rate_limits", {}),
+            key_strategy=self.settings.get("ai", "key_strategy", "least_loaded"),
+            model_routing=self.settings.get("ai", "model_routing", "auto"),
+            model_routes=model_routes,
+            ocr=self.settings.get("ai", "ocr_backend", "tesseract"),
+            ocr_settings={"languages": self.settings.get("ai", "ocr_languages", "eng")},
+            ollama={
+                "url": self.settings.get("ai", "ollama_url", "http://localhost:11434"),
+                "model": self.settings.get("ai", "ollama_model", "llama3"),
+                "priority": self.settings.get("ai", "ollama_priority", "fallback"),
+            },
+            speculative=self.settings.get("ai", "speculative_drafts", False),
+            summary_store=self.memory_service
+        )
         self.force_offline = False 
+        self._shut_down = False
+
+        # Local fast path: clear PC commands skip the LLM entirely
+        self.intent_router = None
+        if feature_manager and self.settings.get("ai", "intent_router", True):
+            self.intent_router = IntentRouter(feature_manager, self.settings.get("ai", "intent_threshold", 0.8))
+
+    def _match_intent(self, prompt: str, image_data=None):
+        if not self.intent_router or image_data:
+            return None
+        return self.intent_router.match(prompt)
+
+    def _run_intent(self, prompt: str, intent, token=None) -> str:
+        result = self.intent_router.execute(intent, token=token)
+        self.engine.record_turn(prompt, result)
+        return result
+
+    def _deadline(self):
+        """Per-turn time budget, started when the user's message arrives."""
+        return Deadline(self.settings.get("ai", "turn_sla", 12.0))
+
+    def shutdown(self):
+        """
+        Flushes provider health, the response cache and memory, closes pooled connections and
+        stops the engine's loop. Call once when the app exits.
+        """
+        if self._shut_down:
+            return
+        self._shut_down = True
+        self.engine.shutdown()
+        self.memory_service.close()
 
     def set_force_offline(self, enabled: bool):
-        # SpecsEngine currently handles auto-fallback, but we can add explicit offline flag later
+        # Offline: auto mode answers from the local Ollama model only
         self.force_offline = enabled
+        self.engine.provider.force_offline = enabled
 
     def set_system_prompt(self, prompt: str):
         # SpecsEngine has its own Identity Lock (Config.py)
         # But if we need to inject UI-specific instructions (like 'You are currently in SpecsAI App'):
         pass 
 
-    def generate_response(self, prompt: str, callback: Optional[Callable[[str], None]] = None, image_data=None) -> str:
+    def generate_response(self, prompt: str, callback: Optional[Callable[[str], None]] = None, image_data=None, token=None) -> str:
         """
         Delegates generation to the SpecsAI Engine.
+        token: Optional CancellationToken for this turn (see SpecsAI.cancellation).
         """
         # Get active provider from settings (auto/specsai, gemini, groq, etc.)
         provider = self.settings.get("ai", "provider", "auto")
@@ -43,4 +115,40 @@ class AIService:
         # Get active role/persona
         role = self.settings.get("ai", "role", "default")
         
-        return self.engine.generate_response(prompt, callback, provider=provider, image_data=image_data, role=role)
+        intent = self._match_intent(prompt, image_data)
+        if intent:
+            if not callback:
+                return self._run_intent(prompt, intent, token)
+            def run():
+                result = self._run_intent(prompt, intent, token)
+                if not (token and token.cancelled):
+                    callback(result)
+            threading.Thread(target=run, daemon=True).start()
+            return "Thinking..."
+        
+        return self.engine.generate_response(prompt, callback, provider=provider, image_data=image_data, role=role,
+                                             token=token, deadline=self._deadline())
+
+    def generate_stream(self, prompt: str, on_chunk: Callable[[str], None], on_done: Optional[Callable[[str], None]] = None, image_data=None, token=None):
+        """
+        Streams the response: on_chunk fires per text piece (from the engine's loop thread),
+        on_done fires once with the full text. Non-blocking.
+        token: Optional CancellationToken; once cancelled no further callbacks fire.
+        """
+        provider = self.settings.get("ai", "provider", "auto")
+        role = self.settings.get("ai", "role", "default")
+        
+        intent = self._match_intent(prompt, image_data)
+        if intent:
+            def run():
+                result = self._run_intent(prompt, intent, token)
+                if token and token.cancelled:
+                    return
+                on_chunk(result)
+                if on_done:
+                    on_done(result)
+            threading.Thread(target=run, daemon=True).start()
+            return None
+        
+        return self.engine.generate_stream(prompt, on_chunk, on_done, provider=provider, image_data=image_data, role=role,
+                                           token=token, deadline=self._deadline())
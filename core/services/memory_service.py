@@ -1,42 +1,45 @@
-import json
-import os
 import threading
 from typing import List, Dict, Any
+from SpecsAI.memory_store import MemoryStore, database_path
 
 class MemoryService:
     def __init__(self, storage_file="user_memory.json"):
+        """storage_file: 'user_memory.json' is kept in 'user_memory.db' (an existing JSON file is imported once)."""
         self.storage_file = storage_file
         self.memory_lock = threading.Lock()
+        self.store = MemoryStore(database_path(storage_file))
         self.data = self._load_memory()
+        self._facts = set(self.data["user_profile"]["facts"])
+        self._notes = set(self.data["important_notes"])
 
     def _load_memory(self) -> Dict[str, Any]:
-        """Loads memory from JSON file"""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"[Memory] Error loading memory: {e}")
-        
-        # Default Structure
+        """Loads memory from the SQLite store (in-memory copy for building prompts)"""
+        self.store.import_json(self.storage_file, self._from_json)
+        profile = self.store.profile()
         return {
             "user_profile": {
-                "name": None,
-                "preferences": {},
-                "facts": []
+                "name": profile.get("name"),
+                "preferences": profile.get("preferences", {}),
+                "facts": self.store.facts()
             },
-            "conversation_summary": [], # Summaries of past topics
-            "important_notes": [] # Specific things user asked to remember
+            "conversation_summary": self.store.summary(), # Summaries of past topics
+            "important_notes": self.store.notes() # Specific things user asked to remember
         }
 
-    def _save_memory(self):
-        """Saves memory to JSON file"""
-        with self.memory_lock:
-            try:
-                with open(self.storage_file, "w", encoding="utf-8") as f:
-                    json.dump(self.data, f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f"[Memory] Error saving memory: {e}")
+    @staticmethod
+    def _from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Legacy user_memory.json layout -> MemoryStore.import_json parts"""
+        profile = data.get("user_profile", {})
+        return {
+            "profile": {key: profile[key] for key in ("name", "preferences") if profile.get(key)},
+            "facts": profile.get("facts", []),
+            "notes": data.get("important_notes", []),
+            "summary": data.get("conversation_summary", [])
+        }
+
+    def close(self):
+        """Closes the SQLite store (on app exit)"""
+        self.store.close()
 
     def get_context_string(self) -> str:
         """Returns a formatted string of long-term memories for the LLM system prompt"""
@@ -58,23 +61,38 @@ class MemoryService:
 
     def add_fact(self, fact: str):
         """Adds a fact to the user profile"""
-        if fact not in self.data["user_profile"]["facts"]:
+        with self.memory_lock:
+            if fact in self._facts or not self.store.add_fact(fact):
+                return
+            self._facts.add(fact)
             self.data["user_profile"]["facts"].append(fact)
-            self._save_memory()
-            print(f"[Memory] Added fact: {fact}")
+        print(f"[Memory] Added fact: {fact}")
 
     def set_user_name(self, name: str):
         """Sets the user's name"""
-        self.data["user_profile"]["name"] = name
-        self._save_memory()
+        with self.memory_lock:
+            self.data["user_profile"]["name"] = name
+            self.store.set_profile("name", name)
         print(f"[Memory] Set user name: {name}")
 
     def add_note(self, note: str):
         """Adds an important note"""
-        if note not in self.data["important_notes"]:
+        with self.memory_lock:
+            if note in self._notes or not self.store.add_note(note):
+                return
+            self._notes.add(note)
             self.data["important_notes"].append(note)
-            self._save_memory()
-            print(f"[Memory] Added note: {note}")
+        print(f"[Memory] Added note: {note}")
+
+    def get_conversation_summary(self) -> List[str]:
+        """Returns the rolling summary of older conversation turns"""
+        return list(self.data.get("conversation_summary", []))
+
+    def set_conversation_summary(self, lines: List[str]):
+        """Replaces the rolling summary (maintained by SpecsAI's ContextBuilder)"""
+        with self.memory_lock:
+            self.data["conversation_summary"] = list(lines)
+            self.store.set_summary(self.data["conversation_summary"])
 
     def extract_and_update(self, user_input: str, ai_response: str):
         """
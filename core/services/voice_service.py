@@ -290,8 +290,8 @@ class VoiceService(QObject):
             except Exception as e:
                 print(f"Failed to save voice setting: {e}")
 
-    def speak(self, text: str, display_text: str = None, metadata: dict = None):
-        """Add text to the speech queue"""
+    def speak(self, text: str, display_text: str = None, metadata: dict = None, token=None):
+        """Add text to the speech queue (entries whose cancellation token fires are dropped)"""
         # If text contains asterisks (actions), remove them for speech
         import re
         clean_text = re.sub(r'\*.*?\*', '', text) # Remove *actions*
@@ -299,7 +299,7 @@ class VoiceService(QObject):
         if not clean_text.strip():
             return
             
-        self._speech_queue.put((clean_text, display_text or text, metadata or {}))
+        self._speech_queue.put((clean_text, display_text or text, metadata or {}, token))
 
     def _detect_language(self, text: str) -> str:
         """Detects language code from text with heuristics for better stability"""
@@ -389,14 +389,22 @@ class VoiceService(QObject):
             try:
                 queue_item = self._speech_queue.get(timeout=1)
                 metadata = {}
+                token = None
                 if isinstance(queue_item, tuple):
-                    if len(queue_item) == 3:
+                    if len(queue_item) == 4:
+                        text, display_text, metadata, token = queue_item
+                    elif len(queue_item) == 3:
                         text, display_text, metadata = queue_item
                     else:
                         text, display_text = queue_item
                 else:
                     text, display_text = queue_item, queue_item
                 
+                # Turn was superseded or stopped while this sentence waited in the queue
+                if token and token.cancelled:
+                    self._speech_queue.task_done()
+                    continue
+                
                 print(f"Voice Service processing: {text[:20]}...") # Debug
                 
                 # Determine Voice
@@ -447,13 +455,15 @@ class VoiceService(QObject):
                         # --- Edge TTS (Online) ---
                         print(f"Speaking via Edge TTS: {current_profile.name}")
                         try:
-                            self._speak_edge(text, current_profile.engine_id, current_profile.pitch, current_profile.rate, current_profile.volume, display_text, metadata)
+                            self._speak_edge(text, current_profile.engine_id, current_profile.pitch, current_profile.rate, current_profile.volume, display_text, metadata, token)
                         except Exception as edge_err:
+                            if token and token.cancelled:
+                                raise
                             # Log quietly, don't spam console if it's just a language mismatch (handled above, but just in case)
                             print(f"EdgeTTS warning: {str(edge_err)[:50]}... (Retrying)")
                             # Retry with reliable English voice (Aria) to avoid silence
                             # This handles cases where 'Kannada' voice fails on 'Latin' text
-                            self._speak_edge(text, "en-US-AriaNeural", display_text=display_text, metadata=metadata)
+                            self._speak_edge(text, "en-US-AriaNeural", display_text=display_text, metadata=metadata, token=token)
                             
                     else:
                         # --- System TTS (Offline) ---
@@ -476,7 +486,9 @@ class VoiceService(QObject):
                 except Exception as e:
                     print(f"TTS Error: {e}")
                     # Fallback to system if edge fails
-                    if current_profile and (current_profile.provider == "edge-tts" or current_profile.provider == "edge-tts-preset"):
+                    if token and token.cancelled:
+                        pass
+                    elif current_profile and (current_profile.provider == "edge-tts" or current_profile.provider == "edge-tts-preset"):
                          print("Falling back to system voice...")
                          try:
                              self.speech_metadata_ready.emit(metadata)
@@ -499,7 +511,7 @@ class VoiceService(QObject):
         except: pass
 
 
-    def _speak_edge(self, text, voice_name, pitch="+0Hz", rate="+0%", volume="+0%", display_text=None, metadata=None):
+    def _speak_edge(self, text, voice_name, pitch="+0Hz", rate="+0%", volume="+0%", display_text=None, metadata=None, token=None):
         """Helper to generate and play Edge TTS audio"""
         # Create a temporary file
         # We use a fixed temp directory to avoid permission issues
@@ -517,6 +529,10 @@ class VoiceService(QObject):
             # Run async generation
             asyncio.run(_generate_and_save())
             
+            # Cancelled while the audio was being synthesized: never play it
+            if token and token.cancelled:
+                return
+            
             if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
                 print(f"EdgeTTS: Playing {output_file}")
                 
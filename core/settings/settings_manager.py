@@ -30,10 +30,25 @@ class SettingsManager:
         return {
             "ai": {
                 "provider": "auto", # auto (Fastest/Smartest), gemini, ollama, openai, claude
+                "auto_strategy": "hedge", # sequential, hedge (staggered fallbacks), race (all at once)
+                "hedge_delays": {}, # Per-provider seconds before hedging, e.g. {"groq": 1.0}
+                "context_budgets": {}, # Per-provider input token budgets, e.g. {"groq": 4000}
+                "rate_limits": {}, # Per-provider quotas, e.g. {"groq": {"rpm": 30, "tpm": 12000}}
+                "api_key_pools": {}, # Extra keys per provider, e.g. {"groq": ["gsk_...", "gsk_..."]}
+                "key_strategy": "least_loaded", # How requests spread over pooled keys: least_loaded, round_robin
+                "model_routing": "auto", # auto (8B for simple turns, 70B for complex), small, large
+                "model_routes": {}, # Per-provider models, e.g. {"groq": {"small": "llama-3.1-8b-instant"}}
+                "ocr_backend": "tesseract", # Local OCR for "read this text" screen questions ('none' = always use vision)
+                "ocr_languages": "eng", # Tesseract language packs, e.g. "eng+ben"
+                "turn_sla": 12.0, # Seconds the avatar may take to answer (a degraded local reply after that)
+                "intent_router": True, # Run clear PC commands locally without an LLM round trip
+                "intent_threshold": 0.8, # Minimum router confidence for the local fast path
+                "speculative_drafts": False, # Speak a fast small model's opening sentence while the main model answers
                 "gemini_api_key": "",
                 "gemini_model": "gemini-1.5-flash", # Revert to 1.5-flash as default (most stable free tier)
                 "ollama_url": "http://localhost:11434",
                 "ollama_model": "llama3",
+                "ollama_priority": "fallback", # Local tier in auto mode: fallback (last resort, first when offline), first, off
                 "openai_api_key": "",
                 "openai_model": "gpt-4o-mini",
                 "groq_api_key": "",
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SpecsAI.engine import SpecsEngine
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """SpecsEngine with every file under tmp_path, no pre-warm and no local Ollama tier."""
+    engines = []
+
+    def make(**kwargs):
+        options = dict(prewarm=False, storage_path=str(tmp_path / "memory.json"),
+                       health_path=str(tmp_path / f"health-{len(engines)}.json"), model_cache_path=None,
+                       cache_path=str(tmp_path / "cache.json"), ocr="none", ollama={"priority": "off"})
+        options.update(kwargs)
+        engine = SpecsEngine(**options)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.shutdown()
+
+
+@pytest.fixture
+def make_provider():
+    """AIProvider for groq + sambanova with in-memory health and rate limits that never queue."""
+    from SpecsAI.health import HealthRegistry
+    from SpecsAI.network import SessionPool
+    from SpecsAI.providers import AIProvider
+    from SpecsAI.ratelimit import RateLimiter
+
+    def make(**kwargs):
+        options = dict(api_keys={"groq": "gk", "sambanova": "sk"}, pool=SessionPool(), health=HealthRegistry(None),
+                       model_cache_path=None, limiter=RateLimiter({"groq": {"rpm": 10000, "tpm": None},
+                                                                   "sambanova": {"rpm": 10000, "tpm": None}}),
+                       ocr="none", ollama={"priority": "off"})
+        options.update(kwargs)
+        return AIProvider(**options)
+
+    return make
+
+
+def fake_query(calls, name, delay=0.0, answer=None, error=None):
+    """Backend query that records start / end / cancellation in calls."""
+    import asyncio
+
+    async def query(text, system_prompt, history, tier="large"):
+        calls.append((name, "start"))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append((name, "cancelled"))
+            raise
+        if error:
+            raise error
+        calls.append((name, "done"))
+        return answer if answer is not None else f"{name} answer"
+
+    return query
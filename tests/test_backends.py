@@ -0,0 +1,32 @@
+from SpecsAI.backends import backend_names, key_env_vars
+from SpecsAI.server import SpecsServer, load_api_keys
+
+
+def test_key_env_vars_cover_every_keyed_backend():
+    env = key_env_vars()
+    assert env["claude"] == "ANTHROPIC_API_KEY"
+    assert "ollama" in backend_names() and "ollama" not in env
+    assert set(env) == set(backend_names()) - {"ollama"}
+
+
+def test_load_api_keys_from_the_environment(monkeypatch):
+    for variable in key_env_vars().values():
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "ck")
+    monkeypatch.setenv("GROQ_API_KEY", "g1,g2")
+    assert load_api_keys() == {"claude": "ck", "groq": "g1,g2"}
+
+
+def test_server_models_map_to_registered_backends(make_engine):
+    server = SpecsServer(make_engine())
+    assert server._provider_for("claude") == "claude"
+    assert server._provider_for("ollama") == "ollama"
+    assert server._provider_for("specsai") == "auto"
+    assert server._provider_for("gpt-4") == "auto"
+
+
+def test_configured_gemini_model_is_tried_first(make_provider):
+    provider = make_provider(api_keys={"gemini": "key"}, model_routes={"gemini": {"large": "gemini-custom"}})
+    preferred = provider.backends["gemini"].catalogs["key"].preferred
+    assert preferred[0] == "gemini-custom"
+    assert "gemini-2.5-flash" in preferred
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def engine(make_engine):
+    engine = make_engine(api_keys={"groq": "k"}, response_cache=False, rate_limits={"groq": {"rpm": 10000}})
+    engine.memory.update("user_name", "Desktop")
+    engine.memory.add_fact("desktop user's private fact")
+    return engine
+
+
+def capture_turns(engine, fail=()):
+    turns = []
+
+    async def query(text, system_prompt, history, tier="large"):
+        turns.append({"text": text, "system_prompt": system_prompt, "history": list(history)})
+        if text in fail:
+            raise ValueError("Groq Error 500")
+        return f"answer to {text}"
+
+    engine.provider.backends["groq"].query = query
+    return turns
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_prompts_carry_no_user_memory(engine):
+    turns = capture_turns(engine)
+    result = engine.generate_many(["hello", {"prompt": "hi again", "session": "s"}])
+
+    assert result["completed"] == 2
+    for turn in turns:
+        assert "private fact" not in turn["system_prompt"]
+        assert "Desktop" not in turn["system_prompt"]
+    assert not [session_id for session_id in engine.sessions if session_id.startswith("_batch-")]
+
+
+def test_resume_skips_answered_prompts_and_reruns_failed_ones(engine, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    capture_turns(engine, fail={"two"})
+    first = engine.generate_many(["one", "two"], output_path=output, retries=0)
+    assert (first["completed"], first["failed"]) == (1, 1)
+
+    turns = capture_turns(engine)
+    second = engine.generate_many(["one", "two"], output_path=output, retries=0)
+    assert (second["completed"], second["skipped"]) == (1, 1)
+    assert [turn["text"] for turn in turns] == ["two"]
+    assert [record["id"] for record in read_jsonl(output)] == ["0", "1", "1"]
+
+
+def test_resumed_conversation_keeps_its_history(engine, tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"id": "a", "prompt": "my name is Bob", "response": "Hi Bob!", "error": None}) + "\n")
+    turns = capture_turns(engine)
+    prompts = [{"id": "a", "prompt": "my name is Bob", "session": "s"},
+               {"id": "b", "prompt": "what is my name", "session": "s"}]
+
+    result = engine.generate_many(prompts, output_path=str(output))
+
+    assert (result["completed"], result["skipped"]) == (1, 1)
+    assert [turn["text"] for turn in turns] == ["what is my name"]
+    assert turns[0]["history"][:2] == [{"role": "user", "content": "my name is Bob"},
+                                       {"role": "assistant", "content": "Hi Bob!"}]
+    assert "Bob" in turns[0]["system_prompt"]
+
+
+def test_failed_attempt_is_rolled_back_before_the_retry(engine, monkeypatch):
+    # The retry waits at least a second for the rate limits
+    turns = capture_turns(engine)
+    query = engine.provider.backends["groq"].query
+    failures = ["two"]
+
+    async def flaky(text, system_prompt, history, tier="large"):
+        if text in failures:
+            failures.remove(text)
+            turns.append({"text": text, "history": list(history)})
+            raise ValueError("Groq Error 500")
+        return await query(text, system_prompt, history, tier)
+
+    engine.provider.backends["groq"].query = flaky
+    monkeypatch.setattr(engine.provider, "wait_time", lambda tokens=0: 0.0)
+    result = engine.generate_many([{"prompt": "one", "session": "s"}, {"prompt": "two", "session": "s"}],
+                                  retries=1)
+
+    assert result["completed"] == 2
+    assert [turn["text"] for turn in turns] == ["one", "two", "two"]
+    assert turns[2]["history"] == turns[1]["history"] == [{"role": "user", "content": "one"},
+                                                          {"role": "assistant", "content": "answer to one"}]
+
+
+def test_rollback_only_drops_the_matching_exchange(engine):
+    session = engine.session("s")
+    session.record_turn("hello", "hi!").result(2)
+    session.rollback_turn("something else").result(2)
+    assert len(session.history) == 2
+    session.rollback_turn("hello").result(2)
+    assert session.history == [] and session.context.folded == 0
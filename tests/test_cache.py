@@ -0,0 +1,86 @@
+import time
+
+from SpecsAI.cache import ResponseCache, normalize_text
+
+
+def make_cache(tmp_path, **settings):
+    return ResponseCache(str(tmp_path / "cache.json"), settings=dict({"save_delay": 60}, **settings))
+
+
+def test_normalize_text():
+    assert normalize_text("  Hi!!  How are   you? ") == "hi how are you"
+
+
+def test_exact_hits_are_scoped(tmp_path):
+    cache = make_cache(tmp_path, semantic=False)
+    cache.put("Hi!", "default:a", "Hello!")
+    assert cache.get("hi", "default:a") == "Hello!"
+    assert cache.get("hi", "romantic:a") is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_semantic_hit_for_near_duplicates(tmp_path):
+    cache = make_cache(tmp_path, threshold=0.8)
+    if not cache.semantic:
+        return  # numpy missing: exact tier only
+    cache.put("what is your name", "s", "SpecsAI")
+    assert cache.get("what's your name?", "s") == "SpecsAI"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_lru_cap_and_cacheable(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2, max_prompt_words=3, semantic=False)
+    for text in ("one", "two", "three"):
+        cache.put(text, "s", text.upper())
+    assert cache.get("one", "s") is None
+    assert cache.get("three", "s") == "THREE"
+    assert cache.cacheable("hi there")
+    assert not cache.cacheable("this one is far too long")
+    assert not cache.cacheable("!!!")
+
+
+def test_put_does_not_write_synchronously_and_save_flushes(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = make_cache(tmp_path)
+    cache.put("hi", "s", "Hello!")
+    assert not path.exists()  # Deferred to the timer
+    cache.save()
+    assert path.exists()
+    assert make_cache(tmp_path).get("hi", "s") == "Hello!"
+
+
+def test_debounced_writes_are_batched(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = make_cache(tmp_path, save_delay=0.05)
+    for i in range(20):
+        cache.put(f"hi {i}", "s", "Hello!")
+    deadline = time.time() + 2
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(make_cache(tmp_path).entries) == 20
+
+
+def test_time_sensitive_questions_are_not_cacheable(tmp_path):
+    cache = make_cache(tmp_path)
+    for text in ("what time is it", "what's the date today", "weather?", "koyta baje", "latest news"):
+        assert not cache.cacheable(text), text
+    assert cache.cacheable("what is your name")
+
+
+def test_follow_ups_are_scoped_to_the_conversation(make_engine):
+    engine = make_engine(api_keys={"groq": "k"}, rate_limits={"groq": {"rpm": 10000}})
+    answers = iter(["Tea is great.", "Because of the antioxidants.", "Python is a language.", "It is readable."])
+
+    async def query(text, system_prompt, history, tier="large"):
+        return next(answers)
+
+    engine.provider.backends["groq"].query = query
+    tea, python = engine.session("tea"), engine.session("python")
+    assert tea.generate_response("tell me about tea") == "Tea is great."
+    assert tea.generate_response("why?") == "Because of the antioxidants."
+    assert python.generate_response("tell me about python") == "Python is a language."
+    assert python.generate_response("why?") == "It is readable."  # Not the answer cached for tea
+
+    fresh = engine.session("fresh")
+    assert fresh.generate_response("tell me about tea") == "Tea is great."  # Same (empty) context: cached
@@ -0,0 +1,76 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from SpecsAI.cancellation import CancellationToken
+
+
+def test_cancel_is_idempotent_and_runs_callbacks_once():
+    token = CancellationToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("a"))
+    token.cancel()
+    token.cancel()
+    assert token.cancelled
+    assert calls == ["a"]
+    token.on_cancel(lambda: calls.append("late"))  # Already cancelled: runs right away
+    assert calls == ["a", "late"]
+
+
+def test_failing_callback_does_not_stop_the_others():
+    token = CancellationToken()
+    calls = []
+    token.on_cancel(lambda: 1 / 0)
+    token.on_cancel(lambda: calls.append("ok"))
+    token.cancel()
+    assert calls == ["ok"]
+
+
+def test_cancel_from_many_threads_runs_callbacks_once():
+    token = CancellationToken()
+    calls = []
+    token.on_cancel(lambda: calls.append(1))
+    threads = [threading.Thread(target=token.cancel) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+
+
+def test_bind_cancels_the_future():
+    token = CancellationToken()
+    future = token.bind(concurrent.futures.Future())
+    token.cancel()
+    assert future.cancelled()
+
+
+def test_cancelled_stream_closes_the_provider_stream_and_skips_on_done(make_engine):
+    engine = make_engine(api_keys={"groq": "k"}, response_cache=False, rate_limits={"groq": {"rpm": 10000}})
+    closed = threading.Event()
+
+    async def stream(text, system_prompt, history, tier="large"):
+        try:
+            for i in range(100):
+                yield f"word{i} "
+                await asyncio.sleep(0.02)
+        finally:
+            closed.set()
+
+    engine.provider.backends["groq"].stream = stream
+    chunks, done = [], []
+    token = CancellationToken()
+    future = engine.generate_stream("tell me a long story", chunks.append, done.append, provider="groq", token=token)
+    while len(chunks) < 3:
+        time.sleep(0.01)
+    token.cancel()
+
+    assert closed.wait(2)
+    assert future.cancelled()
+    time.sleep(0.1)
+    assert done == []
+    assert len(chunks) < 100
+    # What was already shown stays in the history for the next turn
+    history = engine.default_session.history
+    assert history[-1]["role"] == "assistant" and history[-1]["content"].startswith("word0")
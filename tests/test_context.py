@@ -0,0 +1,122 @@
+from SpecsAI.context import ContextBuilder, estimate_tokens, summarize_turn
+
+
+def turn(role, content):
+    return {"role": role, "content": content}
+
+
+def conversation(pairs, words=20):
+    """`pairs` exchanges of about `words` words each way."""
+    history = []
+    for i in range(pairs):
+        history.append(turn("user", f"Question {i}. " + "word " * words))
+        history.append(turn("assistant", f"Answer {i}. " + "word " * words))
+    return history
+
+
+class SummaryStore:
+    def __init__(self, lines=()):
+        self.lines = list(lines)
+
+    def get_conversation_summary(self):
+        return self.lines
+
+    def set_conversation_summary(self, lines):
+        self.lines = list(lines)
+
+
+def test_estimate_tokens_weights_non_ascii_text():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 40) == 11
+    assert estimate_tokens("আ" * 30) > estimate_tokens("a" * 30)
+
+
+def test_summarize_turn_keeps_the_first_sentence_without_markup():
+    line = summarize_turn(turn("assistant", "*waves* Hello there. [EXECUTE: mute] More text."))
+    assert line == "SpecsAI: Hello there."
+    assert summarize_turn(turn("user", "x" * 50), max_chars=10) == "User: xxxxxxxxxx..."
+    assert summarize_turn(turn("assistant", "*smiles*")) == ""
+
+
+def test_short_history_goes_in_verbatim():
+    builder = ContextBuilder()
+    history = conversation(2)
+    window, prompt = builder.build(history, "SYSTEM", "next")
+    assert window == history
+    assert prompt == "SYSTEM"
+
+
+def test_budget_cut_keeps_the_newest_turns_and_folds_the_rest():
+    builder = ContextBuilder(budgets={"groq": 200})
+    history = conversation(10)
+    window, prompt = builder.build(history, "SYSTEM", "next", provider="groq")
+
+    assert window and window == history[-len(window):]
+    assert window[0]["role"] == "user"
+    used = estimate_tokens(prompt) + estimate_tokens("next") + sum(estimate_tokens(m["content"]) + 4 for m in window)
+    assert used <= 200  # Summary included
+    assert "[EARLIER IN THIS CONVERSATION]" in prompt
+    assert "User: Question 0." in prompt
+    assert builder.folded == len(history) - len(window)
+
+
+def test_each_turn_is_folded_once():
+    store = SummaryStore()
+    builder = ContextBuilder(budgets={"auto": 200}, summary_store=store)
+    history = conversation(10)
+    builder.build(history, "SYSTEM", "next")
+    lines = list(store.lines)
+    builder.build(history, "SYSTEM", "next")
+    assert store.lines == lines  # Nothing new to fold
+
+    history += conversation(1)
+    builder.build(history, "SYSTEM", "next")
+    assert len(store.lines) > len(lines)
+    assert store.lines[:len(lines)] == lines
+
+
+def test_summary_stays_within_its_budget():
+    builder = ContextBuilder(budgets={"auto": 100})
+    builder.settings["summary_tokens"] = 40
+    builder.build(conversation(30), "SYSTEM", "next")
+    assert estimate_tokens("\n".join(builder.summary_lines)) <= 40
+    assert builder.summary_lines[-1].startswith("SpecsAI: Answer")  # Oldest lines dropped first
+
+
+def test_discard_keeps_the_folded_offset_aligned():
+    builder = ContextBuilder(budgets={"auto": 200})
+    history = conversation(10)
+    builder.build(history, "SYSTEM", "next")
+    folded = builder.folded
+
+    builder.discard(history, 4)
+    del history[:4]
+    assert builder.folded == folded - 4
+    window, _ = builder.build(history, "SYSTEM", "next")
+    assert window == history[builder.folded:][-len(window):]
+
+    # Dropping more than was folded summarizes the rest first
+    lines = len(builder.summary_lines)
+    builder.discard(history, builder.folded + 2)
+    assert builder.folded == 0
+    assert len(builder.summary_lines) >= lines
+
+
+def test_truncate_keeps_the_folded_offset_inside_the_history():
+    builder = ContextBuilder(budgets={"auto": 200})
+    history = conversation(10)
+    builder.build(history, "SYSTEM", "next")
+    folded = builder.folded
+    builder.truncate(len(history) - 2)
+    assert builder.folded == folded
+    builder.truncate(folded - 2)
+    assert builder.folded == folded - 2
+
+
+def test_summary_survives_restarts_and_reset_clears_it():
+    store = SummaryStore(["User: earlier question."])
+    builder = ContextBuilder(summary_store=store)
+    _, prompt = builder.build([], "SYSTEM", "hi")
+    assert "User: earlier question." in prompt
+    builder.reset()
+    assert store.lines == [] and builder.folded == 0
@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import pytest
+
+from SpecsAI.deadline import Deadline, DeadlineExceeded
+
+from conftest import fake_query
+
+SETTINGS = {"min_stage": 2.0, "reserve": 0.25}
+
+
+def test_share_splits_what_is_left_but_keeps_a_minimum():
+    deadline = Deadline(12.25, settings=SETTINGS)
+    assert deadline.usable() == pytest.approx(12.0, abs=0.05)
+    assert deadline.share(3) == pytest.approx(4.0, abs=0.05)
+    assert deadline.share(10) == pytest.approx(2.0)
+    assert Deadline(1.25, settings=SETTINGS).share(3) == pytest.approx(1.0, abs=0.05)
+
+
+def test_expired_deadline_has_nothing_usable():
+    deadline = Deadline(0, settings=SETTINGS)
+    assert deadline.expired
+    assert deadline.usable() == 0.0 and deadline.share(2) == 0.0
+
+
+def test_run_raises_and_records_the_stage():
+    deadline = Deadline(5, settings=SETTINGS)
+
+    async def main():
+        assert await deadline.run("fast", asyncio.sleep(0, "ok")) == "ok"
+        await deadline.run("slow", asyncio.sleep(1), 0.05)
+
+    with pytest.raises(DeadlineExceeded) as error:
+        asyncio.run(main())
+    assert error.value.stage == "slow"
+    stages = deadline.report()["stages"]
+    assert [stage["stage"] for stage in stages] == ["fast", "slow"]
+    assert stages[1]["granted"] == pytest.approx(0.05)
+
+
+def test_client_timeout_respects_the_budget():
+    timeout = Deadline(3.25, settings=SETTINGS).client_timeout(1.0)
+    assert timeout.total == pytest.approx(1.0)
+    assert timeout.connect <= 1.0 and timeout.sock_read <= 1.0
+    stream = Deadline(3.25, settings=SETTINGS).client_timeout(1.0, stream=True)
+    assert stream.total is None and stream.sock_read <= 1.0
+
+
+def test_sequential_timeout_counts_as_a_failure(make_provider):
+    provider = make_provider(auto_strategy="sequential")
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", delay=5)
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+
+    deadline = Deadline(1.25, settings=dict(SETTINGS, min_stage=0.1))
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=deadline))
+
+    assert result["provider"] == "sambanova"
+    assert provider.health._get("groq").failures == 1
+    assert provider.health._get("sambanova").failures == 0
+
+
+def test_hedged_timeout_counts_as_a_failure_but_a_lost_hedge_does_not(make_provider):
+    provider = make_provider(hedge_delays={"groq": 0.05, "sambanova": 0.05})
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", delay=5)
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova", delay=5)
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(0.5, settings=SETTINGS)))
+
+    assert "error" in result
+    assert provider.health._get("groq").failures == 1
+    assert provider.health._get("sambanova").failures == 1
+
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova", delay=0.01)
+    groq = provider.health._get("groq").failures
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3, settings=SETTINGS)))
+    assert result["provider"] == "sambanova"
+    assert provider.health._get("groq").failures == groq  # Cancelled loser
+
+
+def test_backend_requests_carry_their_share_of_the_deadline(make_provider):
+    provider = make_provider(auto_strategy="sequential")
+    timeouts = []
+
+    class Response:
+        status, headers = 200, {}
+
+        async def json(self):
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class Session:
+        def post(self, url, timeout=None, **kwargs):
+            timeouts.append(timeout)
+            return Response()
+
+    provider.backends["groq"].session = Session
+    asyncio.run(provider.process_query("hi", "sys", [], "groq", deadline=Deadline(3, settings=SETTINGS)))
+    timeout = timeouts[0]
+    assert 2.5 < timeout.total <= 2.75
+    assert timeout.connect <= 2.75 and timeout.sock_read <= 2.75
+    assert provider._timeout().total is None  # Outside a request: the pool default
+
+
+def test_rate_limit_queueing_stops_at_the_deadline(make_provider):
+    provider = make_provider()
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq")
+    provider.limiter.observe("groq", "gk", 429, {"Retry-After": "3"})  # Within the explicit 10 s wait
+
+    async def main():
+        start = time.monotonic()
+        result = await provider.process_query("hi", "sys", [], "groq", deadline=Deadline(1, settings=SETTINGS))
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(main())
+    assert "error" in result and calls == []
+    assert elapsed < 0.5
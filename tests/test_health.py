@@ -0,0 +1,176 @@
+import asyncio
+
+from SpecsAI.deadline import Deadline
+from SpecsAI.health import CLOSED, HALF_OPEN, OPEN, HealthRegistry, error_status
+
+from conftest import fake_query
+
+
+def registry(tmp_path=None, **settings):
+    path = str(tmp_path / "health.json") if tmp_path else None
+    return HealthRegistry(path, settings=dict({"failure_threshold": 2, "cooldown": 60}, **settings))
+
+
+def test_error_status_reads_sdk_attributes_and_messages():
+    class SDKError(Exception):
+        status_code = 503
+
+    assert error_status(SDKError()) == 503
+    assert error_status(ValueError("Groq Error 429: slow down")) == 429
+    assert error_status(ValueError("quota exceeded")) == 429
+    assert error_status(ValueError("bad request")) is None
+
+
+def test_circuit_opens_after_consecutive_failures_and_probes_once():
+    health = registry()
+    health.record_failure("groq", ValueError("Groq Error 500"))
+    assert health.allow("groq")
+    health.record_failure("groq", ValueError("Groq Error 500"))
+    assert health.providers["groq"].state == OPEN
+    assert health.is_open("groq")
+    assert not health.allow("groq")
+
+    health.providers["groq"].opened_at -= 61  # Cooldown over: one half-open probe
+    assert health.allow("groq")
+    assert health.providers["groq"].state == HALF_OPEN
+    assert not health.allow("groq")
+
+    health.record_success("groq", 0.4)
+    assert health.providers["groq"].state == CLOSED
+    assert health.allow("groq")
+
+
+def test_failed_probe_reopens_and_release_frees_the_probe_slot():
+    health = registry()
+    health.record_failure("groq")
+    health.record_failure("groq")
+    health.providers["groq"].opened_at -= 61
+    assert health.allow("groq")
+    health.release("groq")  # Cancelled hedge: the slot goes back
+    assert health.allow("groq")
+    health.record_failure("groq")
+    assert health.providers["groq"].state == OPEN
+
+
+def test_order_prefers_healthy_providers_and_skips_open_circuits():
+    health = registry()
+    health.record_success("groq", 3.0)
+    health.record_success("sambanova", 0.5)
+    assert health.order(["groq", "sambanova"]) == ["sambanova", "groq"]
+    health.record_failure("sambanova")
+    health.record_failure("sambanova")
+    assert health.order(["groq", "sambanova"]) == ["groq"]
+    health.record_failure("groq")
+    health.record_failure("groq")
+    assert sorted(health.order(["groq", "sambanova"])) == ["groq", "sambanova"]  # All open: try anyway
+    assert health.providers["groq"].state == HALF_OPEN
+    assert health.allow("groq") and not health.allow("groq")  # One probe each
+
+
+def test_state_survives_restarts(tmp_path):
+    health = registry(tmp_path)
+    health.record_failure("groq")
+    health.record_failure("groq")
+    reloaded = registry(tmp_path)
+    assert reloaded.providers["groq"].state == OPEN
+    assert not reloaded.allow("groq")
+
+
+def test_auto_mode_feeds_failures_into_the_breaker_and_skips_open_circuits(make_provider):
+    provider = make_provider(health=registry(), auto_strategy="sequential")
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", error=ValueError("Groq Error 500"))
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+    assert result["provider"] == "sambanova"
+    assert provider.health.providers["groq"].server_errors == 1
+
+    provider.health.record_failure("groq")  # Threshold reached: circuit opens
+    calls.clear()
+    provider.health.record_success("sambanova", 9.0)  # Even if groq would rank first on latency
+    asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+    assert ("groq", "start") not in calls
+
+
+def test_auto_mode_probes_when_every_circuit_is_open(make_provider):
+    provider = make_provider(health=registry(), auto_strategy="sequential")
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", error=ValueError("Groq Error 500"))
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+    for name in ("groq", "sambanova"):
+        provider.health.record_failure(name)
+        provider.health.record_failure(name)
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+
+    assert result["provider"] == "sambanova"
+    assert provider.health.providers["sambanova"].state == CLOSED
+    assert provider.health.providers["groq"].state == OPEN  # Its probe failed
+
+
+def test_vision_goes_through_the_key_lease_and_breaker(make_provider):
+    from PIL import Image
+
+    provider = make_provider(api_keys={"gemini": "vk"}, health=registry())
+    answers = [{"error": "vision sensors recalibrating"}, {"text": "a cat", "source": "SpecsAI Vision (test)"}]
+
+    async def vision(text, system_prompt, image):
+        return answers.pop(0)
+
+    provider.backends["gemini"].vision = vision
+    image = Image.new("RGB", (64, 64), "white")
+
+    failed = asyncio.run(provider.process_query("what is this", "sys", [], "auto", image, Deadline(3)))
+    result = asyncio.run(provider.process_query("what is this", "sys", [], "auto", image, Deadline(3)))
+
+    assert "error" in failed
+    assert result == {"text": "a cat", "source": "SpecsAI Vision (test)"}
+    health = provider.health.providers["gemini"]
+    assert health.successes == 1 and health.consecutive_failures == 0
+    usage = provider.key_pools["gemini"].usage()[0]
+    assert usage["sent"] == 2 and usage["failures"] == 1 and usage["successes"] == 1
+
+
+def test_explicit_stream_does_not_free_a_probe_it_never_claimed(make_provider):
+    from SpecsAI.ratelimit import RateLimited
+
+    provider = make_provider(health=registry())
+    for _ in range(2):
+        provider.health.record_failure("groq")
+    provider.health.providers["groq"].opened_at -= 61
+    assert provider.health.allow("groq")  # Another request holds the half-open probe
+
+    async def stream(text, system_prompt, history, tier="large"):
+        raise RateLimited("groq", 5)
+        yield
+
+    provider.backends["groq"].stream = stream
+
+    async def consume():
+        return [chunk async for chunk in provider.process_stream("hi", "sys", [], "groq", deadline=Deadline(3))]
+
+    try:
+        asyncio.run(consume())
+    except ValueError:
+        pass
+    assert provider.health.providers["groq"].probe_in_flight
+
+
+def test_stream_fallback_without_streaming_feeds_the_breaker(make_provider):
+    provider = make_provider(api_keys={"groq": "gk", "huggingface": "hk"}, health=registry())
+    calls = []
+
+    async def stream(text, system_prompt, history, tier="large"):
+        raise ValueError("Groq Error 500")
+        yield
+
+    provider.backends["groq"].stream = stream
+    provider.backends["huggingface"].query = fake_query(calls, "huggingface", answer="backup answer")
+
+    async def consume():
+        return [chunk async for chunk in provider.process_stream("hi", "sys", [], "auto", deadline=Deadline(3))]
+
+    assert asyncio.run(consume()) == ["backup answer"]
+    assert provider.health.providers["huggingface"].successes == 1
+    assert provider.key_pools["huggingface"].usage()[0]["sent"] == 1
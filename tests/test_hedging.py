@@ -0,0 +1,58 @@
+import asyncio
+
+from SpecsAI.deadline import Deadline
+
+from conftest import fake_query
+
+
+def test_slow_primary_is_hedged_and_cancelled(make_provider):
+    provider = make_provider(hedge_delays={"groq": 0.05})
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", delay=5)
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova", delay=0.01)
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+
+    assert result["provider"] == "sambanova"
+    assert ("groq", "cancelled") in calls
+
+
+def test_failed_primary_launches_next_without_waiting_for_the_hedge_delay(make_provider):
+    provider = make_provider(hedge_delays={"groq": 10})
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", error=ValueError("Groq Error 500"))
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+
+    async def timed():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3))
+        return result, loop.time() - start
+
+    result, elapsed = asyncio.run(timed())
+    assert result["provider"] == "sambanova"
+    assert elapsed < 1
+
+
+def test_race_fires_every_provider_at_once(make_provider):
+    provider = make_provider(auto_strategy="race")
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", delay=0.2)
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova", delay=0.01)
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+
+    assert result["provider"] == "sambanova"
+    assert calls[:2] == [("groq", "start"), ("sambanova", "start")]
+
+
+def test_sequential_tries_providers_in_turn(make_provider):
+    provider = make_provider(auto_strategy="sequential")
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq", answer="")
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+
+    assert result["provider"] == "sambanova"
+    assert calls == [("groq", "start"), ("groq", "done"), ("sambanova", "start"), ("sambanova", "done")]
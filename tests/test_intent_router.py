@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from core.features.feature_manager import FeatureManager
+from core.features.intent_router import IntentRouter
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "core", "features", "intent_corpus.json")
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter()
+
+
+@pytest.mark.parametrize("text, command", [
+    ("open chrome", "open chrome"),
+    ("Chrome ta khule dao", "open chrome"),
+    ("find my invoice file", "search for invoice"),
+    ("find report.pdf", "search for report.pdf"),
+    ("Amr resume file ta khuje ber koro", "search for resume"),
+    ("mute", "mute"),
+    ("next ta", "next song"),
+    ("volume barao", "volume up"),
+])
+def test_clear_commands_take_the_fast_path(router, text, command):
+    intent = router.match(text)
+    assert intent is not None and intent.command == command
+
+
+@pytest.mark.parametrize("text", [
+    "find out", "find love", "find peace", "find my keys", "search for the meaning of life",
+    "volume", "samne", "chup", "skip", "back", "wait",
+    "how do I open chrome", "open the door", "shutdown pc",
+])
+def test_ambiguous_utterances_are_left_for_the_llm(router, text):
+    assert router.match(text) is None
+
+
+# Held out from the corpus the threshold and patterns were tuned on: everyday chat that
+# happens to use command words ("open up", "next week", "volume of a sphere")
+@pytest.mark.parametrize("text", [
+    "I want to open up about my feelings", "my store is open till nine", "open source software",
+    "opening hours of the bank", "the music was too loud last night", "play it cool",
+    "what's your favourite song", "next week I have an exam", "can we talk about the previous chapter",
+    "close your eyes and relax", "the door is closed", "find a way to be happy", "search your heart",
+    "volume of a sphere formula", "skip breakfast is bad?", "back pain remedies", "wait for me",
+    "stop it, you're making me blush", "pause and think about it", "launch date of the iphone",
+    "take a screenshot of your life", "system of equations", "chrome is my favourite colour",
+    "the youtube video was funny", "whatsapp e message dibo", "tumi ki gaan gaite paro",
+    "amar mon kharap", "shutdown the argument", "restart my life", "lock screen wallpaper ideas",
+    "file a complaint",
+])
+def test_everyday_chat_outside_the_corpus_is_left_for_the_llm(router, text):
+    assert router.match(text) is None
+
+
+def test_corpus_has_no_false_fires_at_the_default_threshold(router):
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    negatives = [item["text"] for item in corpus if not item["command"]]
+    assert len(negatives) >= 50
+    fired = [text for text in negatives if router.match(text)]
+    assert fired == []
+
+
+@pytest.mark.parametrize("command, verdict", [
+    ("open chrome", "run"), ("Open  Specs folder", "run"), ("search for resume", "run"),
+    ("create folder named ProjectX", "run"), ("next song", "run"), ("take screenshot", "run"),
+    ("shutdown", "confirm"), ("restart", "confirm"), ("close chrome", "confirm"), ("bondho koro", "confirm"),
+    ("turn off pc", "confirm"), ("open cmd /c shutdown", "confirm"),
+    ("analyze_screen", "unsupported"), ("delete all my files", "unsupported"), ("rm -rf /", "unsupported"),
+    ("open chrome && del *", "unsupported"),
+])
+def test_model_written_commands_are_vetted(command, verdict):
+    assert IntentRouter.check_model_command(command) == verdict
+
+
+def test_every_fast_path_command_may_also_come_from_the_model(router):
+    for _, command, _ in router.exemplars:
+        assert IntentRouter.check_model_command(command) == "run", command
+
+
+class RecordingAutomation:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+
+@pytest.mark.parametrize("text, call", [
+    ("gaan bondho koro", None), ("turn off the lights", None), ("light off koro", None),
+    ("shutdown", "shutdown_pc"), ("laptop ta off koro", "shutdown_pc"), ("restart koro", "restart_pc"),
+])
+def test_power_actions_need_an_explicit_pc_target(text, call):
+    features = FeatureManager.__new__(FeatureManager)  # No real AutomationManager
+    features.os_type, features.automation = "Linux", RecordingAutomation()
+    features.execute_command(text)
+    assert features.automation.calls == ([call] if call else [])
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from SpecsAI.deadline import Deadline
+from SpecsAI.keypool import KeyPool, normalize_keys
+from SpecsAI.ratelimit import RateLimiter
+
+
+def make_pool(keys=("a", "b", "c"), **kwargs):
+    return KeyPool("groq", list(keys), RateLimiter({"groq": {"rpm": 30, "tpm": None}}), **kwargs)
+
+
+def test_normalize_keys():
+    assert normalize_keys(" a, b ,a,,c") == ["a", "b", "c"]
+    assert normalize_keys(["a", None, "a"]) == ["a"]
+    assert normalize_keys(None) == []
+
+
+def test_round_robin_cycles_through_keys():
+    pool = make_pool(strategy="round_robin")
+    assert [pool.pick() for _ in range(4)] == ["a", "b", "c", "a"]
+
+
+def test_least_loaded_prefers_idle_keys():
+    pool = make_pool()
+    pool.limiter.state("groq", "a").in_flight = 2
+    pool.limiter.state("groq", "b").sent = 5
+    assert pool.pick() == "c"
+    pool.limiter.observe("groq", "c", 429, {"Retry-After": "30"})
+    assert pool.pick() == "b"
+
+
+def test_rejected_and_exhausted_keys_are_quarantined():
+    pool = make_pool(strategy="round_robin")
+    pool.record_failure("a", ValueError("Groq Error 401: invalid api key"))
+    pool.record_failure("b", ValueError("Groq Error 429: daily quota exhausted"))
+    pool.record_failure("c", ValueError("Groq Error 500"))
+    assert {pool.pick() for _ in range(3)} == {"c"}
+    usage = {row["reason"] for row in pool.usage()}
+    assert {"rejected", "quota exhausted", ""} == usage
+    assert all("a" != row["key"] for row in pool.usage())  # Keys only show up hashed
+
+
+def test_per_minute_limits_sit_out_only_as_long_as_asked():
+    pool = make_pool()
+    start = time.time()
+    pool.record_failure("a", ValueError(
+        'REST API Error 429: Resource has been exhausted (e.g. check quota). "retryDelay": "17s"'))
+    pool.limiter.observe("groq", "b", 429, {"Retry-After": "30"})
+    pool.record_failure("b", ValueError("Groq Error 429: rate limit reached for requests"))
+    pool.record_failure("c", ValueError("Resource has been exhausted (e.g. check quota)."))
+    until = {key: pool.stats[key]["quarantined_until"] - start for key in "abc"}
+    assert 16 <= until["a"] <= 18
+    assert 29 <= until["b"] <= 31
+    assert 59 <= until["c"] <= 61
+    assert {pool.stats[key]["reason"] for key in "abc"} == {"rate limited"}
+
+    pool.record_failure("a", ValueError('429 Quota exceeded for metric: GenerateRequestsPerDayPerProjectPerModel'))
+    assert pool.stats["a"]["quarantined_until"] - start >= 899
+    assert pool.stats["a"]["reason"] == "quota exhausted"
+
+
+def test_everything_quarantined_falls_back_to_the_first_key_back():
+    pool = make_pool(keys=("a", "b"))
+    pool.quarantine("a", 100, "rejected")
+    pool.quarantine("b", 10, "quota exhausted")
+    assert pool.pick() == "b"
+
+
+def test_provider_spreads_requests_and_moves_off_a_rejected_key(make_provider):
+    provider = make_provider(api_keys={"groq": "k1,k2"}, key_strategy="round_robin")
+    used = []
+
+    async def query(text, system_prompt, history, tier="large"):
+        key = provider._key("groq")
+        used.append(key)
+        if key == "k1":
+            raise ValueError("Groq Error 401: invalid api key")
+        return "ok"
+
+    provider.backends["groq"].query = query
+
+    async def turns():
+        for _ in range(4):
+            try:
+                await provider.process_query("hi", "sys", [], "groq", deadline=Deadline(3))
+            except Exception:
+                pass
+
+    asyncio.run(turns())
+    assert used[:2] == ["k1", "k2"]
+    assert used[2:] == ["k2", "k2"]
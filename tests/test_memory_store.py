@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from SpecsAI.memory import SpecsMemory
+from SpecsAI.memory_store import MemoryStore, database_path
+
+
+def test_database_path():
+    assert database_path("data/specs_memory.json") == "data/specs_memory.db"
+    assert database_path("memory.db") == "memory.db"
+
+
+def test_store_round_trip(tmp_path):
+    store = MemoryStore(str(tmp_path / "m.db"))
+    store.set_profile("user_name", "Rahim")
+    store.set_profile("prefs", {"tts": "bn"})
+    assert store.add_fact("likes tea") and not store.add_fact("likes tea")
+    assert store.add_note("note")
+    store.set_summary(["first", "second"])
+    store.close()
+
+    store = MemoryStore(str(tmp_path / "m.db"))
+    assert store.profile() == {"user_name": "Rahim", "prefs": {"tts": "bn"}}
+    assert store.facts() == ["likes tea"]
+    assert store.notes() == ["note"]
+    assert store.summary() == ["first", "second"]
+    assert store._query("PRAGMA journal_mode")[0][0] == "wal"
+    store.close()
+
+
+def test_set_facts_replaces_the_list():
+    store = MemoryStore(":memory:")
+    store.add_fact("old")
+    store.set_facts(["b", "a", "b"])
+    assert store.facts() == ["b", "a"]
+
+
+def test_json_memory_is_imported_once(tmp_path):
+    legacy = tmp_path / "specs_memory.json"
+    legacy.write_text(json.dumps({"user_name": "Rahim", "facts": ["likes tea"]}))
+
+    memory = SpecsMemory(str(legacy))
+    assert memory.memory == {"user_name": "Rahim", "facts": ["likes tea"]}
+    memory.update("user_name", "Karim")
+    memory.close()
+
+    memory = SpecsMemory(str(legacy))  # The JSON file is still there but not imported again
+    assert memory.memory["user_name"] == "Karim"
+    assert (tmp_path / "specs_memory.db").exists()
+    memory.close()
+
+
+def test_memory_changes_persist_without_duplicate_facts(tmp_path):
+    path = str(tmp_path / "memory.json")
+    memory = SpecsMemory(path)
+    memory.add_fact("likes tea")
+    assert memory.get_context_string() == "- likes tea"
+    memory.update("facts", ["plays chess", "likes tea", "plays chess"])
+    assert memory.get_context_string() == "- plays chess\n- likes tea"
+    memory.close()
+
+    memory = SpecsMemory(path)
+    assert memory.memory["facts"] == ["plays chess", "likes tea"]
+    memory.add_fact("likes tea")
+    assert memory.memory["facts"] == ["plays chess", "likes tea"]
+    memory.update("facts", [])
+    assert "facts" not in memory.memory
+    memory.close()
+
+
+def test_in_process_memory_and_deprecated_save():
+    memory = SpecsMemory(None)
+    memory.update("user_name", "Rahim")
+    memory.update("facts", ["likes tea"])
+    assert memory.get_context_string() == "- User Name: Rahim\n- likes tea"
+    with pytest.deprecated_call():
+        memory.save_memory()
+    memory.close()
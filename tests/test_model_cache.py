@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+
+from SpecsAI.config import SpecsConfig
+from SpecsAI.model_cache import GeminiModelCatalog, classify_status
+
+
+class FakeResponse:
+    def __init__(self, status, data=None):
+        self.status = status
+        self.data = data or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.data
+
+    async def read(self):
+        return b""
+
+
+class FakeSession:
+    """Answers model listings with `models` (or `status`) and records every request."""
+    def __init__(self, models=(), status=200, probe_status=200):
+        self.models = models
+        self.status = status
+        self.probe_status = probe_status
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(("list", url))
+        models = [{"name": f"models/{name}", "supportedGenerationMethods": ["generateContent"]}
+                  for name in self.models]
+        return FakeResponse(self.status, {"models": models})
+
+    def post(self, url, json=None):
+        self.requests.append(("probe", url))
+        return FakeResponse(self.probe_status)
+
+
+class FakePool:
+    def __init__(self, session):
+        self.session = session
+
+    def get(self, name):
+        return self.session
+
+
+def make_catalog(tmp_path, session, **kwargs):
+    path = str(tmp_path / "models.json")
+    return GeminiModelCatalog("secret-key", FakePool(session), storage_path=path,
+                              preferred=["gemini-a", "gemini-b", "gemini-c"], save_delay=60, **kwargs)
+
+
+def test_classify_status():
+    assert classify_status(404) == "not_found"
+    assert classify_status(403) == "forbidden"
+    assert classify_status(429) == "rate_limited"
+    assert classify_status(503) == "server_error"
+    assert classify_status(400) == "other"
+
+
+def test_candidates_follow_listing_and_last_good(tmp_path):
+    session = FakeSession(models=["gemini-b", "gemini-c"])
+    catalog = make_catalog(tmp_path, session)
+    assert asyncio.run(catalog.candidates()) == ["gemini-b", "gemini-c"]  # gemini-a isn't offered to this key
+    catalog.record_success("gemini-c")
+    assert asyncio.run(catalog.candidates()) == ["gemini-c", "gemini-b"]
+    assert catalog.best() == "gemini-c"
+    assert [kind for kind, _ in session.requests] == ["list"]  # Listed once per TTL
+
+
+def test_listing_expires_and_failed_listing_backs_off(tmp_path):
+    session = FakeSession(models=["gemini-a"])
+    catalog = make_catalog(tmp_path, session)
+    asyncio.run(catalog.ensure_listed())
+    catalog.entry["listed_at"] -= SpecsConfig.MODEL_LIST_TTL + 1
+    session.status = 500
+    asyncio.run(catalog.ensure_listed())
+    asyncio.run(catalog.ensure_listed())  # Backing off: no third request
+    assert len(session.requests) == 2
+    assert catalog.entry["available"] == ["gemini-a"]  # Old list kept
+
+    catalog._list_failed_at -= SpecsConfig.MODEL_LIST_RETRY + 1
+    session.status = 200
+    asyncio.run(catalog.ensure_listed())
+    assert len(session.requests) == 3
+
+
+def test_failures_are_remembered_until_their_ttl_then_probed(tmp_path):
+    session = FakeSession()
+    catalog = make_catalog(tmp_path, session)
+    catalog.entry["listed_at"] = time.time()
+    catalog.record_success("gemini-a")
+    catalog.record_failure("gemini-a", 404)
+    catalog.record_failure("gemini-b", 429)
+    assert catalog.entry["last_good"] is None
+    assert asyncio.run(catalog.candidates()) == ["gemini-c"]
+
+    catalog.entry["models"]["gemini-b"]["checked_at"] -= SpecsConfig.MODEL_FAILURE_TTLS["rate_limited"] + 1
+
+    async def expire():
+        first = await catalog.candidates()  # Still skipped; checked in the background
+        await asyncio.sleep(0.01)
+        return first, await catalog.candidates()
+
+    first, second = asyncio.run(expire())
+    assert first == ["gemini-c"]
+    assert second == ["gemini-b", "gemini-c"]
+    assert [kind for kind, _ in session.requests] == ["probe"]
+
+
+def test_everything_broken_still_returns_models(tmp_path):
+    catalog = make_catalog(tmp_path, FakeSession())
+    catalog.entry["listed_at"] = time.time()
+    for name in ("gemini-a", "gemini-b", "gemini-c"):
+        catalog.record_failure(name, 404)
+    assert asyncio.run(catalog.candidates()) == ["gemini-a", "gemini-b", "gemini-c"]
+
+
+def test_writes_are_batched_and_never_store_the_key(tmp_path):
+    catalog = make_catalog(tmp_path, FakeSession())
+    catalog.record_failure("gemini-a", 404)
+    catalog.record_success("gemini-b")
+    path = tmp_path / "models.json"
+    assert not path.exists()  # Waiting for the timer
+    catalog.save()
+    assert "secret-key" not in path.read_text()
+
+    reloaded = make_catalog(tmp_path, FakeSession())
+    assert reloaded.entry["last_good"] == "gemini-b"
+    assert reloaded.entry["models"]["gemini-a"]["error"] == "not_found"
+    assert json.loads(path.read_text()).keys() == {catalog.key_id}
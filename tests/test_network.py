@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from SpecsAI.network import BackgroundLoop, SessionPool
+
+
+def test_background_loop_runs_coroutines_on_one_thread():
+    loop = BackgroundLoop()
+    try:
+        async def thread_name():
+            return threading.current_thread().name
+
+        names = {loop.run(thread_name(), timeout=2) for _ in range(3)}
+        assert names == {"SpecsAI-Loop"}
+        assert loop.submit(asyncio.sleep(0, result=42)).result(timeout=2) == 42
+    finally:
+        loop.stop()
+    assert not loop._thread.is_alive()
+
+
+def test_background_loop_run_refuses_the_loop_thread():
+    loop = BackgroundLoop()
+    try:
+        async def nested():
+            coro = asyncio.sleep(0)
+            try:
+                loop.run(coro)
+            finally:
+                coro.close()
+
+        with pytest.raises(RuntimeError):
+            loop.run(nested(), timeout=2)
+    finally:
+        loop.stop()
+
+
+def test_session_pool_reuses_sessions_per_provider_and_closes_them():
+    async def scenario():
+        pool = SessionPool(limits={"limit": 5}, overrides={"huggingface": {"limit": 2}})
+        groq = pool.get("groq")
+        assert pool.get("groq") is groq
+        assert pool.get("huggingface") is not groq
+        assert groq.connector.limit == 5
+        assert pool.get("huggingface").connector.limit == 2
+        await pool.close()
+        assert groq.closed
+        assert pool.get("groq") is not groq  # Re-created after close
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_engine_shutdown_flushes_health_and_cache(make_engine, tmp_path):
+    engine = make_engine()
+    engine.health.record_success("groq", 0.5)
+    engine.cache.put("hello there", "default:x", "Hi!")
+    engine.shutdown()
+    assert (tmp_path / "health-0.json").exists()
+    assert (tmp_path / "cache.json").exists()
+    assert not engine._loop._thread.is_alive()
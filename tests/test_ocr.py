@@ -0,0 +1,33 @@
+import asyncio
+
+from SpecsAI.deadline import Deadline
+from SpecsAI.ocr import OCRBackend, OCRResult, TextRegion, is_read_request
+
+from conftest import fake_query
+
+
+class FakeOCR(OCRBackend):
+    def available(self):
+        return True
+
+    def read(self, image):
+        return OCRResult([TextRegion("Quarterly report: revenue up twelve percent", (0, 0, 100, 20), 95.0)])
+
+
+def test_read_requests():
+    assert is_read_request("read the text on my screen")
+    assert not is_read_request("describe the picture on my screen")
+
+
+def test_screen_text_is_answered_by_the_turns_provider(make_provider):
+    provider = make_provider(ocr=FakeOCR())
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq")
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+
+    result = asyncio.run(provider.process_query("read the text on my screen", "sys", [], "sambanova",
+                                                image_data=b"png", deadline=Deadline(3)))
+
+    assert result["text"] == "sambanova answer"
+    assert result["source"] == "SpecsAI Vision (local OCR)"
+    assert [name for name, _ in calls] == ["sambanova", "sambanova"]
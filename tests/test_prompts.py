@@ -0,0 +1,57 @@
+from SpecsAI.memory import SpecsMemory
+from SpecsAI.prompts import CHAT, COMMAND, SCREEN, PromptComposer, classify, is_bangla
+
+
+def test_classify_tiers_and_language():
+    assert classify("how are you") == (CHAT, False)
+    assert classify("chrome ta open koro")[0] == COMMAND
+    assert classify("what is this", has_image=True)[0] == SCREEN
+    assert classify("play some songs")[0] == COMMAND
+    assert classify("gan bajao")[0] == COMMAND
+
+
+def test_classify_ignores_keywords_inside_other_words():
+    for text in ("tell me about the startup scene", "update my profile bio", "imagine a dragon",
+                 "what does the clock say", "the display looks dim", "give me some context"):
+        assert classify(text)[0] == CHAT, text
+    assert is_bangla("kemon acho")
+    assert is_bangla("আমি ভালো")
+    assert not is_bangla("see you tomorrow at the office")
+
+
+def test_command_blocks_only_for_command_turns():
+    composer = PromptComposer()
+    chat = composer.compose("good night")
+    command = composer.compose("open chrome")
+    assert command.count("[EXECUTE") > chat.count("[EXECUTE")
+    assert len(command) > len(chat)
+
+
+def test_prompts_are_memoized_per_memory_content():
+    composer = PromptComposer()
+    alice, bob = SpecsMemory(None), SpecsMemory(None)
+    alice.update("user_name", "Alice")
+    alice.add_fact("likes tea")
+    bob.update("user_name", "Bob")
+    bob.add_fact("likes coffee")
+
+    first = composer.compose("hi", memory_context=alice.get_context_string())
+    second = composer.compose("hi", memory_context=bob.get_context_string())
+    anonymous = composer.compose("hi", memory_context=SpecsMemory(None).get_context_string())
+    assert "Alice" in first and "likes tea" in first
+    assert "Bob" in second and "likes coffee" in second
+    assert "Alice" not in second and "likes tea" not in second
+    assert "Alice" not in anonymous and "Bob" not in anonymous
+    assert composer.compose("hi", memory_context=alice.get_context_string()) is first
+
+
+def test_sessions_with_different_memories_get_their_own_prompt(make_engine):
+    engine = make_engine()
+    engine.memory.update("user_name", "Desktop User")
+    engine.memory.add_fact("private fact")
+    other = engine.session("other", memory=SpecsMemory(None))
+
+    desktop_prompt = engine.default_session._prepare("hi", "auto", None, "default")[0]
+    other_prompt = other._prepare("hi", "auto", None, "default")[0]
+    assert "private fact" in desktop_prompt
+    assert "private fact" not in other_prompt and "Desktop User" not in other_prompt
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+from SpecsAI.deadline import Deadline
+from SpecsAI.ratelimit import RateLimited, RateLimiter, TokenBucket, key_id, parse_duration, parse_retry_after
+
+from conftest import fake_query
+
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("1h2m") == 3720
+    assert parse_duration("12") == 12
+    assert parse_duration(None) is None
+    assert parse_duration("soon") is None
+
+
+def test_parse_retry_after_accepts_http_dates():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # In the past
+    assert parse_retry_after("garbage") is None
+
+
+def test_key_id_hides_the_key():
+    assert key_id("secret-key") == key_id("secret-key")
+    assert "secret" not in key_id("secret-key")
+    assert len(key_id(None)) == 12
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(60)  # One unit per second
+    now = bucket.updated
+    bucket.take(60, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
+    assert bucket.wait_time(5, now + 2.0) == pytest.approx(3.0)
+
+
+def test_token_bucket_allows_one_oversized_request():
+    bucket = TokenBucket(100)
+    assert bucket.wait_time(500, bucket.updated) == 0.0
+    bucket.take(500, bucket.updated)
+    assert bucket.level == 0.0
+
+
+def test_acquire_queues_briefly_then_reroutes():
+    limiter = RateLimiter({"groq": {"rpm": 600, "tpm": None}}, waits={"auto": 0.5})
+    state = limiter.state("groq", "k")
+    state.requests.level = 0  # Next slot in 0.1s
+
+    async def acquire(max_wait):
+        start = time.monotonic()
+        await limiter.acquire("groq", "k", max_wait=max_wait)
+        return time.monotonic() - start
+
+    assert asyncio.run(acquire(None)) >= 0.05
+    state.requests.level = 0
+    with pytest.raises(RateLimited) as error:
+        asyncio.run(acquire(0.01))
+    assert error.value.provider == "groq"
+
+
+def test_headers_cap_the_bucket_and_429_blocks_the_key():
+    limiter = RateLimiter({"groq": {"rpm": 30, "tpm": 6000}}, waits={"default_penalty": 20})
+    limiter.observe("groq", "k", 200, {"X-RateLimit-Remaining-Tokens": "100"})
+    assert limiter.state("groq", "k").tokens.level <= 100
+    assert limiter.wait_time("groq", "k", tokens=50) == 0.0
+    assert limiter.wait_time("groq", "k", tokens=1000) > 0
+
+    limiter.observe("groq", "k", 200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "30s"})
+    assert limiter.wait_time("groq", "k") == pytest.approx(30, abs=1)
+    assert limiter.wait_time("groq", "other-key") == 0.0  # Limits are per key
+
+    limiter.observe("sambanova", "k", 429, {})
+    assert limiter.wait_time("sambanova", "k") == pytest.approx(20, abs=1)
+    assert limiter.snapshot()[-1]["throttled"] == 1
+
+
+def test_slot_tracks_in_flight_requests():
+    limiter = RateLimiter({"groq": {"rpm": 30}})
+
+    async def use():
+        async with limiter.slot("groq", "k") as state:
+            assert state.in_flight == 1
+        return state
+
+    state = asyncio.run(use())
+    assert state.in_flight == 0 and state.sent == 1
+
+
+def test_auto_mode_skips_a_throttled_provider(make_provider):
+    provider = make_provider(auto_strategy="sequential")
+    calls = []
+    provider.backends["groq"].query = fake_query(calls, "groq")
+    provider.backends["sambanova"].query = fake_query(calls, "sambanova")
+    provider.limiter.observe("groq", "gk", 429, {"Retry-After": "60"})
+
+    result = asyncio.run(provider.process_query("hi", "sys", [], "auto", deadline=Deadline(3)))
+
+    assert result["provider"] == "sambanova"
+    assert ("groq", "start") not in calls
@@ -0,0 +1,97 @@
+import asyncio
+
+from SpecsAI.deadline import Deadline
+from SpecsAI.routing import LARGE, SMALL, ModelRouter
+
+
+class FakeResponse:
+    def __init__(self, status, content):
+        self.status = status
+        self.headers = {}
+        self.content = content
+
+    async def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+    async def text(self):
+        return self.content
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Records the model of every chat request and answers with a fixed status."""
+    def __init__(self, status, content="ok"):
+        self.status = status
+        self.content = content
+        self.models = []
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        self.models.append(json["model"])
+        return FakeResponse(self.status, self.content)
+
+
+def test_small_talk_and_short_commands_use_the_small_model():
+    router = ModelRouter()
+    assert router.decide("hi!").tier == SMALL
+    assert router.decide("kemon acho").reasons == ["small talk"]
+    assert router.decide("open chrome").tier == SMALL
+    assert router.decide("what's the weather like").tier == SMALL
+
+
+def test_complex_turns_use_the_large_model():
+    router = ModelRouter()
+    assert router.decide("explain step by step why my code fails").tier == LARGE
+    assert router.decide("fix this:\n```\ndef f(x):\n    return x +\n```").tier == LARGE
+    decision = router.decide("what is this", image_data=object())
+    assert (decision.tier, decision.reasons) == (LARGE, ["vision"])
+
+
+def test_long_history_and_length_raise_the_score():
+    router = ModelRouter()
+    question = "why is the sky blue"
+    shallow = router.decide(question)
+    deep = router.decide(question, history=[{"role": "user", "content": "x"}] * 20)
+    assert shallow.tier == SMALL and deep.tier == LARGE
+    assert "deep history" in deep.reasons
+    assert router.score("word " * 50)[1] == ["long"]
+
+
+def test_forced_modes_and_route_overrides():
+    assert ModelRouter(mode="large").decide("hi").tier == LARGE
+    assert ModelRouter(mode="small").decide("explain step by step why").tier == SMALL
+    router = ModelRouter(routes={"groq": {"small": "custom-small"}})
+    assert router.model("groq", SMALL) == "custom-small"
+    assert router.model("groq", LARGE) == "llama-3.3-70b-versatile"
+    assert router.model("huggingface", SMALL) == router.model("huggingface", LARGE)  # No small model: large
+
+
+def test_failed_small_model_falls_back_to_the_next_provider(make_provider):
+    provider = make_provider(auto_strategy="sequential")
+    groq, sambanova = FakeSession(503, "overloaded"), FakeSession(200, "hello!")
+    provider.backends["groq"].session = lambda: groq
+    provider.backends["sambanova"].session = lambda: sambanova
+
+    result = asyncio.run(provider.process_query("hello", "sys", [], "auto", deadline=Deadline(3)))
+
+    assert result["provider"] == "sambanova" and result["text"] == "hello!"
+    assert groq.models == ["llama-3.1-8b-instant"]
+    assert sambanova.models == ["Meta-Llama-3.1-8B-Instruct"]
+    stats = provider.router.snapshot()
+    assert stats["groq/small"]["failures"] == 1
+    assert (stats["sambanova/small"]["calls"], stats["sambanova/small"]["failures"]) == (1, 0)
+    assert provider.health.providers["groq"].server_errors == 1
+
+
+def test_complex_turns_are_sent_to_the_large_model(make_provider):
+    provider = make_provider(auto_strategy="sequential")
+    groq = FakeSession(200, "because...")
+    provider.backends["groq"].session = lambda: groq
+
+    asyncio.run(provider.process_query("explain step by step why the sky is blue", "sys", [], "auto",
+                                       deadline=Deadline(3)))
+    assert groq.models == ["llama-3.3-70b-versatile"]
@@ -0,0 +1,170 @@
+import asyncio
+import sqlite3
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from SpecsAI.server import SpecsServer
+
+
+@pytest.fixture
+def engine(make_engine):
+    engine = make_engine(api_keys={"groq": "k"}, response_cache=False, rate_limits={"groq": {"rpm": 10000}})
+    engine.memory.update("user_name", "Desktop")
+    engine.memory.add_fact("desktop user's private fact")
+    return engine
+
+
+def run_client(engine, tmp_path, scenario, **settings):
+    async def main():
+        server = SpecsServer(engine, settings=dict({"memory_dir": str(tmp_path / "sessions")}, **settings))
+        app = server.build_app()
+        app.on_cleanup.clear()  # The engine fixture shuts the engine down
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client, server)
+
+    return asyncio.run(main())
+
+
+def capture_prompts(engine):
+    prompts = []
+
+    async def query(text, system_prompt, history, tier="large"):
+        prompts.append(system_prompt)
+        return "ok"
+
+    engine.provider.backends["groq"].query = query
+    return prompts
+
+
+async def chat(client, text, session_id=None, model="specsai"):
+    headers = {"X-Session-Id": session_id} if session_id else {}
+    response = await client.post("/v1/chat/completions", headers=headers,
+                                 json={"model": model, "messages": [{"role": "user", "content": text}]})
+    assert response.status == 200
+    return await response.json()
+
+
+def test_session_memories_stay_separate(engine, tmp_path):
+    prompts = capture_prompts(engine)
+
+    async def scenario(client, server):
+        await chat(client, "my name is Alice", "client-a")
+        await chat(client, "hello there", "client-b")
+        await chat(client, "hello there")  # Stateless
+        await chat(client, "hello again", "client-a")
+
+    run_client(engine, tmp_path, scenario)
+    first_a, b, stateless, second_a = prompts
+    for prompt in (first_a, b, stateless, second_a):
+        assert "private fact" not in prompt and "Desktop" not in prompt
+    assert "Alice" in second_a
+    assert "Alice" not in b and "Alice" not in stateless
+    assert len(list((tmp_path / "sessions").glob("client-a-*.db"))) == 1
+
+
+def test_similar_client_ids_get_their_own_memory_file(engine, tmp_path):
+    capture_prompts(engine)
+    long_id = "x" * 70
+
+    async def scenario(client, server):
+        for session_id in ("team/a", "team_a", long_id + "1", long_id + "2"):
+            await chat(client, "hi", session_id)
+
+    run_client(engine, tmp_path, scenario)
+    assert len(list((tmp_path / "sessions").glob("*.db"))) == 4
+
+
+def test_client_default_id_is_not_the_desktop_session(engine, tmp_path):
+    prompts = capture_prompts(engine)
+
+    async def scenario(client, server):
+        response = await client.post("/v1/chat/completions", headers={"X-Session-Id": "default"},
+                                     json={"messages": [{"role": "user", "content": "hello"}]})
+        return response.headers["X-Session-Id"]
+
+    assert run_client(engine, tmp_path, scenario) == "default"
+    assert "private fact" not in prompts[0] and "Desktop" not in prompts[0]
+    assert engine.default_session.history == []
+
+
+def test_session_created_elsewhere_first_keeps_its_memory(engine, tmp_path):
+    server = SpecsServer(engine, settings={"memory_dir": str(tmp_path / "sessions")})
+    opened = []
+    memory_for = server._memory_for
+
+    def racing_memory_for(session_id):
+        # Another caller creates the same session while this one opens its memory
+        if not opened:
+            opened.append(engine.session("client:client-a", memory=memory_for(session_id)))
+        memory = memory_for(session_id)
+        opened.append(memory)
+        return memory
+
+    server._memory_for = racing_memory_for
+    session, _ = server._resolve_session("client-a", [])
+    winner, loser = opened
+    assert session is winner and session.memory.store.facts() == []
+    with pytest.raises(sqlite3.ProgrammingError):
+        loser.store.facts()
+
+
+def test_stateless_system_messages_reach_the_prompt(engine, tmp_path):
+    prompts = capture_prompts(engine)
+
+    async def scenario(client, server):
+        await client.post("/v1/chat/completions", json={"messages": [
+            {"role": "system", "content": "Always answer in French."},
+            {"role": "user", "content": "hello"},
+        ]})
+
+    run_client(engine, tmp_path, scenario)
+    assert "Always answer in French." in prompts[0]
+
+
+def test_evicted_session_memory_is_closed(engine, tmp_path):
+    capture_prompts(engine)
+    engine.max_sessions = 2  # 'default' + one client
+
+    async def scenario(client, server):
+        await chat(client, "hi", "client-a")
+        store = engine.sessions["client:client-a"].memory.store
+        await chat(client, "hi", "client-b")
+        return store
+
+    store = run_client(engine, tmp_path, scenario)
+    assert "client:client-a" not in engine.sessions
+    with pytest.raises(sqlite3.ProgrammingError):
+        store.facts()
+
+
+def test_stateless_sessions_are_closed_after_the_request(engine, tmp_path):
+    capture_prompts(engine)
+
+    async def scenario(client, server):
+        await chat(client, "hi")
+
+    run_client(engine, tmp_path, scenario)
+    assert [session_id for session_id in engine.sessions if session_id.startswith("_request-")] == []
+
+
+def test_keyless_ollama_is_served(make_engine, tmp_path):
+    engine = make_engine(api_keys={"groq": "k"}, response_cache=False, ollama={"priority": "fallback", "warmup": False})
+    cloud = capture_prompts(engine)
+    calls = []
+
+    async def query(text, system_prompt, history, tier="large"):
+        calls.append(text)
+        return "local answer"
+
+    engine.provider.backends["ollama"].query = query
+
+    async def scenario(client, server):
+        models = await (await client.get("/v1/models")).json()
+        reply = await chat(client, "hello", model="ollama")
+        return [model["id"] for model in models["data"]], reply
+
+    models, reply = run_client(engine, tmp_path, scenario)
+    assert "ollama" in models
+    assert reply["choices"][0]["message"]["content"] == "local answer"
+    assert calls == ["hello"] and cloud == []
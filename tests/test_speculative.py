@@ -0,0 +1,97 @@
+import asyncio
+
+from SpecsAI.deadline import Deadline
+from SpecsAI.routing import SMALL
+from SpecsAI.speculative import SpeculativeResponder, similarity
+
+
+class FakeStream:
+    """Async iterator over (delay, chunk) pairs that records aclose()."""
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        delay, chunk = self.chunks.pop(0)
+        await asyncio.sleep(delay)
+        return chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+def make_responder(make_provider, draft, main, continuation=()):
+    provider = make_provider()
+    streams = {"prompts": []}
+
+    def process_stream(text, system_prompt, history, name, image_data, deadline, tier=None):
+        streams["prompts"].append(system_prompt)
+        if tier == SMALL:
+            streams["draft"] = FakeStream(draft)
+        elif "main" not in streams:
+            streams["main"] = FakeStream(main)
+        else:
+            streams["continuation"] = FakeStream(continuation)
+            return streams["continuation"]
+        return streams["draft" if tier == SMALL else "main"]
+
+    provider.process_stream = process_stream
+    return SpeculativeResponder(provider, enabled=True), streams
+
+
+def collect(responder, limit=None):
+    async def main():
+        stream = responder.stream("question", "sys", [], "auto", "groq", Deadline(5))
+        chunks = []
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                if limit and len(chunks) >= limit:
+                    break
+        finally:
+            await stream.aclose()
+        await asyncio.sleep(0.01)  # Let the cancelled background tasks finish
+        return chunks
+
+    return asyncio.run(main())
+
+
+def test_similarity():
+    assert similarity("Paris is lovely.", "paris is LOVELY") == 1.0
+    assert similarity("", "anything") == 0.0
+    assert 0 < similarity("Paris is lovely.", "Rome is lovely.") < 1
+
+
+def test_main_opening_first_streams_the_main_answer(make_provider):
+    responder, _ = make_responder(make_provider, draft=[(0.2, "Draft. ")],
+                                  main=[(0, "Main opening. "), (0, "More.")])
+    assert "".join(collect(responder)) == "Main opening. More."
+    assert responder.stats.main == 1
+
+
+def test_compatible_draft_is_spoken_then_main_continues(make_provider):
+    responder, _ = make_responder(make_provider, draft=[(0, "Paris is the capital of France. ")],
+                                  main=[(0.1, "Paris is the capital city of France. "), (0, "It is large.")])
+    assert "".join(collect(responder)) == "Paris is the capital of France. It is large."
+    assert responder.stats.compatible == 1
+
+
+def test_different_opening_asks_the_main_model_to_continue(make_provider):
+    responder, streams = make_responder(make_provider, draft=[(0, "Sure thing. ")],
+                                        main=[(0.1, "Quantum physics studies tiny particles. ")],
+                                        continuation=[(0, "Here is how it works.")])
+    assert "".join(collect(responder)) == "Sure thing. Here is how it works."
+    assert responder.stats.continued == 1
+    assert "Sure thing." in streams["prompts"][-1]
+
+
+def test_abandoned_turn_closes_the_main_stream(make_provider):
+    responder, streams = make_responder(make_provider, draft=[(1, "Late draft. ")],
+                                        main=[(0, "First sentence. "), (5, "Never sent.")])
+    assert collect(responder, limit=1) == ["First sentence. "]
+    assert streams["main"].closed
@@ -0,0 +1,108 @@
+import asyncio
+
+from SpecsAI.streaming import (ACTION, EXECUTE, SENTENCE, SPEECH, ResponseTokenizer, SentenceBuffer,
+                               iter_ndjson, iter_sse_json)
+
+RESPONSE = "Sure! *smiles* Opening it now. [EXECUTE: open chrome] Done. Anything else?"
+
+
+def tokenize(chunks, **kwargs):
+    tokenizer = ResponseTokenizer(**kwargs)
+    events = []
+    for chunk in chunks:
+        events += tokenizer.feed(chunk)
+    return events + tokenizer.flush()
+
+
+def structure(events):
+    """Events without the speech fragments (their split depends on the chunking)."""
+    return [(e.kind, e.text, e.raw) for e in events if e.kind != SPEECH]
+
+
+def spoken(events):
+    return "".join(e.text for e in events if e.kind == SPEECH)
+
+
+def test_whole_response():
+    events = tokenize([RESPONSE])
+    assert structure(events) == [
+        (SENTENCE, "Sure!", "Sure!"),
+        (ACTION, "smiles", "*smiles*"),
+        (SENTENCE, "Opening it now.", "*smiles* Opening it now."),
+        (EXECUTE, "open chrome", "[EXECUTE: open chrome]"),
+        (SENTENCE, "Done.", "[EXECUTE: open chrome] Done."),
+        (SENTENCE, "Anything else?", "Anything else?"),
+    ]
+    assert "*" not in spoken(events) and "EXECUTE" not in spoken(events)
+
+
+def test_any_chunking_gives_the_same_events():
+    whole = tokenize([RESPONSE])
+    for size in (1, 2, 3, 7):
+        chunks = [RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)]
+        events = tokenize(chunks)
+        assert structure(events) == structure(whole)
+        assert spoken(events) == spoken(whole)
+
+
+def test_action_is_reported_as_soon_as_it_closes():
+    tokenizer = ResponseTokenizer()
+    assert tokenizer.feed("*looks") == []
+    assert [(e.kind, e.text) for e in tokenizer.feed(" down* ok")] == [(ACTION, "looks down"), (SPEECH, " ok")]
+
+
+def test_possible_tag_start_is_held_back():
+    tokenizer = ResponseTokenizer()
+    events = tokenizer.feed("Hi [EXE")
+    assert spoken(events) == "Hi "
+    assert [(e.kind, e.text) for e in tokenizer.feed("CUTE: mute]")] == [(EXECUTE, "mute")]
+
+
+def test_brackets_and_stray_stars_are_text():
+    events = tokenize(["[1] is 2 * 3"])
+    assert spoken(events) == "[1] is 2 * 3"
+    events = tokenize(["a *" + "x" * 30], max_markup=10)
+    assert spoken(events) == "a *" + "x" * 30
+    assert [e.kind for e in events].count(ACTION) == 0
+
+
+def test_unfinished_command_is_dropped():
+    events = tokenize(["Okay. [EXECUTE: shut"])
+    assert structure(events) == [(SENTENCE, "Okay.", "Okay.")]
+
+
+def test_bangla_danda_ends_a_sentence():
+    events = tokenize(["আমি ভালো আছি। তুমি?"])
+    assert [e.text for e in events if e.kind == SENTENCE] == ["আমি ভালো আছি।", "তুমি?"]
+
+
+def test_sentence_buffer():
+    buffer = SentenceBuffer()
+    assert buffer.feed("Hello there. How") == ["Hello there."]
+    assert buffer.feed(" are you? I") == ["How are you?"]
+    assert buffer.flush() == "I"
+
+
+class FakeContent:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __aiter__(self):
+        async def generate():
+            for line in self.lines:
+                yield line
+        return generate()
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.content = FakeContent(lines)
+
+
+def test_sse_and_ndjson_parsing():
+    async def collect(parser, lines):
+        return [item async for item in parser(FakeResponse(lines))]
+
+    sse = [b'data: {"a": 1}\n', b"\n", b": keep-alive\n", b"data: not json\n", b"data: [DONE]\n", b'data: {"a": 2}\n']
+    assert asyncio.run(collect(iter_sse_json, sse)) == [{"a": 1}]
+    assert asyncio.run(collect(iter_ndjson, [b'{"b": 1}\n', b"\n", b"{torn"])) == [{"b": 1}]
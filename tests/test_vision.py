@@ -0,0 +1,78 @@
+import io
+
+from PIL import Image, ImageDraw
+
+from SpecsAI.vision import ImageEncoder, VisionCache, dhash, hamming
+
+
+def screen(size=(800, 600), text_at=None):
+    """Fake screenshot: a gradient with some 'windows', optionally a small mark (cursor / clock tick)."""
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((50, 50, size[0] // 2, size[1] // 2), fill=(30, 60, 200))
+    draw.rectangle((size[0] // 2 + 20, 80, size[0] - 40, size[1] - 60), fill=(240, 240, 240))
+    if text_at:
+        draw.rectangle((*text_at, text_at[0] + 6, text_at[1] + 6), fill=(255, 0, 0))
+    return image
+
+
+def test_large_screens_are_downscaled_and_memoized():
+    encoder = ImageEncoder({"max_dimension": 512})
+    big = screen((3840, 2160))
+    encoded = encoder.encode(big)
+    assert max(encoded.size) == 512 and encoded.size == (512, 288)
+    assert encoded.mime_type == "image/jpeg"
+    assert Image.open(io.BytesIO(encoded.data)).size == (512, 288)
+    assert encoder.encode(big) is encoded
+    assert encoder.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_small_images_and_bytes_keep_their_size():
+    encoder = ImageEncoder({"max_dimension": 512})
+    buffer = io.BytesIO()
+    screen((320, 200)).convert("RGBA").save(buffer, format="PNG")
+    encoded = encoder.encode(buffer.getvalue())
+    assert encoded.size == (320, 200)
+    assert encoder.encode(encoded) is encoded  # Already encoded: passed through
+
+
+def test_encoder_cache_evicts_the_oldest_payload():
+    encoder = ImageEncoder({"cache_size": 2})
+    images = [screen((400 + i, 300)) for i in range(3)]
+    first = encoder.encode(images[0])
+    encoder.encode(images[1])
+    encoder.encode(images[2])
+    assert encoder.stats()["entries"] == 2
+    assert encoder.encode(images[0]) is not first  # Evicted, encoded again
+    assert encoder.stats()["misses"] == 4
+
+
+def test_dhash_tolerates_small_changes_but_not_a_different_screen():
+    base = dhash(screen())
+    assert hamming(base, dhash(screen(text_at=(700, 580)))) <= 6
+    other = Image.linear_gradient("L").rotate(90).resize((800, 600)).convert("RGB")
+    assert hamming(base, dhash(other)) > 6
+
+
+def test_near_duplicate_screens_reuse_the_answer():
+    encoder, cache = ImageEncoder(), VisionCache()
+    cache.put(encoder.encode(screen()), "What's on my screen?", "A blue window.")
+    assert cache.get(encoder.encode(screen(text_at=(700, 580))), "whats on my screen") == "A blue window."
+    assert cache.get(encoder.encode(screen()), "read the error message") is None
+    other = Image.linear_gradient("L").rotate(90).resize((800, 600)).convert("RGB")
+    assert cache.get(encoder.encode(other), "What's on my screen?") is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_answer_cache_expires_and_keeps_only_recent_entries():
+    encoder = ImageEncoder()
+    image = encoder.encode(screen())
+    cache = VisionCache({"answer_cache_size": 2})
+    for answer in ("one", "two", "three"):
+        cache.put(image, f"question {answer}", answer)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(image, "question one") is None
+    assert cache.get(image, "question three") == "three"
+
+    cache.entries[-1]["created"] -= cache.settings["answer_ttl"] + 1
+    assert cache.get(image, "question three") is None
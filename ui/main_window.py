@@ -5,7 +5,7 @@ import os
 import threading
 import time
 import pyautogui
-from PySide6.QtWidgets import QApplication, QMainWindow, QSystemTrayIcon, QMenu, QStyle, QInputDialog, QWidget, QStackedLayout
+from PySide6.QtWidgets import QApplication, QMainWindow, QSystemTrayIcon, QMenu, QStyle, QInputDialog, QWidget, QStackedLayout, QMessageBox
 from PySide6.QtGui import QAction, QCursor, QRegion, QBitmap, QPainter, QTransform
 from PySide6.QtCore import Qt, QUrl, QTimer, Signal, QEvent, QPoint, QRect
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
@@ -17,6 +17,7 @@ from core.character.character_manager import CharacterManager
 from core.automation.automation_manager import AutomationManager
 from core.network.online_manager import OnlineManager
 from core.features.feature_manager import FeatureManager
+from core.features.intent_router import IntentRouter
 from core.services.voice_service import VoiceService
 from core.services.ai_service import AIService
 from core.services.stt_service import STTService
@@ -27,6 +28,8 @@ from core.settings.settings_manager import SettingsManager
 from core.behavior.action_parser import ActionParser
 from core.behavior.posture_mapper import PostureMapper
 from core.services.neural_link import NeuralLinkService
+from SpecsAI.streaming import ResponseTokenizer, SENTENCE, ACTION, EXECUTE
+from SpecsAI.cancellation import CancellationToken
 
 import ctypes
 from ctypes.wintypes import HWND, DWORD, LONG
@@ -40,11 +43,13 @@ class MARGINS(ctypes.Structure):
 class MainWindow(QMainWindow):
     # Signal to handle AI response on the main thread
     ai_response_received = Signal(str)
+    ai_chunk_received = Signal(str)
 
     def __init__(self):
         super().__init__()
         
         self.ai_response_received.connect(self.process_ai_response_ui)
+        self.ai_chunk_received.connect(self.process_ai_chunk_ui)
 
         # Managers
         self.char_manager = CharacterManager()
@@ -54,7 +59,7 @@ class MainWindow(QMainWindow):
         
         # Services
         self.voice_service = VoiceService()
-        self.ai_service = AIService(online_manager=self.online_manager)
+        self.ai_service = AIService(online_manager=self.online_manager, feature_manager=self.feature_manager)
         self.stt_service = STTService()
         self.history_service = HistoryService()
         
@@ -117,12 +122,15 @@ class MainWindow(QMainWindow):
         # Chat Widget
         self.chat_widget = ChatWidget(None) # Separate window
         self.chat_widget.user_input_received.connect(self.process_user_input)
+        self.chat_widget.stop_clicked.connect(self.stop_generation)
         self.chat_widget.show()
         
         self.setup_tray_icon()
         
         # State
-        self.stop_requested = False
+        self.current_token = None # CancellationToken of the turn in flight
+        self.response_tokenizer = ResponseTokenizer()
+        self.turn_text = "" # User text of the turn in flight
         self.resize_margin = 10
         
         # Initial Size
@@ -132,6 +140,13 @@ class MainWindow(QMainWindow):
         # Auto-Load
         QTimer.singleShot(1000, self.load_default_character)
 
+        # Exit (tray menu or last window): stop the current turn and flush the engine
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+
+    def shutdown(self):
+        self._cancel_turn()
+        self.ai_service.shutdown()
+
     def enable_windows_transparency(self):
         """DWM Blur/Transparency for Windows"""
         try:
@@ -190,25 +205,117 @@ class MainWindow(QMainWindow):
         if not text.strip(): return
         self.chat_widget.set_loading_state(True)
         
-        # Stop previous speech
-        self.voice_service.stop()
-        self.player.stop()
-        self.stop_requested = False
+        # Supersede the previous turn: aborts its request, queued speech and searches
+        self._cancel_turn()
+        token = self.current_token = CancellationToken()
+        self.response_tokenizer = ResponseTokenizer()
+        self.turn_text = text  # Asked again with a screenshot if the answer requests analyze_screen
         
-        threading.Thread(target=self.ai_service.generate_response, args=(text, self.on_ai_response), daemon=True).start()
+        # Streamed: sentences are spoken, *actions* posed and [EXECUTE: ...] commands run as soon as they close
+        self.ai_service.generate_stream(
+            text,
+            lambda chunk: self.on_ai_chunk(chunk, token),
+            lambda response_text: self.on_ai_response(response_text, token),
+            token=token
+        )
+
+    def stop_generation(self):
+        """Stop button: cancels the current turn end to end."""
+        self._cancel_turn()
+        self.chat_widget.set_loading_state(False)
+        self._on_speaking_finished()
+
+    def _cancel_turn(self):
+        if self.current_token:
+            self.current_token.cancel()
+        self.voice_service.stop_playback()
+        self.player.stop()
 
-    def on_ai_response(self, response_text):
-        self.ai_response_received.emit(response_text)
+    def _turn_active(self):
+        return self.current_token is not None and not self.current_token.cancelled
+
+    def on_ai_chunk(self, chunk, token=None):
+        if token is None or not token.cancelled:
+            self.ai_chunk_received.emit(chunk)
+
+    def on_ai_response(self, response_text, token=None):
+        if token is None or not token.cancelled:
+            self.ai_response_received.emit(response_text)
+
+    def process_ai_chunk_ui(self, chunk):
+        if not self._turn_active(): return
+        for event in self.response_tokenizer.feed(chunk):
+            self._handle_response_event(event)
 
     def process_ai_response_ui(self, response_text):
+        if not self._turn_active(): return
         self.chat_widget.set_loading_state(False)
-        if self.stop_requested: return
         
-        display_text = response_text
-        tts_text = self.action_parser.remove_actions(response_text)
+        # Speak whatever didn't end with a sentence boundary
+        for event in self.response_tokenizer.flush():
+            self._handle_response_event(event)
         
-        self.history_service.log_chat("SpecsAI", display_text)
-        self.voice_service.speak(tts_text, display_text=display_text)
+        self.history_service.log_chat("SpecsAI", response_text)
+
+    def _handle_response_event(self, event):
+        if event.kind == SENTENCE:
+            # Spoken without markup, shown as written
+            self.voice_service.speak(event.text, display_text=event.raw, token=self.current_token)
+        elif event.kind == ACTION:
+            posture = self.posture_mapper.map_action(event.text)
+            if posture and hasattr(self.interactive_widget, 'set_posture'):
+                self.interactive_widget.set_posture(posture)
+        elif event.kind == EXECUTE:
+            command = event.text.strip()
+            if command.lower() == "analyze_screen":
+                self._analyze_screen(self.turn_text, self.current_token)
+                return
+            # The tag comes from model output: only commands we'd issue ourselves run unasked
+            verdict = IntentRouter.check_model_command(command)
+            if verdict == "confirm" and not self._confirm_command(command):
+                verdict = "refused"
+            if verdict in ("confirm", "run"):
+                self._run_command(command, self.current_token)
+            else:
+                self.history_service.log_event("Command", f"{command}: not run ({verdict})")
+
+    def _confirm_command(self, command):
+        """Asks before a power / close action the model asked for (shutdown, restart, close ...)."""
+        answer = QMessageBox.question(self, "SpecsAI", f"SpecsAI wants to run \"{command}\". Allow it?",
+                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return answer == QMessageBox.Yes
+
+    def _analyze_screen(self, question, token):
+        """[EXECUTE: analyze_screen]: asks the turn's question again with a screenshot attached (vision / OCR)."""
+        def run():
+            if token and token.cancelled:
+                return
+            try:
+                image = pyautogui.screenshot()
+            except Exception as e:
+                print(f"Screenshot Error: {e}")
+                return
+            self.ai_service.generate_stream(
+                question,
+                lambda chunk: self.on_ai_chunk(chunk, token),
+                lambda response_text: self.on_ai_response(response_text, token),
+                image_data=image,
+                token=token
+            )
+        threading.Thread(target=run, daemon=True).start()
+
+    def _run_command(self, command, token):
+        """Runs an [EXECUTE: ...] command off the UI thread while the rest of the answer streams in."""
+        def run():
+            if token and token.cancelled:
+                return
+            try:
+                result = self.feature_manager.execute_command(command, token=token)
+                if result:
+                    self.history_service.log_event("Command", f"{command}: {result}")
+            except Exception as e:
+                print(f"Command Error ({command}): {e}")
+        threading.Thread(target=run, daemon=True).start()
 
     # --- Audio / Media ---
     def _play_tts_audio(self, file_path, display_text=None, metadata=None):